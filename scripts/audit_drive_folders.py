@@ -3,8 +3,9 @@
 Drive Folder Audit Script
 =========================
 Scans the Client Projects folder in Google Drive, matches folders to DB records
-(by TLA for Tier 1, by client code for Tier 2), and optionally updates
-drive_folder_id fields in the database.
+(by TLA for Tier 1, by client code for Tier 2, by code + product type + year
+against client_product_folders for Tiers 3 and 4), and optionally updates
+the stored folder IDs in the database.
 
 Setup
 -----
@@ -32,7 +33,16 @@ Setup
 Options
 -------
   --apply        Write updates to DB (default is dry-run)
-  --tier2        Also scan Tier 2 subfolders (slower — one API call per Tier 1 folder)
+  --tier2        Also scan Tier 2 subfolders (batched breadth-first walk, see drive_tree.py)
+  --tier4        Also scan Tier 3 (product type) and Tier 4 (year) folders; implies --tier2
+  --inventory    List every folder in the shared drive in a few paginated calls and
+                 rebuild the tree locally, instead of querying per parent
+  --workers N    Concurrent Drive queries per tier (default: 8)
+  --incremental  Only audit folders changed since the last --apply run, using the
+                 Drive Changes feed and a saved snapshot (see --state). The CSV is
+                 then a diff: NEW / RENAMED / MOVED / TRASHED / PARENT_CHANGED.
+                 Falls back to a full rescan if the saved page token has expired.
+  --state FILE   Incremental state file (default: scripts/drive_audit_state.json)
   --output FILE  CSV output path (default: audit_results.csv)
 """
 
@@ -40,44 +50,25 @@ import os
 import re
 import csv
 import sys
+import json
 import argparse
 from collections import Counter
 
-# ── Load .env file if present ─────────────────────────────────────────────────
-
-def _load_env():
-    """Load key=value pairs from scripts/.env or scripts/scripts.env into os.environ."""
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    for name in ('.env', 'scripts.env'):
-        env_path = os.path.join(script_dir, name)
-        if os.path.exists(env_path):
-            with open(env_path) as f:
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith('#') or '=' not in line:
-                        continue
-                    key, _, value = line.partition('=')
-                    os.environ.setdefault(key.strip(), value.strip())
-            break
-
-_load_env()
-
 import psycopg2
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
+import psycopg2.extras
+
+from common import get_credentials, get_db_connection, service_factory
+from drive_tree import (
+    DEFAULT_WORKERS, PageTokenExpired, apply_changes, diff_trees, fetch_all_folders,
+    fetch_folder_changes, get_start_page_token, inventory_folders, snapshot_folders,
+    tree_from_snapshot, walk_folders,
+)
 
 # ── Constants ──────────────────────────────────────────────────────────────────
 
-SCOPES = [
-    'https://www.googleapis.com/auth/drive.readonly',
-    'https://www.googleapis.com/auth/spreadsheets.readonly',
-]
 CLIENT_PROJECTS_FOLDER_ID = '1PURGWZSK1gMTJN7GDYogY1Q0_ohsUkht'
 SHARED_DRIVE_ID = '0AB1AZiOLJI_ZUk9PVA'
-TOKEN_FILE = os.path.join(os.path.dirname(__file__), 'token.json')
-SECRETS_FILE = os.path.join(os.path.dirname(__file__), 'client_secrets.json')
+STATE_FILE = os.path.join(os.path.dirname(__file__), 'drive_audit_state.json')
 
 # Tier 1: [TLA] Client Name  (TLA = 2–5 chars, starts with a letter, may contain digits e.g. N6T)
 TIER1_RE = re.compile(r'^\[([A-Z][A-Z0-9]{1,4})\]\s+(.+)$')
@@ -85,70 +76,475 @@ TIER1_RE = re.compile(r'^\[([A-Z][A-Z0-9]{1,4})\]\s+(.+)$')
 # Tier 2: [CODE] Contact Name  (CODE = letters + digits, e.g. ABC001, ZEI003)
 TIER2_RE = re.compile(r'^\[([A-Z]{2,5}\d{3,4})\]\s+(.+)$')
 
+# Tier 3: [CODE] Product Type  (plural folder label, e.g. [LMS001] Live Events)
+TIER3_RE = re.compile(r'^\[([A-Z]{2,5}\d{3,4})\]\s+(.+)$')
+
+# Tier 4: YYYY  (year the IO was signed)
+TIER4_RE = re.compile(r'^(\d{4})$')
+
+# Tier 3 folder label → product_type stored in client_product_folders.
+# Mirrors TIER3_NAME in build_blueprint.py; unlisted types use the label as-is.
+PRODUCT_TYPE_BY_FOLDER = {
+    'Live Events':               'Live Event',
+    'eBlasts':                   'eBlast',
+    'Podcasts':                  'Podcast',
+    'Newsletter Banners':        'Newsletter Banner',
+    'Website Banners':           'Website Banner',
+    'Multi-Session Live Events': 'Multi-Session Live Event',
+    'Articles':                  'Article',
+    'Ebooks':                    'Ebook',
+    'Masterclasses':             'Masterclass',
+}
+
+# Console progress line per Tier 1 status: (label, note template)
+TIER1_PROGRESS = {
+    'NON_CONFORMING': ('[SKIP]', ''),
+    'TLA_NOT_FOUND':  ('[MISS]', ' — TLA {tla} not in DB'),
+    'CONFLICT':       ('[CONF]', ' — DB has different folder ID'),
+    'ALREADY_SET':    ('[OK]',   ''),
+    'UPDATE':         ('[UPD]',  ''),
+}
+
+# Rows with these statuses matched a DB record, so their subfolders are audited too
+DESCEND_STATUSES = {'UPDATE', 'ALREADY_SET', 'CONFLICT', 'NOT_IN_DB'}
 
-# ── Google Drive auth ──────────────────────────────────────────────────────────
 
-def get_drive_service():
-    creds = None
+# ── DB helpers ─────────────────────────────────────────────────────────────────
+
+def load_db_records(cur, depth):
+    """Load the DB side of the audit for the tiers being scanned."""
+    db = {'clients_by_tla': {}, 'codes_by_code': {}, 'product_folders': {}}
+
+    cur.execute("SELECT id, tla, client_name, drive_folder_id FROM clients WHERE tla IS NOT NULL")
+    db['clients_by_tla'] = {
+        row[1]: {'id': row[0], 'name': row[2], 'existing_folder_id': row[3]}
+        for row in cur.fetchall()
+    }
 
-    if os.path.exists(TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+    if depth >= 2:
+        cur.execute("SELECT id, bsb_client_code, drive_folder_id FROM bsb_client_codes")
+        db['codes_by_code'] = {
+            row[1]: {'id': row[0], 'existing_folder_id': row[2]}
+            for row in cur.fetchall()
+        }
 
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
+    if depth >= 3:
+        # (code, product_type) → {year: {...}}
+        cur.execute("""
+            SELECT cc.bsb_client_code, cpf.product_type, cpf.year,
+                   cpf.product_type_folder_id, cpf.year_folder_id
+            FROM client_product_folders cpf
+            JOIN bsb_client_codes cc ON cc.id = cpf.client_code_id
+        """)
+        for code, product_type, year, tier3_id, tier4_id in cur.fetchall():
+            db['product_folders'].setdefault((code, product_type), {})[year] = {
+                'product_type_folder_id': tier3_id, 'year_folder_id': tier4_id,
+            }
+
+    return db
+
+
+# ── Classification ────────────────────────────────────────────────────────────
+#
+# Each classify_* function returns one CSV row for a folder. Rows with status
+# UPDATE carry what the apply step needs (db_id, and tier3_id for Tier 4,
+# see resolve_tier3_ids); the CSV writer ignores those extra keys.
+
+def _row(tier, folder, **fields):
+    row = {'tier': tier, 'name': folder['name'], 'folder_id': folder['id'],
+           'parent_id': folder.get('parent_id'), 'tla': '', 'code': '',
+           'product_type': '', 'year': '', 'status': '', 'note': ''}
+    row.update(fields)
+    return row
+
+
+def _compare(row, existing, folder_id):
+    """Set row status from the folder ID already stored in the DB."""
+    if existing and existing != folder_id:
+        row['status'] = 'CONFLICT'
+        row['note'] = f'DB already has folder_id {existing}'
+    elif existing == folder_id:
+        row['status'] = 'ALREADY_SET'
+    else:
+        row['status'] = 'UPDATE'
+    return row
+
+
+def classify_tier1(folder, db):
+    row = _row(1, folder)
+    match = TIER1_RE.match(folder['name'])
+    if not match:
+        row['status'] = 'NON_CONFORMING'
+        row['note'] = 'Name does not match [TLA] pattern'
+        return row
+
+    tla = match.group(1)
+    row['tla'] = tla
+    client = db['clients_by_tla'].get(tla)
+    if not client:
+        row['status'] = 'TLA_NOT_FOUND'
+        row['note'] = f'TLA "{tla}" not in clients table'
+        return row
+
+    row['db_id'] = client['id']
+    return _compare(row, client['existing_folder_id'], folder['id'])
+
+
+def classify_tier2(folder, parent_row, db):
+    row = _row(2, folder, tla=parent_row['tla'])
+    match = TIER2_RE.match(folder['name'])
+    if not match:
+        row['status'] = 'NON_CONFORMING'
+        row['note'] = 'Name does not match [CODE] pattern'
+        return row
+
+    code = match.group(1)
+    row['code'] = code
+    cc = db['codes_by_code'].get(code)
+    if not cc:
+        row['status'] = 'CODE_NOT_FOUND'
+        row['note'] = f'Code "{code}" not in bsb_client_codes'
+        return row
+
+    row['db_id'] = cc['id']
+    return _compare(row, cc['existing_folder_id'], folder['id'])
+
+
+def classify_tier3(folder, parent_row, db):
+    row = _row(3, folder, tla=parent_row['tla'], code=parent_row['code'])
+    match = TIER3_RE.match(folder['name'])
+    if not match:
+        row['status'] = 'NON_CONFORMING'
+        row['note'] = 'Name does not match [CODE] Product Type pattern'
+        return row
+
+    code, label = match.group(1), match.group(2).strip()
+    if code != parent_row['code']:
+        row['status'] = 'CODE_MISMATCH'
+        row['note'] = f'Code "{code}" differs from parent Tier 2 code "{parent_row["code"]}"'
+        return row
+
+    product_type = PRODUCT_TYPE_BY_FOLDER.get(label, label)
+    row['product_type'] = product_type
+    row['db_id'] = db['codes_by_code'][code]['id']
+
+    years = db['product_folders'].get((code, product_type), {})
+    stored = {y['product_type_folder_id'] for y in years.values()} - {None}
+    if not years:
+        row['status'] = 'NOT_IN_DB'
+        row['note'] = 'No client_product_folders rows yet (recorded with its Tier 4 folders)'
+    elif stored - {folder['id']}:
+        row['status'] = 'CONFLICT'
+        row['note'] = f'DB already has folder_id {", ".join(sorted(stored - {folder["id"]}))}'
+    elif None in {y['product_type_folder_id'] for y in years.values()}:
+        row['status'] = 'UPDATE'
+        row['pending_years'] = sum(1 for y in years.values() if not y['product_type_folder_id'])
+    else:
+        row['status'] = 'ALREADY_SET'
+    return row
+
+
+def classify_tier4(folder, parent_row, db):
+    row = _row(4, folder, tla=parent_row['tla'], code=parent_row['code'],
+               product_type=parent_row['product_type'])
+    match = TIER4_RE.match(folder['name'])
+    if not match:
+        row['status'] = 'NON_CONFORMING'
+        row['note'] = 'Name does not match YYYY pattern'
+        return row
+
+    year = int(match.group(1))
+    row['year'] = year
+    row['db_id'] = db['codes_by_code'][row['code']]['id']
+    if parent_row['status'] == 'CONFLICT':
+        row['status'] = 'PARENT_CONFLICT'
+        row['note'] = 'Tier 3 folder differs from the one in the DB; year not recorded'
+        return row
+
+    years = db['product_folders'].get((row['code'], row['product_type']), {})
+    stored = {y['product_type_folder_id'] for y in years.values()} - {None}
+    row['stored_tier3_id'] = stored.pop() if len(stored) == 1 else None
+    existing = years.get(year, {}).get('year_folder_id')
+    return _compare(row, existing, folder['id'])
+
+
+def audit_tree(tree, db, depth):
+    """Classify every folder in the tree, descending only below matched rows."""
+    results = []
+    classifiers = {2: classify_tier2, 3: classify_tier3, 4: classify_tier4}
+
+    def descend(parent_row, tier):
+        if tier > depth or parent_row['status'] not in DESCEND_STATUSES:
+            return
+        for sub in tree.children_of(parent_row['folder_id']):
+            sub_row = classifiers[tier](sub, parent_row, db)
+            results.append(sub_row)
+            descend(sub_row, tier + 1)
+
+    for folder in tree.tier(1):
+        row = classify_tier1(folder, db)
+        results.append(row)
+        label, note = TIER1_PROGRESS[row['status']]
+        print(f"  {label:<6} {row['name']}{note.format(**row)}")
+        descend(row, 2)
+
+    return results
+
+
+# ── Apply ─────────────────────────────────────────────────────────────────────
+#
+# All UPDATE rows are written with one set-based statement per tier, so an
+# --apply run costs a handful of round-trips to the DB however many folders
+# changed. Each statement's rowcount is checked against the plan.
+
+# tier → (SQL with a VALUES %s placeholder, row → params)
+APPLY_SQL = {
+    1: ("""
+        UPDATE clients AS c SET drive_folder_id = v.folder_id
+        FROM (VALUES %s) AS v(id, folder_id)
+        WHERE c.id = v.id
+        """, lambda r: (r['db_id'], r['folder_id'])),
+    2: ("""
+        UPDATE bsb_client_codes AS cc SET drive_folder_id = v.folder_id
+        FROM (VALUES %s) AS v(id, folder_id)
+        WHERE cc.id = v.id
+        """, lambda r: (r['db_id'], r['folder_id'])),
+    # Fill the Tier 3 ID on existing year rows only; never overwrite one
+    3: ("""
+        UPDATE client_product_folders AS cpf SET product_type_folder_id = v.folder_id
+        FROM (VALUES %s) AS v(client_code_id, product_type, folder_id)
+        WHERE cpf.client_code_id = v.client_code_id
+          AND cpf.product_type = v.product_type
+          AND cpf.product_type_folder_id IS NULL
+        """, lambda r: (r['db_id'], r['product_type'], r['folder_id'])),
+    # Like upsert_product_folder(), but a stored Tier 3 ID is never replaced,
+    # and one that differs from the ID on the product type's other years is
+    # written as NULL (the row is still recorded, so rowcounts match the plan)
+    4: ("""
+        INSERT INTO client_product_folders
+            (client_code_id, product_type, year, product_type_folder_id, year_folder_id)
+        SELECT v.client_code_id, v.product_type, v.year,
+               CASE WHEN NOT EXISTS (
+                   SELECT 1 FROM client_product_folders o
+                   WHERE o.client_code_id = v.client_code_id
+                     AND o.product_type = v.product_type
+                     AND o.product_type_folder_id IS NOT NULL
+                     AND o.product_type_folder_id IS DISTINCT FROM v.tier3_id
+               ) THEN v.tier3_id END,
+               v.year_folder_id
+        FROM (VALUES %s) AS v(client_code_id, product_type, year, tier3_id, year_folder_id)
+        ON CONFLICT (client_code_id, product_type, year) DO UPDATE SET
+            product_type_folder_id = COALESCE(client_product_folders.product_type_folder_id,
+                                              EXCLUDED.product_type_folder_id),
+            year_folder_id = EXCLUDED.year_folder_id
+        """, lambda r: (r['db_id'], r['product_type'], r['year'], r['tier3_id'], r['folder_id'])),
+}
+
+# Identifies the DB record an UPDATE row writes to
+TARGET_KEY = {
+    1: lambda r: r['db_id'],
+    2: lambda r: r['db_id'],
+    3: lambda r: (r['db_id'], r['product_type']),
+    4: lambda r: (r['db_id'], r['product_type'], r['year']),
+}
+
+
+def resolve_tier3_ids(results):
+    """Set tier3_id, the product_type_folder_id recorded with a new year
+    row, on Tier 4 UPDATE rows. It is the parent folder only if the DB
+    already stores that ID for the code and product type, or the parent is
+    the only Tier 3 folder found for them; otherwise NULL. Year rows under
+    a Tier 3 that another folder also maps to become PARENT_CONFLICT."""
+    candidates = {}
+    for row in results:
+        if row['tier'] == 3 and row['status'] in ('UPDATE', 'ALREADY_SET', 'NOT_IN_DB'):
+            candidates.setdefault((row['db_id'], row['product_type']), set()).add(row['folder_id'])
+
+    for row in results:
+        if row['tier'] != 4 or row['status'] != 'UPDATE':
+            continue
+        found = candidates.get((row['db_id'], row['product_type']), set())
+        if len(found) > 1:
+            row['status'] = 'PARENT_CONFLICT'
+            row['note'] = 'Several Tier 3 folders map to this product type: ' + ', '.join(sorted(found))
+        elif row['parent_id'] == row.get('stored_tier3_id') or found == {row['parent_id']}:
+            row['tier3_id'] = row['parent_id']
+        else:
+            row['tier3_id'] = None
+
+
+def plan_updates(results):
+    """Group UPDATE rows by tier. Where two folders would write the same DB
+    record, neither is written and both are marked DUPLICATE."""
+    resolve_tier3_ids(results)
+    by_target = {}
+    for row in results:
+        if row['status'] == 'UPDATE':
+            key = (row['tier'], TARGET_KEY[row['tier']](row))
+            by_target.setdefault(key, []).append(row)
+
+    plan = {tier: [] for tier in APPLY_SQL}
+    for (tier, _), rows in by_target.items():
+        if len(rows) > 1:
+            for row in rows:
+                row['status'] = 'DUPLICATE'
+                row['note'] = 'Another folder would write the same DB record: ' + ', '.join(
+                    r['folder_id'] for r in rows if r is not row)
+        else:
+            plan[tier].append(rows[0])
+    return plan
+
+
+def plan_conflicts(plan):
+    """Problems that make the plan unsafe to apply: a code and product type
+    that would be given more than one Tier 3 ID (Tier 3 fills plus the
+    Tier 3 IDs recorded with new year rows)."""
+    tier3_ids = {}
+    for row in plan.get(3, []):
+        tier3_ids.setdefault((row['code'], row['product_type']), set()).add(row['folder_id'])
+    for row in plan.get(4, []):
+        if row.get('tier3_id'):
+            tier3_ids.setdefault((row['code'], row['product_type']), set()).add(row['tier3_id'])
+    return [f"{code} {product_type}: Tier 3 IDs {', '.join(sorted(ids))}"
+            for (code, product_type), ids in sorted(tier3_ids.items()) if len(ids) > 1]
+
+
+def apply_updates(cur, plan):
+    """Flush the plan, one statement per tier (Tier 3 before Tier 4 inserts).
+    Returns [(tier, planned_rows, affected_rows), ...]."""
+    counts = []
+    for tier in sorted(plan):
+        rows = plan[tier]
+        if not rows:
+            continue
+        sql, params = APPLY_SQL[tier]
+        psycopg2.extras.execute_values(cur, sql, [params(r) for r in rows],
+                                       page_size=len(rows))
+        expected = sum(r.get('pending_years', 1) for r in rows)
+        counts.append((tier, expected, cur.rowcount))
+    return counts
+
+
+# ── Incremental audit ─────────────────────────────────────────────────────────
+
+def load_state(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(path, page_token, snapshot):
+    """Write the state file atomically so an interrupted run keeps the old one."""
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'page_token': page_token, 'folders': snapshot}, f)
+    os.replace(tmp, path)
+
+
+def db_folder_refs(db):
+    """{folder_id: description} for every folder ID stored in the DB."""
+    refs = {}
+    for tla, client in db['clients_by_tla'].items():
+        if client['existing_folder_id']:
+            refs[client['existing_folder_id']] = f'clients.drive_folder_id ({tla})'
+    for code, cc in db['codes_by_code'].items():
+        if cc['existing_folder_id']:
+            refs[cc['existing_folder_id']] = f'bsb_client_codes.drive_folder_id ({code})'
+    for (code, product_type), years in db['product_folders'].items():
+        for year, cpf in years.items():
+            if cpf['product_type_folder_id']:
+                refs[cpf['product_type_folder_id']] = (
+                    f'client_product_folders.product_type_folder_id ({code} {product_type})')
+            refs[cpf['year_folder_id']] = (
+                f'client_product_folders.year_folder_id ({code} {product_type} {year})')
+    return refs
+
+
+def classify_node(tree, node, db, cache):
+    """Classify one folder by classifying its ancestor chain first.
+    Returns None if an ancestor did not match a DB record."""
+    if node['id'] in cache:
+        return cache[node['id']]
+    if node['tier'] == 1:
+        row = classify_tier1(node, db)
+    else:
+        parent_row = classify_node(tree, tree.folders[node['parent_id']], db, cache)
+        if parent_row is None or parent_row['status'] not in DESCEND_STATUSES:
+            row = None
         else:
-            if not os.path.exists(SECRETS_FILE):
-                print(f"ERROR: {SECRETS_FILE} not found.")
-                print("See script docstring for setup instructions.")
-                sys.exit(1)
-            flow = InstalledAppFlow.from_client_secrets_file(SECRETS_FILE, SCOPES)
-            creds = flow.run_local_server(port=0)
-
-        with open(TOKEN_FILE, 'w') as f:
-            f.write(creds.to_json())
-
-    return build('drive', 'v3', credentials=creds)
-
-
-# ── Drive helpers ──────────────────────────────────────────────────────────────
-
-def list_folders(service, parent_id):
-    """Return all (non-trashed) subfolders of parent_id in the Shared Drive."""
-    folders = []
-    page_token = None
-    while True:
-        resp = service.files().list(
-            q=(
-                f"'{parent_id}' in parents"
-                " and mimeType='application/vnd.google-apps.folder'"
-                " and trashed=false"
-            ),
-            fields='nextPageToken, files(id, name)',
-            includeItemsFromAllDrives=True,
-            supportsAllDrives=True,
-            corpora='drive',
-            driveId=SHARED_DRIVE_ID,
-            pageToken=page_token,
-        ).execute()
-        folders.extend(resp.get('files', []))
-        page_token = resp.get('nextPageToken')
-        if not page_token:
-            break
-    return folders
+            classifier = {2: classify_tier2, 3: classify_tier3, 4: classify_tier4}[node['tier']]
+            row = classifier(node, parent_row, db)
+    cache[node['id']] = row
+    return row
 
 
-# ── DB helpers ─────────────────────────────────────────────────────────────────
+def audit_changes(old_tree, new_tree, new_snapshot, db):
+    """Diff two trees and classify only the folders that changed (plus the
+    descendants of renamed/moved folders, whose context changed with them)."""
+    results = []
+    refs = db_folder_refs(db)
+    affected = {}
+
+    for change, before, node in diff_trees(old_tree, new_tree):
+        if node is None:
+            change = 'MOVED' if before['id'] in new_snapshot else 'TRASHED'
+            row = _row(before['tier'], before, change=change, old_name=before['name'])
+            if before['id'] in refs:
+                row['status'] = 'STALE_IN_DB'
+                row['note'] = f"No longer under Client Projects but stored in {refs[before['id']]}"
+            else:
+                row['status'] = 'REMOVED'
+                row['note'] = 'No longer under Client Projects'
+            results.append(row)
+            continue
 
-def get_db_connection():
-    return psycopg2.connect(
-        host=os.environ['DB_HOST'],
-        dbname=os.environ.get('DB_NAME', 'bitesize_bio'),
-        user=os.environ['DB_USER'],
-        password=os.environ['DB_PASS'],
-        port=int(os.environ.get('DB_PORT', 5432)),
-        connect_timeout=15,
-    )
+        affected[node['id']] = (change, before)
+        if change in ('RENAMED', 'MOVED'):
+            stack = list(new_tree.children.get(node['id'], []))
+            while stack:
+                sub = stack.pop()
+                affected.setdefault(sub['id'], ('PARENT_CHANGED', old_tree.folders.get(sub['id'])))
+                stack.extend(new_tree.children.get(sub['id'], []))
+
+    cache = {}
+    for folder_id, (change, before) in affected.items():
+        node = new_tree.folders[folder_id]
+        row = classify_node(new_tree, node, db, cache)
+        if row is None:
+            row = _row(node['tier'], node, status='PARENT_UNMATCHED',
+                       note='A parent folder does not match a DB record')
+        row = dict(row, change=change, old_name=before['name'] if before else '')
+        results.append(row)
+        print(f"  [{change}] tier {row['tier']}  {row['name']} — {row['status']}")
+
+    results.sort(key=lambda r: (r['tier'], r['name']))
+    return results
+
+
+def scan_incremental(service, state, db, depth):
+    """Run an incremental audit from saved state (or a baseline if there is none).
+    Returns (results, new_page_token, new_snapshot, is_diff)."""
+    if state is None:
+        print("No saved state — running a full inventory as the baseline.")
+        page_token = get_start_page_token(service, SHARED_DRIVE_ID)
+        snapshot = snapshot_folders(fetch_all_folders(service, SHARED_DRIVE_ID))
+        tree = tree_from_snapshot(snapshot, CLIENT_PROJECTS_FOLDER_ID, depth)
+        return audit_tree(tree, db, depth), page_token, snapshot, False
+
+    old_snapshot = state['folders']
+    try:
+        changes, page_token = fetch_folder_changes(service, SHARED_DRIVE_ID, state['page_token'])
+        snapshot, changed = apply_changes(old_snapshot, changes)
+        print(f"{len(changes)} change(s) since last run, {len(changed)} folder(s) affected\n")
+    except PageTokenExpired:
+        print("Saved page token has expired — falling back to a full rescan.\n")
+        page_token = get_start_page_token(service, SHARED_DRIVE_ID)
+        snapshot = snapshot_folders(fetch_all_folders(service, SHARED_DRIVE_ID))
+
+    old_tree = tree_from_snapshot(old_snapshot, CLIENT_PROJECTS_FOLDER_ID, depth)
+    new_tree = tree_from_snapshot(snapshot, CLIENT_PROJECTS_FOLDER_ID, depth)
+    return audit_changes(old_tree, new_tree, snapshot, db), page_token, snapshot, True
 
 
 # ── Main ───────────────────────────────────────────────────────────────────────
@@ -158,15 +554,33 @@ def main():
     parser.add_argument('--apply', action='store_true',
                         help='Write folder IDs to DB (default: dry-run)')
     parser.add_argument('--tier2', action='store_true',
-                        help='Also scan Tier 2 subfolders (slower)')
+                        help='Also scan Tier 2 subfolders')
+    parser.add_argument('--tier4', action='store_true',
+                        help='Also scan Tier 3 (product type) and Tier 4 (year) folders; implies --tier2')
+    parser.add_argument('--inventory', action='store_true',
+                        help='List every folder in the shared drive in a few paginated '
+                             'calls and build the tree locally (fastest for full audits)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Concurrent Drive queries per tier (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only audit folders changed since the last --apply run '
+                             '(Drive Changes feed); the CSV becomes a diff')
+    parser.add_argument('--state', default=STATE_FILE,
+                        help='Incremental state file (default: scripts/drive_audit_state.json)')
     parser.add_argument('--output', default='audit_results.csv',
                         help='CSV output file (default: audit_results.csv)')
     args = parser.parse_args()
 
+    depth = 4 if args.tier4 else 2 if args.tier2 else 1
+
     print(f"Mode: {'APPLY' if args.apply else 'DRY-RUN'}")
-    print(f"Tier 2 scan: {'yes' if args.tier2 else 'no (pass --tier2 to enable)'}\n")
+    print(f"Tiers scanned: 1–{depth}" if depth > 1 else
+          "Tiers scanned: 1 (pass --tier2 or --tier4 to go deeper)")
+    listing = ('incremental (Changes feed)' if args.incremental else
+               'bulk inventory' if args.inventory else 'breadth-first walk')
+    print(f"Drive listing: {listing}\n")
 
-    service = get_drive_service()
+    drive_factory = service_factory('drive', 'v3', get_credentials())
 
     try:
         conn = get_db_connection()
@@ -176,126 +590,61 @@ def main():
         sys.exit(1)
 
     cur = conn.cursor()
+    db = load_db_records(cur, depth)
 
-    # Load DB records
-    cur.execute("SELECT id, tla, client_name, drive_folder_id FROM clients WHERE tla IS NOT NULL")
-    clients_by_tla = {
-        row[1]: {'id': row[0], 'name': row[2], 'existing_folder_id': row[3]}
-        for row in cur.fetchall()
-    }
-
-    codes_by_code = {}
-    if args.tier2:
-        cur.execute("SELECT id, bsb_client_code, drive_folder_id FROM bsb_client_codes")
-        codes_by_code = {
-            row[1]: {'id': row[0], 'existing_folder_id': row[2]}
-            for row in cur.fetchall()
-        }
-
-    results = []
-
-    # ── Tier 1 ────────────────────────────────────────────────────────────────
     print(f"Scanning Client Projects ({CLIENT_PROJECTS_FOLDER_ID})...")
-    tier1_folders = list_folders(service, CLIENT_PROJECTS_FOLDER_ID)
-    print(f"Found {len(tier1_folders)} Tier 1 folders\n")
-
-    for folder in sorted(tier1_folders, key=lambda f: f['name']):
-        name = folder['name']
-        folder_id = folder['id']
-        row = {'tier': 1, 'name': name, 'folder_id': folder_id,
-               'tla': '', 'code': '', 'status': '', 'note': ''}
-
-        match = TIER1_RE.match(name)
-        if not match:
-            row['status'] = 'NON_CONFORMING'
-            row['note'] = 'Name does not match [TLA] pattern'
-            results.append(row)
-            print(f"  [SKIP] {name}")
-            continue
-
-        tla = match.group(1)
-        row['tla'] = tla
-
-        if tla not in clients_by_tla:
-            row['status'] = 'TLA_NOT_FOUND'
-            row['note'] = f'TLA "{tla}" not in clients table'
-            results.append(row)
-            print(f"  [MISS] {name} — TLA {tla} not in DB")
-            continue
-
-        client = clients_by_tla[tla]
-        existing = client['existing_folder_id']
-
-        if existing and existing != folder_id:
-            row['status'] = 'CONFLICT'
-            row['note'] = f'DB already has folder_id {existing}'
-            results.append(row)
-            print(f"  [CONF] {name} — DB has different folder ID")
-        elif existing == folder_id:
-            row['status'] = 'ALREADY_SET'
-            results.append(row)
-            print(f"  [OK]   {name}")
+    is_diff = False
+    if args.incremental:
+        results, page_token, snapshot, is_diff = scan_incremental(
+            drive_factory(), load_state(args.state), db, depth)
+    else:
+        if args.inventory:
+            tree = inventory_folders(drive_factory(), CLIENT_PROJECTS_FOLDER_ID,
+                                     SHARED_DRIVE_ID, depth)
         else:
-            row['status'] = 'UPDATE'
-            results.append(row)
-            print(f"  [UPD]  {name}")
-            if args.apply:
-                cur.execute(
-                    "UPDATE clients SET drive_folder_id = %s WHERE id = %s",
-                    (folder_id, client['id'])
-                )
-
-        # ── Tier 2 ────────────────────────────────────────────────────────────
-        if args.tier2:
-            tier2_folders = list_folders(service, folder_id)
-            for sub in sorted(tier2_folders, key=lambda f: f['name']):
-                sub_name = sub['name']
-                sub_id = sub['id']
-                sub_row = {'tier': 2, 'name': sub_name, 'folder_id': sub_id,
-                           'tla': tla, 'code': '', 'status': '', 'note': ''}
-
-                sub_match = TIER2_RE.match(sub_name)
-                if not sub_match:
-                    sub_row['status'] = 'NON_CONFORMING'
-                    sub_row['note'] = 'Name does not match [CODE] pattern'
-                    results.append(sub_row)
-                    continue
-
-                code = sub_match.group(1)
-                sub_row['code'] = code
-
-                if code not in codes_by_code:
-                    sub_row['status'] = 'CODE_NOT_FOUND'
-                    sub_row['note'] = f'Code "{code}" not in bsb_client_codes'
-                    results.append(sub_row)
-                    continue
-
-                cc = codes_by_code[code]
-                sub_existing = cc['existing_folder_id']
-
-                if sub_existing and sub_existing != sub_id:
-                    sub_row['status'] = 'CONFLICT'
-                    sub_row['note'] = f'DB already has folder_id {sub_existing}'
-                elif sub_existing == sub_id:
-                    sub_row['status'] = 'ALREADY_SET'
-                else:
-                    sub_row['status'] = 'UPDATE'
-                    if args.apply:
-                        cur.execute(
-                            "UPDATE bsb_client_codes SET drive_folder_id = %s WHERE id = %s",
-                            (sub_id, cc['id'])
-                        )
-
-                results.append(sub_row)
-
-    if args.apply:
-        conn.commit()
-        print("\nChanges committed to DB.")
+            tree = walk_folders(drive_factory, CLIENT_PROJECTS_FOLDER_ID, SHARED_DRIVE_ID,
+                                depth=depth, workers=args.workers)
+        print(f"Found {len(tree.tier(1))} Tier 1 folders ({len(tree)} folders in tiers 1–{depth})\n")
+        results = audit_tree(tree, db, depth)
+
+    plan = plan_updates(results)
+    conflicts = plan_conflicts(plan)
+    for problem in conflicts:
+        print(f"ERROR: more than one Tier 3 folder planned for {problem}")
+
+    # A failed --apply still writes the CSV and summary below, then exits 1
+    failed = False
+    if args.apply and conflicts:
+        print("Not applied — no DB changes made. Resolve the Tier 3 folders above first.")
+        failed = True
+    elif args.apply:
+        written = apply_updates(cur, plan)
+        mismatched = [(tier, planned, affected) for tier, planned, affected in written
+                      if planned != affected]
+        if mismatched:
+            conn.rollback()
+            for tier, planned, affected in mismatched:
+                print(f"ERROR: Tier {tier} update planned {planned} row(s) but affected {affected}")
+            print("Rolled back — no DB changes made. Re-run to refresh the plan.")
+            failed = True
+        else:
+            conn.commit()
+            for tier, planned, affected in written:
+                print(f"  Tier {tier}: {affected} row(s) written")
+            print("\nChanges committed to DB.")
+            if args.incremental:
+                # Only advance the saved state once the DB reflects it, so a dry-run
+                # followed by --apply sees the same diff.
+                save_state(args.state, page_token, snapshot)
+                print(f"Incremental state saved to {args.state}")
     else:
         print("\nDry-run complete — no DB changes made. Pass --apply to write to DB.")
 
     # Write CSV
-    fieldnames = ['tier', 'name', 'folder_id', 'tla', 'code', 'status', 'note']
+    fieldnames = ['tier', 'name', 'folder_id', 'tla', 'code', 'product_type', 'year',
+                  'status', 'note']
+    if is_diff:
+        fieldnames = ['change', 'tier', 'name', 'old_name'] + fieldnames[2:]
     with open(args.output, 'w', newline='') as f:
         writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
         writer.writeheader()
@@ -308,10 +657,15 @@ def main():
     print("\nSummary:")
     for status, count in sorted(counts.items()):
         print(f"  {status:<20} {count}")
-    print(f"\n  {total_updates} folder ID(s) {'written to DB' if args.apply else 'ready to update (re-run with --apply)'}")
+    if failed:
+        print(f"\n  {total_updates} folder ID(s) not written (see errors above)")
+    else:
+        print(f"\n  {total_updates} folder ID(s) {'written to DB' if args.apply else 'ready to update (re-run with --apply)'}")
 
     cur.close()
     conn.close()
+    if failed:
+        sys.exit(1)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+upsert_milestone Write Benchmark
+================================
+Measures the writes caused by idempotent upsert_milestone calls — the common
+case under frequent Asana webhooks — for the deployed function and for the
+previous delete-and-reinsert implementation (created as a pg_temp function
+for the comparison).
+
+Each variant runs in its own transaction: seed --milestones milestones with
+two strategic bet tags each, then repeat the identical calls --rounds times
+and read the per-transaction counters in pg_stat_xact_user_tables plus the
+WAL bytes generated. Everything is rolled back, so it is safe to point at any
+database that has the schema and functions loaded.
+
+Usage:
+    python3 scripts/bench_milestone_upsert.py
+    python3 scripts/bench_milestone_upsert.py --milestones 500 --rounds 5
+"""
+
+import sys
+import time
+import argparse
+
+from common import get_db_connection
+
+# ── Constants ──────────────────────────────────────────────────────────────────
+
+TABLES = ('milestones', 'milestone_bet_tags')
+
+# upsert_milestone as it was before the tag diff / unchanged-row skip
+LEGACY_FUNCTION = """
+CREATE FUNCTION pg_temp.upsert_milestone_legacy(
+    p_asana_id TEXT,
+    p_project_asana_id TEXT,
+    p_name TEXT,
+    p_target_date DATE,
+    p_completed BOOLEAN,
+    p_focus_cycle TEXT,
+    p_strategic_bet_tags TEXT DEFAULT NULL
+) RETURNS VOID AS $fn$
+DECLARE
+    v_project_id INTEGER;
+    v_milestone_id INTEGER;
+    v_status TEXT;
+    v_tag TEXT;
+BEGIN
+    SELECT id INTO v_project_id FROM projects WHERE asana_project_id = p_project_asana_id;
+
+    v_status := CASE WHEN p_completed THEN 'complete' ELSE 'upcoming' END;
+
+    INSERT INTO milestones (
+        asana_milestone_id, code, project_id, name, target_date, status, focus_cycle_id
+    )
+    VALUES (
+        p_asana_id,
+        'M-' || p_asana_id,
+        v_project_id,
+        p_name,
+        p_target_date,
+        v_status,
+        (SELECT id FROM focus_cycles WHERE code = REPLACE(p_focus_cycle, '2026 ', ''))
+    )
+    ON CONFLICT (asana_milestone_id) DO UPDATE SET
+        name = EXCLUDED.name,
+        target_date = EXCLUDED.target_date,
+        status = v_status,
+        focus_cycle_id = (SELECT id FROM focus_cycles WHERE code = REPLACE(p_focus_cycle, '2026 ', '')),
+        updated_at = NOW()
+    RETURNING id INTO v_milestone_id;
+
+    IF p_strategic_bet_tags IS NOT NULL AND p_strategic_bet_tags != '' THEN
+        DELETE FROM milestone_bet_tags WHERE milestone_id = v_milestone_id;
+
+        FOREACH v_tag IN ARRAY string_to_array(p_strategic_bet_tags, ',')
+        LOOP
+            INSERT INTO milestone_bet_tags (milestone_id, strategic_bet_tag_id)
+            SELECT v_milestone_id, sbt.id
+            FROM strategic_bet_tags sbt
+            WHERE sbt.name = TRIM(v_tag)
+            ON CONFLICT (milestone_id, strategic_bet_tag_id) DO NOTHING;
+        END LOOP;
+    END IF;
+END;
+$fn$ LANGUAGE plpgsql
+"""
+
+VARIANTS = {
+    'legacy':  'pg_temp.upsert_milestone_legacy',
+    'current': 'upsert_milestone',
+}
+
+
+# ── Measurement ────────────────────────────────────────────────────────────────
+
+def table_counters(cur):
+    """{table: (inserted, updated, deleted)} for this transaction so far."""
+    cur.execute("""
+        SELECT relname, n_tup_ins, n_tup_upd, n_tup_del
+        FROM pg_stat_xact_user_tables
+        WHERE relname = ANY(%s)
+    """, (list(TABLES),))
+    counts = {t: (0, 0, 0) for t in TABLES}
+    counts.update({row[0]: tuple(row[1:]) for row in cur.fetchall()})
+    return counts
+
+
+def wal_lsn(cur):
+    cur.execute("SELECT pg_current_wal_insert_lsn()")
+    return cur.fetchone()[0]
+
+
+def calls_for(n, tags, cycle):
+    return [
+        (f'bench-{i}', 'bench-no-project', f'Bench milestone {i}',
+         f'2026-0{1 + i % 9}-15', i % 4 == 0, f'2026 {cycle}', tags)
+        for i in range(n)
+    ]
+
+
+def run_variant(conn, function, calls, rounds):
+    """Seed, then time `rounds` idempotent passes. Rolls back. Returns a result dict."""
+    cur = conn.cursor()
+    sql = f"SELECT {function}(%s, %s, %s, %s, %s, %s, %s)"
+    try:
+        for args in calls:
+            cur.execute(sql, args)
+
+        before, lsn_before = table_counters(cur), wal_lsn(cur)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for args in calls:
+                cur.execute(sql, args)
+        elapsed = time.perf_counter() - start
+        after, lsn_after = table_counters(cur), wal_lsn(cur)
+
+        cur.execute("SELECT pg_wal_lsn_diff(%s, %s)", (lsn_after, lsn_before))
+        wal_bytes = int(cur.fetchone()[0])
+    finally:
+        conn.rollback()
+        cur.close()
+
+    n = len(calls) * rounds
+    writes = {t: tuple(a - b for a, b in zip(after[t], before[t])) for t in TABLES}
+    return {
+        'calls': n,
+        'writes': writes,
+        'rows_written_per_call': sum(sum(w) for w in writes.values()) / n,
+        'wal_bytes_per_call': wal_bytes / n,
+        'ms_per_call': elapsed * 1000 / n,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark writes per idempotent upsert_milestone call')
+    parser.add_argument('--milestones', type=int, default=200,
+                        help='Milestones to seed and re-upsert (default: 200)')
+    parser.add_argument('--rounds', type=int, default=3,
+                        help='Idempotent passes over all milestones (default: 3)')
+    args = parser.parse_args()
+
+    try:
+        conn = get_db_connection()
+    except KeyError as e:
+        print(f"ERROR: missing env var {e}. Set DB_HOST, DB_NAME, DB_USER, DB_PASS.")
+        sys.exit(1)
+
+    cur = conn.cursor()
+    cur.execute("SELECT name FROM strategic_bet_tags ORDER BY id LIMIT 2")
+    tags = ', '.join(row[0] for row in cur.fetchall())
+    cur.execute("SELECT code FROM focus_cycles ORDER BY start_date LIMIT 1")
+    row = cur.fetchone()
+    if not tags or not row:
+        print("ERROR: strategic_bet_tags and focus_cycles must have seed rows.")
+        sys.exit(1)
+    cur.execute(LEGACY_FUNCTION)
+    conn.commit()
+    cur.close()
+
+    calls = calls_for(args.milestones, tags, row[0])
+    print(f"{args.milestones} milestones x {args.rounds} idempotent round(s), tags: {tags}\n")
+    print(f"{'variant':<9} {'table':<20} {'ins':>7} {'upd':>7} {'del':>7}")
+
+    results = {}
+    for name, function in VARIANTS.items():
+        results[name] = r = run_variant(conn, function, calls, args.rounds)
+        for table, (ins, upd, dele) in r['writes'].items():
+            print(f"{name:<9} {table:<20} {ins:>7} {upd:>7} {dele:>7}")
+
+    print(f"\n{'variant':<9} {'rows/call':>10} {'WAL B/call':>11} {'ms/call':>8}")
+    for name, r in results.items():
+        print(f"{name:<9} {r['rows_written_per_call']:>10.2f} "
+              f"{r['wal_bytes_per_call']:>11.0f} {r['ms_per_call']:>8.3f}")
+
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,599 @@
+#!/usr/bin/env python3
+"""
+Strategy Schema Benchmark
+=========================
+Seeds a local PostgreSQL database with synthetic data at configurable
+volumes, then times every view, every Metabase question
+(docs/metabase-queries.md) and the functions.sql functions — single caller
+and --workers concurrent callers — and writes a JSON (and optionally CSV)
+report that can be diffed between runs.
+
+Usage:
+    python3 scripts/bench_schema.py --seed                      # default volumes, then benchmark
+    python3 scripts/bench_schema.py --seed --scale 20 --out bench-x20.json
+    python3 scripts/bench_schema.py --seed --clients 2000 --ios 20000
+    python3 scripts/bench_schema.py --out bench.json --csv bench.csv   # existing data
+    python3 scripts/bench_schema.py --workers 8 --calls 400
+    python3 scripts/bench_schema.py --diff before.json after.json
+
+Seeding
+-------
+--seed truncates the project, milestone, check-in, client and IO tables and
+refills them with generate_series inserts (deterministic for a given
+--random-seed). Strategic bets, tags, focus cycles and departments keep
+their schema.sql seed rows; extra bets/tags are added if --bets / --tags
+ask for more. Focus cycle statuses are set from today's date so the weekly
+report has an active cycle. Seeding refuses to run against a database
+named bitesize_bio (the production database).
+
+Volumes are the VOLUMES defaults times --scale, overridden per entity by
+the matching option (--projects, --milestones, ...).
+
+Benchmark
+---------
+Queries run --repeat times each. Function cases run --calls times each,
+every call in its own transaction that is rolled back, so the seeded data
+is the same for every case and every run. Concurrent cases split --calls
+over --workers threads, each with its own connection, drawing arguments
+from the same pool so callers contend the way simultaneous Make.com
+executions would. Functions missing from the DB are reported and skipped.
+
+Each result row has kind (view / metabase / report / function), name, mode
+(single / concurrent), workers, calls, median/p95/min ms, calls per second,
+rows and errors.
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import threading
+from datetime import datetime, timezone
+
+from common import get_db_connection
+from explain_dashboard_queries import REPORT_QUERIES, apply_params, load_doc_queries, view_queries
+
+# ── Constants ──────────────────────────────────────────────────────────────────
+
+PRODUCTION_DB = 'bitesize_bio'
+
+# Rows per entity at --scale 1. *_per_* values are ratios and do not scale.
+VOLUMES = {
+    'bets':                 5,
+    'tags':                 4,
+    'users':                40,
+    'projects':             200,
+    'milestones':           2000,
+    'tags_per_milestone':   2,
+    'strategy_milestones':  40,
+    'checkins':             5000,
+    'clients':              100,
+    'codes_per_client':     3,
+    'folders_per_code':     2,
+    'ios':                  1000,
+    'products_per_io':      3,
+}
+RATIOS = {'bets', 'tags', 'tags_per_milestone', 'codes_per_client', 'folders_per_code', 'products_per_io'}
+
+PRODUCT_TYPES = ['Webinar', 'Article', 'Video', 'eBook', 'Newsletter', 'Podcast']
+
+# Seeded data is replaced by --seed; reference tables are not touched
+SEEDED_TABLES = [
+    'milestone_bet_tags', 'milestones', 'progress_snapshots', 'projects', 'proposals',
+    'strategy_milestones', 'users', 'checkin_responses', 'io_products', 'insertion_orders',
+    'client_product_folders', 'bsb_client_codes', 'clients',
+    'client_sheet_sync_state', 'project_status_counts', 'strategy_milestone_counts',
+]
+
+DEFAULT_REPEAT = 5
+DEFAULT_CALLS = 200
+DEFAULT_WORKERS = 4
+BATCH_SIZE = 100
+
+CSV_COLUMNS = ['kind', 'name', 'mode', 'workers', 'calls', 'median_ms', 'p95_ms', 'min_ms',
+               'calls_per_s', 'rows', 'errors']
+
+
+# ── Seeding ────────────────────────────────────────────────────────────────────
+
+SEED_SQL = [
+    # Extra bets / tags beyond the schema.sql seed rows
+    """INSERT INTO strategic_bets (code, name)
+       SELECT 'S' || lpad(g::text, 2, '0'), 'Synthetic bet ' || g
+       FROM generate_series((SELECT COUNT(*) FROM strategic_bets) + 1, %(bets)s) g""",
+    """INSERT INTO strategic_bet_tags (name)
+       SELECT 'Synthetic tag ' || g
+       FROM generate_series((SELECT COUNT(*) FROM strategic_bet_tags) + 1, %(tags)s) g""",
+
+    """UPDATE focus_cycles SET status = CASE
+           WHEN end_date < CURRENT_DATE THEN 'complete'
+           WHEN start_date <= CURRENT_DATE THEN 'active'
+           ELSE 'upcoming' END""",
+
+    """INSERT INTO users (asana_user_id, first_name, last_name, department_id)
+       SELECT 'seed-u-' || g, 'First' || g, 'Last' || g,
+              (SELECT id FROM departments ORDER BY id OFFSET g %% (SELECT COUNT(*) FROM departments) LIMIT 1)
+       FROM generate_series(1, %(users)s) g""",
+
+    """WITH b AS (SELECT array_agg(id ORDER BY id) AS ids FROM strategic_bets),
+            d AS (SELECT array_agg(id ORDER BY id) AS ids FROM departments),
+            c AS (SELECT array_agg(id ORDER BY start_date) AS ids FROM focus_cycles),
+            u AS (SELECT array_agg(id ORDER BY id) AS ids FROM users)
+       INSERT INTO projects (asana_project_id, code, name, strategic_bet_id, owning_department_id,
+                             project_lead, project_lead_id, status, percent_complete,
+                             start_cycle_id, end_cycle_id, project_type)
+       SELECT 'seed-p-' || g, 'P-seed-p-' || g, 'Project ' || g,
+              CASE WHEN random() < 0.15 THEN NULL ELSE b.ids[1 + floor(random() * cardinality(b.ids))::int] END,
+              d.ids[1 + floor(random() * cardinality(d.ids))::int],
+              'First' || lead_no || ' Last' || lead_no, u.ids[lead_no],
+              (ARRAY['not_started', 'on_track', 'on_track', 'at_risk', 'blocked',
+                     'on_hold', 'complete', 'cancelled'])[1 + floor(random() * 8)::int],
+              round((random() * 100)::numeric, 2),
+              c.ids[start_no],
+              CASE WHEN random() < 0.2 THEN NULL
+                   ELSE c.ids[LEAST(cardinality(c.ids), start_no + floor(random() * 3)::int)] END,
+              'Standard Project'
+       FROM generate_series(1, %(projects)s) g, b, d, c, u,
+            LATERAL (SELECT 1 + floor(random() * cardinality(u.ids))::int AS lead_no,
+                            1 + floor(random() * cardinality(c.ids))::int AS start_no
+                     WHERE g > 0) r""",
+
+    """WITH c AS (SELECT array_agg(id ORDER BY start_date) AS ids, MIN(start_date) AS first,
+                         MAX(end_date) AS last FROM focus_cycles),
+            p AS (SELECT array_agg(id ORDER BY id) AS ids FROM projects)
+       INSERT INTO milestones (asana_milestone_id, code, project_id, name, target_date, status, focus_cycle_id)
+       SELECT 'seed-m-' || g, 'M-seed-m-' || g, p.ids[1 + floor(random() * cardinality(p.ids))::int],
+              'Milestone ' || g, due,
+              CASE WHEN due < CURRENT_DATE
+                   THEN (ARRAY['complete', 'complete', 'complete', 'blocked', 'cancelled'])[1 + floor(random() * 5)::int]
+                   ELSE (ARRAY['upcoming', 'upcoming', 'in_progress', 'complete'])[1 + floor(random() * 4)::int] END,
+              (SELECT fc.id FROM focus_cycles fc WHERE due BETWEEN fc.start_date AND fc.end_date + 7
+               ORDER BY fc.start_date LIMIT 1)
+       FROM generate_series(1, %(milestones)s) g, c, p,
+            LATERAL (SELECT c.first + floor(random() * (c.last - c.first + 1))::int AS due WHERE g > 0) r""",
+
+    """INSERT INTO milestone_bet_tags (milestone_id, strategic_bet_tag_id)
+       SELECT m.id, t.id
+       FROM milestones m
+       CROSS JOIN LATERAL (
+           SELECT id FROM strategic_bet_tags
+           ORDER BY md5(m.id::text || '-' || id::text)
+           LIMIT m.id %% (%(tags_per_milestone)s + 1)
+       ) t""",
+
+    """INSERT INTO strategy_milestones (strategic_bet_id, name, target_quarter, status)
+       SELECT (SELECT id FROM strategic_bets ORDER BY id OFFSET g %% (SELECT COUNT(*) FROM strategic_bets) LIMIT 1),
+              'Strategy milestone ' || g, 'Q' || (1 + g %% 4),
+              (ARRAY['not_started', 'in_progress', 'complete', 'missed'])[1 + floor(random() * 4)::int]
+       FROM generate_series(1, %(strategy_milestones)s) g""",
+
+    """INSERT INTO checkin_responses (response_date, mood_rating, busyness_rating)
+       SELECT CURRENT_DATE - floor(random() * 365)::int,
+              1 + floor(random() * 10)::int, 1 + floor(random() * 10)::int
+       FROM generate_series(1, %(checkins)s) g""",
+
+    # TLAs are three letters while they last, then letters + a number
+    """INSERT INTO clients (client_name, formatted_client_name, tla, drive_folder_id)
+       SELECT 'Client ' || g, 'Client ' || g, tla, 'seed-folder-t1-' || g
+       FROM generate_series(0, %(clients)s - 1) g,
+            LATERAL (SELECT chr(65 + (g / 676) %% 26) || chr(65 + (g / 26) %% 26) || chr(65 + g %% 26) ||
+                            CASE WHEN g >= 17576 THEN (g / 17576)::text ELSE '' END AS tla) t""",
+
+    """INSERT INTO bsb_client_codes (bsb_client_code, client_id, primary_contact, primary_contact_email,
+                                     payment_terms, drive_folder_id)
+       SELECT c.tla || lpad(k::text, 3, '0'), c.id, 'Contact ' || c.id || '-' || k,
+              'contact' || c.id || '-' || k || '@example.com', '30 days',
+              'seed-folder-t2-' || c.id || '-' || k
+       FROM clients c, generate_series(1, %(codes_per_client)s) k""",
+
+    """INSERT INTO client_product_folders (client_code_id, product_type, product_type_folder_id,
+                                           year, year_folder_id)
+       SELECT cc.id, pt.name, 'seed-folder-t3-' || cc.id || '-' || pt.n,
+              EXTRACT(YEAR FROM CURRENT_DATE)::int, 'seed-folder-t4-' || cc.id || '-' || pt.n
+       FROM bsb_client_codes cc,
+            LATERAL (SELECT n, (%(product_types)s::text[])[1 + (cc.id + n) %% cardinality(%(product_types)s::text[])] AS name
+                     FROM generate_series(1, %(folders_per_code)s) n) pt""",
+
+    """WITH cc AS (SELECT array_agg(bsb_client_code ORDER BY id) AS codes FROM bsb_client_codes)
+       INSERT INTO insertion_orders (io_reference, salesperson_first_name, salesperson_last_name,
+                                     submission_date, bsb_client_code, new_client, product_type,
+                                     company_name, formatted_company_name)
+       SELECT 'IO-seed-' || g, 'Sales', 'Person' || (g %% 7), NOW() - (random() * 365) * INTERVAL '1 day',
+              code, false, (%(product_types)s::text[])[1 + g %% cardinality(%(product_types)s::text[])],
+              'Company ' || code, 'Company ' || code
+       FROM generate_series(1, %(ios)s) g, cc,
+            LATERAL (SELECT cc.codes[1 + floor(random() * cardinality(cc.codes))::int] AS code WHERE g > 0) r""",
+
+    """INSERT INTO io_products (io_reference, product_type, product_name, unique_id, drive_folder_id)
+       SELECT io.io_reference, (%(product_types)s::text[])[1 + (io.id + k) %% cardinality(%(product_types)s::text[])],
+              'Product ' || io.id || '-' || k, io.io_reference || '-' || k, 'seed-folder-io-' || io.id || '-' || k
+       FROM insertion_orders io, generate_series(1, %(products_per_io)s) k""",
+]
+
+
+def volumes_from_args(args):
+    volumes = {}
+    for name, default in VOLUMES.items():
+        override = getattr(args, name)
+        volumes[name] = override if override is not None else (
+            default if name in RATIOS else max(1, round(default * args.scale)))
+    return volumes
+
+
+def function_exists(cur, name):
+    cur.execute("SELECT EXISTS (SELECT 1 FROM pg_proc WHERE proname = %s)", (name,))
+    return cur.fetchone()[0]
+
+
+def seed(conn, volumes, random_seed):
+    cur = conn.cursor()
+    cur.execute("SELECT to_regclass(t) IS NOT NULL, t FROM unnest(%s::text[]) t", (SEEDED_TABLES,))
+    tables = [t for exists, t in cur.fetchall() if exists]
+    cur.execute(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY CASCADE")
+    cur.execute("SELECT setseed(%s)", (random_seed,))
+
+    params = dict(volumes, product_types=PRODUCT_TYPES)
+    for sql in SEED_SQL:
+        cur.execute(sql, params)
+
+    if function_exists(cur, 'rebuild_summary_counts'):
+        cur.execute("SELECT rebuild_summary_counts()")
+    if function_exists(cur, 'refresh_cycle_rollups'):
+        cur.execute("SELECT refresh_cycle_rollups()")
+    conn.commit()
+
+    conn.autocommit = True
+    cur.execute("ANALYZE")
+    conn.autocommit = False
+    cur.close()
+
+
+def row_counts(cur):
+    cur.execute("SELECT t FROM unnest(%s::text[]) t WHERE to_regclass(t) IS NOT NULL ORDER BY t",
+                (SEEDED_TABLES,))
+    tables = [row[0] for row in cur.fetchall()]
+    cur.execute(' UNION ALL '.join(f"SELECT '{t}', COUNT(*) FROM {t}" for t in tables))
+    return dict(cur.fetchall())
+
+
+# ── Function cases ─────────────────────────────────────────────────────────────
+
+def load_pools(cur):
+    """Existing keys the function cases draw their arguments from."""
+    def column(sql):
+        cur.execute(sql)
+        return [row[0] for row in cur.fetchall()] or [None]
+
+    return {
+        'projects':   column("SELECT asana_project_id FROM projects WHERE asana_project_id IS NOT NULL ORDER BY id"),
+        'milestones': column("""SELECT json_build_array(m.asana_milestone_id, p.asana_project_id, m.name,
+                                       m.target_date, m.status = 'complete', fc.code)
+                                FROM milestones m JOIN projects p ON p.id = m.project_id
+                                LEFT JOIN focus_cycles fc ON fc.id = m.focus_cycle_id
+                                WHERE m.asana_milestone_id IS NOT NULL ORDER BY m.id"""),
+        'bets':       column("SELECT code FROM strategic_bets ORDER BY id"),
+        'teams':      column("SELECT name FROM departments ORDER BY id"),
+        'cycles':     column("SELECT code FROM focus_cycles ORDER BY start_date"),
+        'tags':       column("SELECT name FROM strategic_bet_tags ORDER BY id"),
+        'tlas':       column("SELECT tla FROM clients ORDER BY id"),
+        'codes':      column("SELECT bsb_client_code FROM bsb_client_codes ORDER BY id"),
+        'folders':    column("""SELECT json_build_array(cc.bsb_client_code, f.product_type, f.year)
+                                FROM client_product_folders f JOIN bsb_client_codes cc ON cc.id = f.client_code_id
+                                ORDER BY f.id"""),
+        'ios':        column("SELECT io_reference FROM insertion_orders ORDER BY id"),
+    }
+
+
+def _pick(pool, i):
+    return pool[i % len(pool)]
+
+
+def project_args(pools, i, new=False):
+    asana_id = f'bench-p-{i}' if new else _pick(pools['projects'], i)
+    return (asana_id, f'Bench project {i}', _pick(pools['bets'], i), _pick(pools['teams'], i),
+            f'seed-u-{1 + i % 40}', f'First{1 + i % 40} Last{1 + i % 40}',
+            ['on_track', 'at_risk', 'off_track', 'complete'][i % 4],
+            f"2026 {_pick(pools['cycles'], i)}", _pick(pools['cycles'], i + 2), 'Standard Project')
+
+
+def milestone_args(pools, i):
+    m = _pick(pools['milestones'], i)
+    return tuple(m) + (', '.join(pools['tags'][:1 + i % 2]),) if m else (None,) * 7
+
+
+def project_batch(pools, i):
+    keys = ('asana_id', 'name', 'bet_code', 'team_name', 'owner_asana_id', 'owner_name',
+            'status', 'start_cycle', 'end_cycle', 'project_type')
+    return (json.dumps([dict(zip(keys, project_args(pools, i * BATCH_SIZE + k))) for k in range(BATCH_SIZE)]),)
+
+
+def milestone_batch(pools, i):
+    keys = ('asana_id', 'project_asana_id', 'name', 'target_date', 'completed', 'focus_cycle',
+            'strategic_bet_tags')
+    return (json.dumps([dict(zip(keys, milestone_args(pools, i * BATCH_SIZE + k))) for k in range(BATCH_SIZE)],
+                       default=str),)
+
+
+# (case name, function, SQL, argument builder)
+FUNCTION_CASES = [
+    ('upsert_project (existing)', 'upsert_project',
+     'SELECT upsert_project(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)', project_args),
+    ('upsert_project (new)', 'upsert_project',
+     'SELECT upsert_project(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)',
+     lambda pools, i: project_args(pools, i, new=True)),
+    ('upsert_milestone (unchanged)', 'upsert_milestone',
+     'SELECT upsert_milestone(%s, %s, %s, %s, %s, %s, %s)', milestone_args),
+    (f'upsert_projects_batch ({BATCH_SIZE})', 'upsert_projects_batch',
+     'SELECT upsert_projects_batch(%s::jsonb)', project_batch),
+    (f'upsert_milestones_batch ({BATCH_SIZE})', 'upsert_milestones_batch',
+     'SELECT upsert_milestones_batch(%s::jsonb)', milestone_batch),
+    ('upsert_client', 'upsert_client',
+     'SELECT upsert_client(%s, %s)', lambda pools, i: (_pick(pools['tlas'], i), f'Client {i}')),
+    ('upsert_client_code', 'upsert_client_code',
+     'SELECT upsert_client_code(%s, %s, %s, %s)',
+     lambda pools, i: (_pick(pools['codes'], i), (_pick(pools['codes'], i) or '').rstrip('0123456789'),
+                       f'Contact {i}', f'contact{i}@example.com')),
+    ('upsert_insertion_order (new)', 'upsert_insertion_order',
+     'SELECT upsert_insertion_order(p_io_reference := %s, p_bsb_client_code := %s, p_product_type := %s, '
+     'p_company_name := %s)',
+     lambda pools, i: (f'IO-bench-{i}', _pick(pools['codes'], i), PRODUCT_TYPES[i % len(PRODUCT_TYPES)],
+                       f'Company {i}')),
+    ('upsert_io_product (new)', 'upsert_io_product',
+     'SELECT upsert_io_product(%s, %s, %s, %s, %s)',
+     lambda pools, i: (_pick(pools['ios'], i), PRODUCT_TYPES[i % len(PRODUCT_TYPES)], f'Bench product {i}',
+                       f'bench-u-{i}', f'bench-folder-{i}')),
+    ('get_client_folder_info', 'get_client_folder_info',
+     'SELECT * FROM get_client_folder_info(%s)', lambda pools, i: (_pick(pools['codes'], i),)),
+    ('get_product_folder_info', 'get_product_folder_info',
+     'SELECT * FROM get_product_folder_info(%s, %s, %s)',
+     lambda pools, i: tuple(_pick(pools['folders'], i) or (None, None, None))),
+    ('generate_weekly_slack_report', 'generate_weekly_slack_report',
+     'SELECT generate_weekly_slack_report()', lambda pools, i: ()),
+]
+
+# Read-only and report cases are not run concurrently
+CONCURRENT_PREFIXES = ('upsert_',)
+
+
+# ── Timing ─────────────────────────────────────────────────────────────────────
+
+def summarise(kind, name, mode, workers, timings, elapsed, rows=None, errors=0):
+    ms = sorted(t * 1000 for t in timings)
+    return {
+        'kind':        kind,
+        'name':        name,
+        'mode':        mode,
+        'workers':     workers,
+        'calls':       len(ms) + errors,
+        'median_ms':   round(statistics.median(ms), 3) if ms else None,
+        'p95_ms':      round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3) if ms else None,
+        'min_ms':      round(ms[0], 3) if ms else None,
+        'calls_per_s': round(len(ms) / elapsed, 1) if elapsed else None,
+        'rows':        rows,
+        'errors':      errors,
+    }
+
+
+def time_query(conn, kind, name, sql, repeat):
+    cur = conn.cursor()
+    timings, rows, errors = [], None, 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        t = time.perf_counter()
+        try:
+            cur.execute(sql)
+            rows = len(cur.fetchall())
+            timings.append(time.perf_counter() - t)
+        except Exception as e:
+            errors += 1
+            print(f"  {name}: {str(e).strip().splitlines()[0]}")
+        conn.rollback()
+    cur.close()
+    return summarise(kind, name, 'single', 1, timings, time.perf_counter() - start, rows, errors)
+
+
+def _call_loop(conn, sql, build, pools, indexes, timings, errors):
+    cur = conn.cursor()
+    for i in indexes:
+        args = build(pools, i)
+        t = time.perf_counter()
+        try:
+            cur.execute(sql, args)
+            cur.fetchall()
+            timings.append(time.perf_counter() - t)
+        except Exception as e:
+            errors.append(str(e).strip().splitlines()[0])
+        conn.rollback()
+    cur.close()
+
+
+def time_function(conns, name, sql, build, pools, calls):
+    """Run `calls` calls split over len(conns) threads. Each call is rolled back."""
+    workers = len(conns)
+    timings, errors = [], []
+    threads = [
+        threading.Thread(target=_call_loop,
+                         args=(conn, sql, build, pools, range(w, calls, workers), timings, errors))
+        for w, conn in enumerate(conns)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        print(f"  {name}: {len(errors)} error(s), first: {errors[0]}")
+    mode = 'single' if workers == 1 else 'concurrent'
+    return summarise('function', name, mode, workers, timings, elapsed, errors=len(errors))
+
+
+# ── Report ─────────────────────────────────────────────────────────────────────
+
+def _key(r):
+    return (r['kind'], r['name'], r['mode'], r['workers'])
+
+
+def print_results(results):
+    print(f"\n{'kind':<9} {'name':<44} {'mode':<10} {'median ms':>10} {'p95 ms':>9} {'calls/s':>9} {'err':>4}")
+    for r in results:
+        median = '—' if r['median_ms'] is None else f"{r['median_ms']:.3f}"
+        p95 = '—' if r['p95_ms'] is None else f"{r['p95_ms']:.3f}"
+        mode = r['mode'] if r['workers'] == 1 else f"{r['mode'][:4]} x{r['workers']}"
+        print(f"{r['kind']:<9} {r['name'][:44]:<44} {mode:<10} {median:>10} {p95:>9} "
+              f"{r['calls_per_s'] or '—':>9} {r['errors']:>4}")
+
+
+def print_diff(old, new):
+    old_results = {_key(r): r for r in old['results']}
+    print(f"{'kind':<9} {'name':<44} {'mode':<10} {'old ms':>9} {'new ms':>9} {'change':>8}")
+    for r in new['results']:
+        o = old_results.pop(_key(r), None)
+        mode = r['mode'] if r['workers'] == 1 else f"{r['mode'][:4]} x{r['workers']}"
+        if not o or not o['median_ms'] or r['median_ms'] is None:
+            print(f"{r['kind']:<9} {r['name'][:44]:<44} {mode:<10} {'—':>9} {r['median_ms'] or '—':>9}    (new)")
+            continue
+        change = (r['median_ms'] - o['median_ms']) / o['median_ms'] * 100
+        print(f"{r['kind']:<9} {r['name'][:44]:<44} {mode:<10} {o['median_ms']:>9.3f} "
+              f"{r['median_ms']:>9.3f} {change:>+7.0f}%")
+    for o in old_results.values():
+        print(f"{o['kind']:<9} {o['name'][:44]:<44} {o['mode']:<10} {o['median_ms'] or '—':>9} {'—':>9}    (gone)")
+
+
+def write_csv(path, results):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+# ── Main ───────────────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed synthetic data and benchmark the strategy schema')
+    parser.add_argument('--seed', action='store_true',
+                        help='Replace the data with synthetic rows before benchmarking')
+    parser.add_argument('--seed-only', action='store_true',
+                        help='Seed and exit')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Multiply the default volumes (default: 1)')
+    for name, default in VOLUMES.items():
+        parser.add_argument('--' + name.replace('_', '-'), dest=name, type=int, metavar='N',
+                            help=f'{name.replace("_", " ")} (default: {default}'
+                                 f'{"" if name in RATIOS else " x scale"})')
+    parser.add_argument('--random-seed', type=float, default=0.42,
+                        help='setseed() value for reproducible data (default: 0.42)')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help=f'Runs per view / query (default: {DEFAULT_REPEAT})')
+    parser.add_argument('--calls', type=int, default=DEFAULT_CALLS,
+                        help=f'Calls per function case (default: {DEFAULT_CALLS})')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Concurrent callers for write functions; 1 disables (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=VALUE',
+                        help='Metabase {{parameter}} value (default: cycle=<active cycle>)')
+    parser.add_argument('--out', default='bench-schema.json',
+                        help='JSON report path (default: bench-schema.json)')
+    parser.add_argument('--csv', metavar='FILE',
+                        help='Also write the results as CSV')
+    parser.add_argument('--diff', nargs=2, metavar=('OLD', 'NEW'),
+                        help='Compare two JSON reports and exit')
+    args = parser.parse_args()
+
+    if args.diff:
+        with open(args.diff[0]) as f:
+            old = json.load(f)
+        with open(args.diff[1]) as f:
+            new = json.load(f)
+        print_diff(old, new)
+        return
+
+    if (args.seed or args.seed_only) and os.environ.get('DB_NAME', PRODUCTION_DB) == PRODUCTION_DB:
+        print(f"ERROR: refusing to seed {PRODUCTION_DB}. Point DB_NAME at a local scratch database.")
+        sys.exit(1)
+
+    try:
+        conn = get_db_connection()
+    except KeyError as e:
+        print(f"ERROR: missing env var {e}. Set DB_HOST, DB_NAME, DB_USER, DB_PASS.")
+        sys.exit(1)
+
+    volumes = volumes_from_args(args)
+    if args.seed or args.seed_only:
+        print('Seeding: ' + ', '.join(f'{k}={v}' for k, v in volumes.items()))
+        start = time.perf_counter()
+        seed(conn, volumes, args.random_seed)
+        print(f"Seeded in {time.perf_counter() - start:.1f}s")
+        if args.seed_only:
+            conn.close()
+            return
+
+    cur = conn.cursor()
+    counts = row_counts(cur)
+    cur.execute("SELECT code FROM focus_cycles WHERE status = 'active' LIMIT 1")
+    active = cur.fetchone()
+    params = {'cycle': active[0]} if active else {}
+    for p in args.param:
+        name, _, value = p.partition('=')
+        params[name] = value
+
+    queries = [('view', name, sql) for name, sql in view_queries(cur)]
+    queries += [('metabase', name, sql) for name, sql in
+                ((n, apply_params(s, params)) for n, s in load_doc_queries()) if sql is not None]
+    queries += [('report', name, sql) for name, sql in REPORT_QUERIES]
+    pools = load_pools(cur)
+    cases = [c for c in FUNCTION_CASES if function_exists(cur, c[1])]
+    missing = sorted({c[1] for c in FUNCTION_CASES} - {c[1] for c in cases})
+    conn.rollback()
+    cur.close()
+
+    print("Rows: " + ', '.join(f'{t}={n}' for t, n in counts.items()))
+    if missing:
+        print(f"Functions not in DB (skipped): {', '.join(missing)}")
+
+    results = []
+    print(f"\nTiming {len(queries)} queries x {args.repeat}...")
+    for kind, name, sql in queries:
+        results.append(time_query(conn, kind, name, sql, args.repeat))
+
+    print(f"Timing {len(cases)} function cases x {args.calls} calls...")
+    extra = [get_db_connection() for _ in range(max(0, args.workers - 1))]
+    try:
+        for name, function, sql, build in cases:
+            results.append(time_function([conn], name, sql, build, pools, args.calls))
+            if args.workers > 1 and function.startswith(CONCURRENT_PREFIXES):
+                results.append(time_function([conn] + extra, name, sql, build, pools, args.calls))
+    finally:
+        for c in extra:
+            c.close()
+
+    cur = conn.cursor()
+    cur.execute("SHOW server_version")
+    server_version = cur.fetchone()[0]
+    cur.close()
+    conn.close()
+
+    report = {
+        'generated_at':   datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'server_version': server_version,
+        'client':         platform.node(),
+        'volumes':        volumes if (args.seed or args.seed_only) else None,
+        'row_counts':     counts,
+        'settings':       {'repeat': args.repeat, 'calls': args.calls, 'workers': args.workers,
+                           'params': params},
+        'results':        results,
+    }
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+    if args.csv:
+        write_csv(args.csv, results)
+
+    print_results(results)
+    print(f"\nReport written to {args.out}" + (f" and {args.csv}" if args.csv else ''))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,438 @@
+"""
+Blueprint Model
+===============
+In-memory model of a Make.com blueprint (make-blueprints/*.json) used by
+build_blueprint.py. The JSON is parsed once and every module is indexed by
+id at every nesting level (router routes and error-handler flows), so
+lookups are O(1) and edits do not re-walk the flow.
+
+    bp = Blueprint.load('make-blueprints/phase-1-io-submission-project-creation.json')
+    bp.find(10)['mapper']['values'].pop('18', None)
+    bp.rename(66, 81)
+    bp.replace(23, new_modules)
+    bp.save(path)
+
+Each index entry holds the module, the flow list that contains it and its
+position in that list. Edits keep the index consistent: inserted modules
+(and their nested routes) are indexed, removed ones are dropped, and the
+positions of later siblings in the edited flow are renumbered. The cost of
+an edit depends only on the size of the edited flow and of the modules
+being inserted or removed, not on the size of the blueprint.
+
+Only the module id is changed by rename(); {{N.field}} references in other
+modules' mappers are left as they are.
+
+Validation
+----------
+validate() returns a list of problems (empty = valid):
+- duplicate module ids
+- {{N.field}} references in mappers and filters to a module that does not
+  exist, or that does not run before the referencing module. Make.com only
+  lets a module inside a router branch see the modules on its own path:
+  earlier modules in its branch, its routers, and the modules before them.
+  It cannot see modules in a different branch. Modules in the top-level flow
+  can also see modules inside the branches of routers that ran before them
+  (see "4-Tier Drive Folder Implementation" in docs/io-automation.md).
+
+Patches
+-------
+apply_patch() runs a list of declarative steps (SetValue, AppendText,
+RenameModule, RemoveModule, ReplaceModules) against a copy of the
+blueprint. Each step first checks whether it is already applied (then it
+is skipped) and then its precondition (failure aborts the whole patch).
+The result is validated and only then written, atomically, so re-running a
+patch is a no-op and a failed run leaves the file untouched.
+"""
+
+import os
+import re
+import copy
+import json
+
+
+def child_flows(module):
+    """The flow lists nested directly inside a module (router routes, onerror)."""
+    for route in module.get('routes') or []:
+        if 'flow' in route:
+            yield route['flow']
+    if isinstance(module.get('onerror'), list):
+        yield module['onerror']
+
+
+class _Entry:
+    __slots__ = ('module', 'flow', 'pos')
+
+    def __init__(self, module, flow, pos):
+        self.module = module
+        self.flow = flow
+        self.pos = pos
+
+
+class Blueprint:
+
+    def __init__(self, data):
+        self.data = data
+        self._index = {}
+        self._index_flow(self.flow)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def save(self, path):
+        """Write the blueprint atomically (temp file + rename)."""
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp, path)
+
+    def copy(self):
+        return Blueprint(copy.deepcopy(self.data))
+
+    @property
+    def flow(self):
+        return self.data['flow']
+
+    # ── Index ──────────────────────────────────────────────────────────────────
+
+    def _index_flow(self, flow, start=0):
+        for pos in range(start, len(flow)):
+            self._index_module(flow[pos], flow, pos)
+
+    def _index_module(self, module, flow, pos):
+        mid = module['id']
+        if mid in self._index:
+            raise ValueError(f"duplicate module id {mid}")
+        self._index[mid] = _Entry(module, flow, pos)
+        for child in child_flows(module):
+            self._index_flow(child)
+
+    def _unindex_module(self, module):
+        del self._index[module['id']]
+        for child in child_flows(module):
+            for m in child:
+                self._unindex_module(m)
+
+    def _renumber(self, flow, start):
+        for pos in range(start, len(flow)):
+            self._index[flow[pos]['id']].pos = pos
+
+    def _entry(self, mid):
+        try:
+            return self._index[mid]
+        except KeyError:
+            raise KeyError(f"module {mid} not in blueprint") from None
+
+    # ── Lookup ─────────────────────────────────────────────────────────────────
+
+    def __contains__(self, mid):
+        return mid in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def find(self, mid):
+        """The module dict with this id. KeyError if there is none."""
+        return self._entry(mid).module
+
+    def get(self, mid, default=None):
+        entry = self._index.get(mid)
+        return entry.module if entry else default
+
+    def parent(self, mid):
+        """(flow list, position) of the module."""
+        entry = self._entry(mid)
+        return entry.flow, entry.pos
+
+    def ids(self):
+        return self._index.keys()
+
+    def modules(self, flow=None):
+        """Every module in flow order, depth first (routes after their router)."""
+        for module in self.flow if flow is None else flow:
+            yield module
+            for child in child_flows(module):
+                yield from self.modules(child)
+
+    # ── Edits ──────────────────────────────────────────────────────────────────
+
+    def _splice(self, flow, start, stop, modules):
+        """flow[start:stop] = modules, keeping the index consistent. Checks
+        the new ids before changing anything."""
+        removed = flow[start:stop]
+        removed_ids = set()
+        for m in removed:
+            removed_ids.update(x['id'] for x in self.modules([m]))
+        new_ids = [x['id'] for x in self.modules(modules)]
+        seen = set()
+        for mid in new_ids:
+            if mid in seen or (mid in self._index and mid not in removed_ids):
+                raise ValueError(f"duplicate module id {mid}")
+            seen.add(mid)
+
+        for m in removed:
+            self._unindex_module(m)
+        flow[start:stop] = modules
+        for pos in range(start, start + len(modules)):
+            self._index_module(flow[pos], flow, pos)
+        if len(modules) != stop - start:
+            self._renumber(flow, start + len(modules))
+
+    def replace(self, mid, modules):
+        """Replace the module with a list of modules (in the same flow)."""
+        entry = self._entry(mid)
+        self._splice(entry.flow, entry.pos, entry.pos + 1, list(modules))
+
+    def insert_before(self, mid, modules):
+        entry = self._entry(mid)
+        self._splice(entry.flow, entry.pos, entry.pos, list(modules))
+
+    def insert_after(self, mid, modules):
+        entry = self._entry(mid)
+        self._splice(entry.flow, entry.pos + 1, entry.pos + 1, list(modules))
+
+    def append(self, modules, flow=None):
+        """Append modules to the end of flow (default: the top-level flow)."""
+        flow = self.flow if flow is None else flow
+        self._splice(flow, len(flow), len(flow), list(modules))
+
+    def replace_run(self, first_id, last_id, modules):
+        """Replace the consecutive modules first_id..last_id (same flow)."""
+        first, last = self._entry(first_id), self._entry(last_id)
+        if first.flow is not last.flow or first.pos > last.pos:
+            raise ValueError(f"modules {first_id}..{last_id} are not a run in one flow")
+        self._splice(first.flow, first.pos, last.pos + 1, list(modules))
+
+    def remove(self, mid):
+        """Remove the module (and anything nested in it). Returns it."""
+        module = self.find(mid)
+        self.replace(mid, [])
+        return module
+
+    def rename(self, old_id, new_id):
+        entry = self._entry(old_id)
+        if new_id in self._index:
+            raise ValueError(f"duplicate module id {new_id}")
+        entry.module['id'] = new_id
+        self._index[new_id] = self._index.pop(old_id)
+
+    # ── Validation ─────────────────────────────────────────────────────────────
+
+    def validate(self):
+        """List of problems with the blueprint (see module docstring)."""
+        problems = []
+        seen = set()
+        for m in self.modules():
+            if m['id'] in seen:
+                problems.append(f"duplicate module id {m['id']}")
+            seen.add(m['id'])
+        self._check_refs(self.flow, set(), True, seen, problems)
+        return problems
+
+    def _check_refs(self, flow, path, top_level, existing, problems):
+        """Check each module's references against the ids that run before it.
+        `path` is the routers and earlier modules on this branch's path;
+        top-level modules also see everything nested in earlier routers."""
+        path = set(path)
+        deep = set(path)
+        for m in flow:
+            visible = deep if top_level else path
+            for where, value in (('mapper', m.get('mapper')), ('filter', m.get('filter'))):
+                for ref in sorted(module_refs(value)):
+                    if ref not in existing:
+                        problems.append(f"module {m['id']} {where}: references unknown module {ref}")
+                    elif ref not in visible:
+                        problems.append(f"module {m['id']} {where}: references module {ref}, "
+                                        f"which does not run before it on this path")
+            for child in child_flows(m):
+                self._check_refs(child, path | {m['id']}, False, existing, problems)
+            path.add(m['id'])
+            if top_level:
+                deep.update(x['id'] for x in self.modules([m]))
+
+
+_EXPR_RE = re.compile(r'\{\{(.*?)\}\}', re.S)
+_REF_RE = re.compile(r'(?<![\w.`])(\d+)\.(?=[`\w])')
+
+
+def module_refs(value):
+    """Module ids referenced as {{N.field}} anywhere in a mapper/filter value."""
+    refs = set()
+    if isinstance(value, str):
+        for expr in _EXPR_RE.findall(value):
+            refs.update(int(n) for n in _REF_RE.findall(expr))
+    elif isinstance(value, dict):
+        for v in value.values():
+            refs |= module_refs(v)
+    elif isinstance(value, list):
+        for v in value:
+            refs |= module_refs(v)
+    return refs
+
+
+# ── Patch steps ────────────────────────────────────────────────────────────────
+#
+# Each step implements:
+#   done(bp)  -> True if the blueprint already has the change (step skipped)
+#   check(bp) -> None, or why the step cannot be applied
+#   apply(bp)
+
+class PatchError(Exception):
+    pass
+
+
+_MISSING = object()
+
+
+def _lookup(module, path):
+    value = module
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return _MISSING
+        value = value[key]
+    return value
+
+
+class SetValue:
+    """Set module[path] = value, or delete the key if value is DELETE."""
+
+    DELETE = _MISSING
+
+    def __init__(self, mid, path, value, name):
+        self.mid, self.path, self.value, self.name = mid, tuple(path), value, name
+
+    def done(self, bp):
+        return self.mid in bp and _lookup(bp.find(self.mid), self.path) == self.value
+
+    def check(self, bp):
+        if self.mid not in bp:
+            return f"module {self.mid} not found"
+        if not isinstance(_lookup(bp.find(self.mid), self.path[:-1]), dict):
+            return f"module {self.mid} has no {'.'.join(self.path[:-1])}"
+        return None
+
+    def apply(self, bp):
+        parent = _lookup(bp.find(self.mid), self.path[:-1])
+        if self.value is _MISSING:
+            parent.pop(self.path[-1], None)
+        else:
+            parent[self.path[-1]] = self.value
+
+
+class AppendText:
+    """Append suffix to the text at module[path], unless it already ends with it."""
+
+    def __init__(self, mid, path, suffix, name):
+        self.mid, self.path, self.suffix, self.name = mid, tuple(path), suffix, name
+
+    def done(self, bp):
+        value = _lookup(bp.find(self.mid), self.path) if self.mid in bp else None
+        return isinstance(value, str) and value.endswith(self.suffix)
+
+    def check(self, bp):
+        if self.mid not in bp:
+            return f"module {self.mid} not found"
+        if not isinstance(_lookup(bp.find(self.mid), self.path), str):
+            return f"module {self.mid} has no text at {'.'.join(self.path)}"
+        return None
+
+    def apply(self, bp):
+        parent = _lookup(bp.find(self.mid), self.path[:-1])
+        parent[self.path[-1]] += self.suffix
+
+
+class RenameModule:
+
+    def __init__(self, old_id, new_id, module_type, name):
+        self.old_id, self.new_id, self.module_type, self.name = old_id, new_id, module_type, name
+
+    def done(self, bp):
+        return bp.get(self.new_id, {}).get('module') == self.module_type and (
+            bp.get(self.old_id, {}).get('module') != self.module_type)
+
+    def check(self, bp):
+        if bp.get(self.old_id, {}).get('module') != self.module_type:
+            return f"module {self.old_id} is not a {self.module_type}"
+        if self.new_id in bp:
+            return f"module id {self.new_id} is already used"
+        return None
+
+    def apply(self, bp):
+        bp.rename(self.old_id, self.new_id)
+
+
+class RemoveModule:
+
+    def __init__(self, mid, module_type, name):
+        self.mid, self.module_type, self.name = mid, module_type, name
+
+    def done(self, bp):
+        return bp.get(self.mid, {}).get('module') != self.module_type
+
+    def check(self, bp):
+        return None
+
+    def apply(self, bp):
+        bp.remove(self.mid)
+
+
+class ReplaceModules:
+    """Replace module `mid` with `modules`. Once applied, a later run with a
+    changed `modules` list replaces the previously inserted run again, so the
+    output always matches the current definition."""
+
+    def __init__(self, mid, modules, name):
+        self.mid, self.modules, self.name = mid, list(modules), name
+
+    def _previous(self, bp):
+        first, last = self.modules[0]['id'], self.modules[-1]['id']
+        if first in bp and last in bp:
+            (flow, i), (last_flow, j) = bp.parent(first), bp.parent(last)
+            if flow is last_flow and i <= j:
+                return flow[i:j + 1]
+        return None
+
+    def done(self, bp):
+        return self.mid not in bp and self._previous(bp) == self.modules
+
+    def check(self, bp):
+        if self.mid not in bp and self._previous(bp) is None:
+            return f"module {self.mid} not found and no previous replacement to update"
+        return None
+
+    def apply(self, bp):
+        if self.mid in bp:
+            bp.replace(self.mid, copy.deepcopy(self.modules))
+        else:
+            bp.replace_run(self.modules[0]['id'], self.modules[-1]['id'],
+                           copy.deepcopy(self.modules))
+
+
+def apply_patch(path, steps, out=None, write=True):
+    """Apply steps to the blueprint at path as one transaction, validate the
+    result and (if write) save it atomically to out (default: path).
+    Returns [(step name, 'applied' | 'skipped')]. Raises PatchError if a
+    precondition fails or the result does not validate; nothing is written."""
+    original = Blueprint.load(path)
+    bp = original.copy()
+    report = []
+    for step in steps:
+        if step.done(bp):
+            report.append((step.name, 'skipped'))
+            continue
+        problem = step.check(bp)
+        if problem:
+            raise PatchError(f"{step.name}: {problem}")
+        try:
+            step.apply(bp)
+        except (KeyError, ValueError) as e:
+            raise PatchError(f"{step.name}: {e}") from None
+        report.append((step.name, 'applied'))
+
+    problems = bp.validate()
+    if problems:
+        raise PatchError("blueprint does not validate:\n  " + "\n  ".join(problems))
+    if write and (out or any(r == 'applied' for _, r in report)):
+        bp.save(out or path)
+    return report
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Blueprint Diff
+==============
+Semantic diff of two Make.com blueprints, matched by module id. Designer
+positions (metadata.designer) are ignored; what is left is reported per
+module instead of as a JSON line diff.
+
+Usage:
+    python3 scripts/blueprint_diff.py BEFORE.json AFTER.json
+    python3 scripts/blueprint_diff.py make-blueprints/phase-1-io-submission-project-creation.json /tmp/after.json
+    python3 scripts/blueprint_diff.py BEFORE.json AFTER.json --metadata
+
+Reports:
+- modules added and removed (with their location)
+- modules moved: to another route / router, or reordered within their flow
+- module type or version changed
+- connection changes (parameters __IMTCONN__ / account / connection ids)
+- mapper, filter and other parameter changes, as key paths with old → new
+- with --metadata, also the other metadata keys (restore, expect,
+  interface), which Make.com regenerates on import and are noisy
+
+Locations read 'main', 'router 69 route 1' or 'module 14 onerror'.
+
+Exit status is 0 if the blueprints are equivalent, 1 if they differ, so
+it can gate a regeneration step. Both files are read with json.load: the
+IO blueprint (~6,500 lines) parses and diffs in a few milliseconds.
+"""
+
+import sys
+import json
+import difflib
+import argparse
+
+from blueprint import Blueprint
+
+# ── Constants ──────────────────────────────────────────────────────────────────
+
+CONNECTION_KEYS = ('__IMTCONN__', 'account', 'connection')
+IGNORED_METADATA = ('designer',)
+MAX_VALUE = 70
+
+_MISSING = object()
+
+
+# ── Diff ───────────────────────────────────────────────────────────────────────
+
+def value_changes(old, new, path=''):
+    """[(key path, old, new)] between two JSON values. Lists of different
+    length are reported whole; _MISSING marks an added or removed key."""
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = []
+        for key in list(old) + [k for k in new if k not in old]:
+            sub = f'{path}.{key}' if path else str(key)
+            changes += value_changes(old.get(key, _MISSING), new.get(key, _MISSING), sub)
+        return changes
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        changes = []
+        for i, (a, b) in enumerate(zip(old, new)):
+            changes += value_changes(a, b, f'{path}[{i}]')
+        return changes
+    return [] if old == new else [(path, old, new)]
+
+
+def locations(flow, container='main', found=None):
+    """{module id: container} for every module in the flow."""
+    found = {} if found is None else found
+    for module in flow:
+        found[module['id']] = container
+        for i, route in enumerate(module.get('routes') or [], 1):
+            if 'flow' in route:
+                locations(route['flow'], f"router {module['id']} route {i}", found)
+        if isinstance(module.get('onerror'), list):
+            locations(module['onerror'], f"module {module['id']} onerror", found)
+    return found
+
+
+def reordered(before, after, before_loc, after_loc):
+    """Ids that stayed in the same container but changed order relative to
+    the other modules kept there."""
+    moved = set()
+    for container in set(before_loc.values()) & set(after_loc.values()):
+        kept = [mid for mid, c in before_loc.items()
+                if c == container and after_loc.get(mid) == container]
+        if len(kept) < 2:
+            continue
+        old = [m['id'] for m in before.modules() if m['id'] in kept]
+        new = [m['id'] for m in after.modules() if m['id'] in kept]
+        matcher = difflib.SequenceMatcher(a=old, b=new, autojunk=False)
+        in_place = {old[block.a + k] for block in matcher.get_matching_blocks()
+                    for k in range(block.size)}
+        moved |= set(old) - in_place
+    return moved
+
+
+def _split_parameters(parameters):
+    parameters = parameters or {}
+    conn = {k: v for k, v in parameters.items() if k in CONNECTION_KEYS}
+    rest = {k: v for k, v in parameters.items() if k not in CONNECTION_KEYS}
+    return conn, rest
+
+
+def _metadata(module):
+    return {k: v for k, v in (module.get('metadata') or {}).items()
+            if k not in IGNORED_METADATA}
+
+
+def module_changes(old, new, metadata=False):
+    """[(kind, key path, old, new)] for one module present in both."""
+    changes = []
+    for key in ('module', 'version'):
+        if old.get(key) != new.get(key):
+            changes.append(('type' if key == 'module' else 'version', key, old.get(key), new.get(key)))
+    old_conn, old_params = _split_parameters(old.get('parameters'))
+    new_conn, new_params = _split_parameters(new.get('parameters'))
+    sections = [
+        ('connection', 'parameters', old_conn, new_conn),
+        ('filter', 'filter', old.get('filter'), new.get('filter')),
+        ('mapper', 'mapper', old.get('mapper'), new.get('mapper')),
+        ('parameters', 'parameters', old_params, new_params),
+    ]
+    if metadata:
+        sections.append(('metadata', 'metadata', _metadata(old), _metadata(new)))
+    for kind, prefix, a, b in sections:
+        changes += [(kind, path, x, y) for path, x, y in value_changes(a, b, prefix)]
+    return changes
+
+
+def diff(before, after, metadata=False):
+    """Semantic differences between two Blueprint objects, as a dict:
+    added / removed: [(id, module, location)], moved: [(id, old location,
+    new location)] (the same location if reordered within it), changed:
+    {id: [(kind, path, old, new)]}, scenario: [(path, old, new)] for the
+    top-level name and metadata."""
+    before_loc, after_loc = locations(before.flow), locations(after.flow)
+    common = [mid for mid in before_loc if mid in after_loc]
+
+    result = {
+        'added':   [(mid, after.find(mid)['module'], after_loc[mid])
+                    for mid in after_loc if mid not in before_loc],
+        'removed': [(mid, before.find(mid)['module'], before_loc[mid])
+                    for mid in before_loc if mid not in after_loc],
+        'moved':   [],
+        'changed': {},
+    }
+    shuffled = reordered(before, after, before_loc, after_loc)
+    for mid in common:
+        if before_loc[mid] != after_loc[mid] or mid in shuffled:
+            result['moved'].append((mid, before_loc[mid], after_loc[mid]))
+        changes = module_changes(before.find(mid), after.find(mid), metadata)
+        if changes:
+            result['changed'][mid] = changes
+
+    scenario_old = {'name': before.data.get('name'), 'metadata': before.data.get('metadata')}
+    scenario_new = {'name': after.data.get('name'), 'metadata': after.data.get('metadata')}
+    result['scenario'] = value_changes(scenario_old, scenario_new)
+    return result
+
+
+def is_empty(result):
+    return not any(result.values())
+
+
+# ── Output ─────────────────────────────────────────────────────────────────────
+
+def _show(value, start=0):
+    if value is _MISSING:
+        return '(none)'
+    text = json.dumps(value, ensure_ascii=False)
+    if start:
+        text = '…' + text[start:]
+    return text if len(text) <= MAX_VALUE else text[:MAX_VALUE - 1] + '…'
+
+
+def _show_pair(old, new):
+    """Both values for display; long strings start shortly before the
+    first character that differs."""
+    start = 0
+    if isinstance(old, str) and isinstance(new, str):
+        a, b = json.dumps(old, ensure_ascii=False), json.dumps(new, ensure_ascii=False)
+        same = next((i for i, (x, y) in enumerate(zip(a, b)) if x != y), min(len(a), len(b)))
+        if same > MAX_VALUE // 2:
+            start = same - 20
+    return _show(old, start), _show(new, start)
+
+
+def print_diff(result, before_bp=None, after_bp=None):
+    def name(mid):
+        for bp in (after_bp, before_bp):
+            module = bp.get(mid) if bp else None
+            if module:
+                return (module.get('metadata') or {}).get('designer', {}).get('name') or module['module']
+        return ''
+
+    if is_empty(result):
+        print("No semantic differences.")
+        return
+    for mid, module, where in result['added']:
+        print(f"+ {mid:>4}  {module:<32} {where}")
+    for mid, module, where in result['removed']:
+        print(f"- {mid:>4}  {module:<32} {where}")
+    for mid, old, new in result['moved']:
+        where = f"reordered in {old}" if old == new else f"{old} → {new}"
+        print(f"> {mid:>4}  {name(mid)[:32]:<32} {where}")
+    for mid, changes in result['changed'].items():
+        print(f"~ {mid:>4}  {name(mid)}")
+        for kind, path, old, new in changes:
+            print(f"      {kind:<10} {path}: {' → '.join(_show_pair(old, new))}")
+    for path, old, new in result['scenario']:
+        print(f"~ scenario  {path}: {' → '.join(_show_pair(old, new))}")
+
+    counts = {k: len(result[k]) for k in ('added', 'removed', 'moved', 'changed')}
+    print(f"\n{counts['added']} added, {counts['removed']} removed, "
+          f"{counts['moved']} moved, {counts['changed']} changed")
+
+
+# ── Main ───────────────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description='Semantic diff of two Make.com blueprints')
+    parser.add_argument('before', metavar='BEFORE')
+    parser.add_argument('after', metavar='AFTER')
+    parser.add_argument('--metadata', action='store_true',
+                        help='Also report metadata changes other than designer positions')
+    args = parser.parse_args()
+
+    try:
+        before, after = Blueprint.load(args.before), Blueprint.load(args.after)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+    result = diff(before, after, args.metadata)
+    print_diff(result, before, after)
+    sys.exit(0 if is_empty(result) else 1)
+
+
+if __name__ == '__main__':
+    main()
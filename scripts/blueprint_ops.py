@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Blueprint Operation Estimate
+============================
+Static estimate of the Make.com operations, external calls and latency of
+one scenario run, read from a blueprint in make-blueprints/. Nothing is
+sent to Make.com; the flow graph is walked with the Blueprint model.
+
+Usage:
+    python3 scripts/blueprint_ops.py
+    python3 scripts/blueprint_ops.py make-blueprints/phase-1-io-submission-project-creation.json --products 1 5 10
+    python3 scripts/blueprint_ops.py --compare /tmp/before.json /tmp/after.json
+    python3 scripts/blueprint_ops.py --latency Drive=900 --latency Postgres=120
+
+A run is one trigger bundle (one IO submission). Counting rules:
+- every module execution is one operation, per bundle it processes.
+  Routers are free; placeholders are free unless --count-placeholders.
+- search modules (google-sheets:filterRows) and iterators emit N bundles,
+  one per product, and every later module in the same flow (including
+  routes of later routers) runs N times. An aggregator with a feeder
+  collapses its feeder's bundles back to one.
+- a module with a filter runs only if the filter passes; if it fails, the
+  bundle stops there and the rest of that flow does not run. Best case =
+  every filter fails, worst case = every filter passes. Router routes whose
+  filters exclude each other make the worst case an upper bound.
+- modules after a router in the same flow run once the router is done,
+  as build_blueprint.py lays them out (see docs/io-automation.md).
+
+Latency is the sum of per-call estimates (SERVICE_LATENCY_MS), since
+Make.com runs modules and bundles one after the other.
+
+--compare prints the difference between two blueprints, e.g. the committed
+file and the output of `build_blueprint.py --out`.
+"""
+
+import os
+import sys
+import glob
+import argparse
+from collections import Counter
+
+from common import SCRIPT_DIR
+from blueprint import Blueprint, child_flows
+
+# ── Constants ──────────────────────────────────────────────────────────────────
+
+BLUEPRINT_DIR = os.path.join(SCRIPT_DIR, '..', 'make-blueprints')
+
+DEFAULT_PRODUCTS = [1, 3, 10]
+
+# App prefix of the module type -> service. Anything else runs inside Make.com.
+SERVICES = {
+    'postgres':      'Postgres',
+    'google-drive':  'Drive',
+    'google-sheets': 'Sheets',
+    'asana':         'Asana',
+    'slack':         'Slack',
+    'http':          'HTTP',
+}
+INTERNAL = 'Make'
+
+# HTTP modules whose URL contains the host are counted as calls to that service
+HTTP_HOSTS = {
+    'app.asana.com':  'Asana',
+    'slack.com':      'Slack',
+    'googleapis.com': 'Drive',
+}
+
+# Rough per-call latency (ms) as seen from Make.com; override with --latency
+SERVICE_LATENCY_MS = {
+    'Postgres': 80,
+    'Drive':    700,
+    'Sheets':   500,
+    'Asana':    600,
+    'Slack':    300,
+    'HTTP':     500,
+    'Make':     10,
+}
+
+FREE_MODULES = {'builtin:BasicRouter'}
+PLACEHOLDER = 'placeholder:Placeholder'
+
+# Modules that output one bundle per row/item found
+ITERATORS = {'google-sheets:filterRows', 'builtin:BasicFeeder'}
+AGGREGATORS = {'util:TextAggregator', 'builtin:BasicAggregator', 'json:AggregateToJSON'}
+
+CASES = ('best', 'worst')
+
+
+# ── Model ──────────────────────────────────────────────────────────────────────
+
+def service(module):
+    app = module['module'].split(':', 1)[0]
+    name = SERVICES.get(app, INTERNAL)
+    if name == 'HTTP':
+        url = str((module.get('mapper') or {}).get('url', ''))
+        for host, target in HTTP_HOSTS.items():
+            if host in url:
+                return target
+    return name
+
+
+def label(module):
+    return (module.get('metadata') or {}).get('designer', {}).get('name') or ''
+
+
+class Tally:
+    """Operations, calls per service and latency for one case."""
+
+    def __init__(self):
+        self.ops = 0
+        self.calls = Counter()
+        self.latency_ms = 0
+
+    def __sub__(self, other):
+        diff = Tally()
+        diff.ops = self.ops - other.ops
+        diff.calls = Counter(self.calls)
+        diff.calls.subtract(other.calls)
+        diff.latency_ms = self.latency_ms - other.latency_ms
+        return diff
+
+
+class Estimator:
+
+    def __init__(self, products, latency=None, count_placeholders=False):
+        self.products = products
+        self.latency = dict(SERVICE_LATENCY_MS, **(latency or {}))
+        self.free = set(FREE_MODULES)
+        if not count_placeholders:
+            self.free.add(PLACEHOLDER)
+
+    def cost(self, module):
+        return 0 if module['module'] in self.free else 1
+
+    def walk(self, flow, bundles, case, tally):
+        """Add one pass of `flow` with `bundles` input bundles to `tally`."""
+        before = {}  # iterator id -> bundles entering it
+        for module in flow:
+            if case == 'best' and module.get('filter'):
+                return
+            if module['module'] in AGGREGATORS:
+                feeder = (module.get('parameters') or {}).get('feeder')
+                bundles = before.get(feeder, bundles)
+            ops = self.cost(module) * bundles
+            tally.ops += ops
+            if ops:
+                name = service(module)
+                if name != INTERNAL:
+                    tally.calls[name] += ops
+                tally.latency_ms += ops * self.latency.get(name, 0)
+            for child in child_flows(module):
+                self.walk(child, bundles, case, tally)
+            if module['module'] in ITERATORS:
+                before[module['id']] = bundles
+                bundles *= self.products
+
+    def run(self, bp):
+        """{case: Tally} for one trigger bundle."""
+        result = {}
+        for case in CASES:
+            tally = Tally()
+            self.walk(bp.flow, 1, case, tally)
+            result[case] = tally
+        return result
+
+
+def paths(bp, flow=None, depth=0, name='main flow'):
+    """[(name, iterator depth, flow)] for the main flow and every route. A
+    path at depth k is entered N^k times per run."""
+    flow = bp.flow if flow is None else flow
+    found = [(name, depth, flow)]
+    for module in flow:
+        for i, route in enumerate(module.get('routes') or [], 1):
+            if 'flow' not in route:
+                continue
+            first = route['flow'][0]['id'] if route['flow'] else '-'
+            found += paths(bp, route['flow'], depth, f"router {module['id']} route {i} ({first})")
+        if module['module'] in AGGREGATORS:
+            depth = max(depth - 1, 0)
+        if module['module'] in ITERATORS:
+            depth += 1
+    return found
+
+
+def _bundles(depth):
+    return '1' if depth == 0 else 'N' if depth == 1 else f'N^{depth}'
+
+
+def path_ops(estimator, flow):
+    """{case: ops} for one bundle entering `flow`, nested routes included."""
+    saved, estimator.products = estimator.products, 1
+    try:
+        result = {}
+        for case in CASES:
+            tally = Tally()
+            estimator.walk(flow, 1, case, tally)
+            result[case] = tally.ops
+        return result
+    finally:
+        estimator.products = saved
+
+
+# ── Output ─────────────────────────────────────────────────────────────────────
+
+def print_modules(bp, estimator):
+    print(f"{'id':>4}  {'module':<32} {'service':<9} {'ops':>3}  {'filter':<6} label")
+    for module in bp.modules():
+        flt = 'yes' if module.get('filter') else ''
+        print(f"{module['id']:>4}  {module['module']:<32} {service(module):<9} "
+              f"{estimator.cost(module):>3}  {flt:<6} {label(module)[:40]}")
+
+
+def print_paths(bp, estimator):
+    print(f"\n{'path':<36} {'bundles':>7} {'best':>5} {'worst':>6}   (ops per bundle)")
+    for name, depth, flow in paths(bp):
+        ops = path_ops(estimator, flow)
+        print(f"{name:<36} {_bundles(depth):>7} {ops['best']:>5} {ops['worst']:>6}")
+
+
+def _fmt(value, signed):
+    return f"{value:+}" if signed else f"{value}"
+
+
+def print_totals(results, signed=False):
+    """results: {products: {case: Tally}}."""
+    counts = list(results)
+    services = sorted({s for r in results.values() for t in r.values() for s in t.calls},
+                      key=lambda s: list(SERVICE_LATENCY_MS).index(s)
+                      if s in SERVICE_LATENCY_MS else len(SERVICE_LATENCY_MS))
+    header = ''.join(f"{f'N={n}':>16}" for n in counts)
+    print(f"\n{'per run':<18}{header}")
+    print(f"{'':<18}" + ''.join(f"{'best':>8}{'worst':>8}" for _ in counts))
+
+    def row(title, get):
+        cells = ''.join(f"{_fmt(get(results[n]['best']), signed):>8}"
+                        f"{_fmt(get(results[n]['worst']), signed):>8}" for n in counts)
+        print(f"{title:<18}{cells}")
+
+    row('operations', lambda t: t.ops)
+    for name in services:
+        row(f'  {name} calls', lambda t, name=name: t.calls[name])
+    row('latency (s)', lambda t: round(t.latency_ms / 1000, 1))
+
+
+def report(path, args, latency):
+    bp = Blueprint.load(path)
+    estimator = Estimator(1, latency, args.count_placeholders)
+    print(f"{os.path.basename(path)}  ({len(bp)} modules)\n")
+    if not args.summary:
+        print_modules(bp, estimator)
+        print_paths(bp, estimator)
+    results = {}
+    for n in args.products:
+        estimator.products = n
+        results[n] = estimator.run(bp)
+    print_totals(results)
+
+
+def compare(before_path, after_path, args, latency):
+    before, after = Blueprint.load(before_path), Blueprint.load(after_path)
+    estimator = Estimator(1, latency, args.count_placeholders)
+    results = {}
+    for n in args.products:
+        estimator.products = n
+        a, b = estimator.run(before), estimator.run(after)
+        results[n] = {case: b[case] - a[case] for case in CASES}
+    print(f"{os.path.basename(after_path)} vs {os.path.basename(before_path)}")
+    print_totals(results, signed=True)
+
+
+# ── Main ───────────────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description='Estimate Make.com operations per scenario run')
+    parser.add_argument('blueprints', nargs='*', metavar='FILE',
+                        help='Blueprint JSON (default: every file in make-blueprints/)')
+    parser.add_argument('--products', type=int, nargs='+', default=DEFAULT_PRODUCTS, metavar='N',
+                        help=f'Products per IO to estimate for (default: {DEFAULT_PRODUCTS})')
+    parser.add_argument('--latency', action='append', default=[], metavar='SERVICE=MS',
+                        help='Override a per-call latency estimate (repeatable)')
+    parser.add_argument('--count-placeholders', action='store_true',
+                        help='Count placeholder modules as one operation each')
+    parser.add_argument('--summary', action='store_true',
+                        help='Only print the per-run totals')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='Print the change in totals from BEFORE to AFTER and exit')
+    args = parser.parse_args()
+
+    latency = {}
+    for item in args.latency:
+        name, sep, ms = item.partition('=')
+        if not sep or not ms.isdigit():
+            print(f"ERROR: --latency must look like SERVICE=MS, got {item!r}")
+            sys.exit(1)
+        latency[name] = int(ms)
+
+    if args.compare:
+        compare(*args.compare, args, latency)
+        return
+
+    files = args.blueprints or sorted(glob.glob(os.path.join(BLUEPRINT_DIR, '*.json')))
+    if not files:
+        print(f"ERROR: no blueprints found in {BLUEPRINT_DIR}")
+        sys.exit(1)
+    for i, path in enumerate(files):
+        if i:
+            print('\n' + '─' * 80 + '\n')
+        report(path, args, latency)
+
+
+if __name__ == '__main__':
+    main()
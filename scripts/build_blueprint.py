@@ -1,12 +1,27 @@
 """
 Builds the updated Make.com blueprint for the IO submission scenario.
 Replaces the flat Drive folder creation (modules 12 and 23) with
-the full 4-tier find-or-create logic plus io_products DB write.
+the full 4-tier find-or-create logic plus io_products DB write
+(resolve_io_folder_plan / record_created_folders, sql/migrate-io-folder-plan.sql).
 
 Run: python3 scripts/build_blueprint.py
+     python3 scripts/build_blueprint.py --check      # validate only, exit 1 if out of date
+     python3 scripts/build_blueprint.py --out /tmp/io.json
+     python3 scripts/build_blueprint.py --diff       # also print what changed (blueprint_diff.py)
+
+Each change is a declarative step (STEPS, see blueprint.py) that is skipped
+if the blueprint already has it, so the build can be re-run safely. The
+result is validated (unique module ids, every {{N.field}} reference points
+at a module that runs earlier on the same path) before it is written, and
+the write is atomic.
 """
 
-import json
+import sys
+import argparse
+
+from blueprint import (AppendText, Blueprint, PatchError, RemoveModule, RenameModule,
+                       ReplaceModules, SetValue, apply_patch)
+from blueprint_diff import diff, print_diff
 
 BLUEPRINT_PATH = 'make-blueprints/phase-1-io-submission-project-creation.json'
 
@@ -175,16 +190,6 @@ def router_mod(mid, routes, x=0):
     }
 
 
-def rename_module_id(flow, old_id, new_id):
-    """Recursively rename a module ID throughout the flow (including nested routes)."""
-    for m in flow:
-        if m.get('id') == old_id:
-            m['id'] = new_id
-        if 'routes' in m:
-            for route in m['routes']:
-                rename_module_id(route.get('flow', []), old_id, new_id)
-
-
 # ── expressions ──────────────────────────────────────────────────────────────
 
 TIER3_NAME = (
@@ -201,31 +206,43 @@ TIER3_NAME = (
 IO_FOLDER_NAME = '[{{2.`5`}}] {{2.`4`}} {{2.`3`}} {{40.`0`}} ({{32.`Unique ID`}})'
 
 YEAR_EXPR   = '{{formatDate(2.`3`; "YYYY")}}'
-TIER1_ID    = '{{ifempty(58.tier1_folder_id; 60.id)}}'
-TIER2_ID    = '{{ifempty(58.tier2_folder_id; 61.id)}}'
-TIER3_ID    = '{{ifempty(59.product_type_folder_id; 63.id)}}'
-TIER4_ID    = '{{ifempty(59.year_folder_id; 64.id)}}'
+TIER1_ID    = '{{75.resolved_tier1}}'
+TIER2_ID    = '{{76.resolved_tier2}}'
+TIER3_ID    = '{{77.resolved_tier3}}'
+TIER4_ID    = '{{78.resolved_tier4}}'
+
+
+def missing(tier):
+    """Filter condition: resolve_io_folder_plan listed `tier` as missing."""
+    return [{"a": "{{58.missing_tiers}}", "b": tier, "o": "array:contain"}]
+
 
 # ── new modules (replace module 23) ──────────────────────────────────────────
 #
-# Each conditional Drive/DB module is wrapped in a router (ids 69-74) with a
-# pass-through branch (placeholder ids 90-95). This ensures execution always
+# Two Postgres calls per product: resolve_io_folder_plan (58) returns every
+# cached tier ID plus the tiers missing from Drive, and record_created_folders
+# (67) stores the resolved IDs and the io_products row in one transaction.
+#
+# Each conditional Drive module is wrapped in a router (ids 69-73) with a
+# pass-through branch (placeholder ids 90-94). This ensures execution always
 # continues past the router whether or not the condition was met.
 #
+# Make.com does not let a module in one router branch reference a module in
+# another router's branch, so each tier ID is resolved by a SetVariables
+# module in the main flow right after its router (75-78), and later
+# modules reference those instead of the Drive modules.
+#
 # Module ID map:
 #   57       SetVariables (per-product vars)
-#   58       get_client_folder_info
-#   59       get_product_folder_info
-#   69/60    Router / Create Tier 1 folder
-#   70/61    Router / Create Tier 2 folder
-#   71/62    Router / Store Tier 1+2 IDs
-#   72/63    Router / Create Tier 3 folder
-#   73/64    Router / Create Tier 4 folder
-#   74/65    Router / Store Tier 3+4 IDs
+#   58       resolve_io_folder_plan
+#   69/60    Router / Create Tier 1 folder,          75 resolved_tier1
+#   70/61    Router / Create Tier 2 folder,          76 resolved_tier2
+#   72/63    Router / Create Tier 3 folder,          77 resolved_tier3
+#   73/64    Router / Create Tier 4 folder,          78 resolved_tier4
 #   66       Create IO folder (always)
-#   67       Record product in DB (always)
+#   67       record_created_folders (always)
 #   68       Write unique ID to Products sheet (always)
-#   90-95    Pass-through placeholders inside routers
+#   90-94    Pass-through placeholders inside routers
 
 new_modules = [
 
@@ -235,37 +252,38 @@ new_modules = [
         {"name": "ioFolderName",    "value": IO_FOLDER_NAME}
     ], x=4800),
 
-    # 58 — look up Tier 1 + 2 folder IDs from DB
-    pg_mod(58, "get_client_folder_info", "Look up client folder IDs",
-        {"@01:text": "{{2.`5`}}"},
-        [
-            {"name": "tla",             "type": "text", "label": "tla"},
-            {"name": "client_name",     "type": "text", "label": "client_name"},
-            {"name": "primary_contact", "type": "text", "label": "primary_contact"},
-            {"name": "tier1_folder_id", "type": "text", "label": "tier1_folder_id"},
-            {"name": "tier2_folder_id", "type": "text", "label": "tier2_folder_id"}
-        ], x=5100),
-
-    # 59 — look up Tier 3 + 4 folder IDs from DB
-    pg_mod(59, "get_product_folder_info", "Look up product folder IDs",
+    # 58 — look up all four tier folder IDs and which are missing
+    pg_mod(58, "resolve_io_folder_plan", "Resolve Drive folder plan",
         {
             "@01:text": "{{2.`5`}}",
             "@02:text": "{{40.`0`}}",
             "@03:text": YEAR_EXPR
         },
         [
-            {"name": "product_type_folder_id", "type": "text", "label": "product_type_folder_id"},
-            {"name": "year_folder_id",         "type": "text", "label": "year_folder_id"}
-        ], x=5400),
+            {"name": "tla",             "type": "text",  "label": "tla"},
+            {"name": "client_name",     "type": "text",  "label": "client_name"},
+            {"name": "primary_contact", "type": "text",  "label": "primary_contact"},
+            {"name": "tier1_folder_id", "type": "text",  "label": "tier1_folder_id"},
+            {"name": "tier2_folder_id", "type": "text",  "label": "tier2_folder_id"},
+            {"name": "tier3_folder_id", "type": "text",  "label": "tier3_folder_id"},
+            {"name": "tier4_folder_id", "type": "text",  "label": "tier4_folder_id"},
+            {"name": "missing_tiers",   "type": "array", "label": "missing_tiers",
+             "spec": {"type": "text"}}
+        ], x=5100),
 
     # Router 69: create Tier 1 if missing
     router_mod(69, [
         {"flow": [drive_mod(60, "Create Tier 1 (company) folder",
             "[{{58.tla}}] {{58.client_name}}",
             CLIENT_PROJECTS,
-            flt("Only if Tier 1 folder missing", empty("{{58.tier1_folder_id}}")),
-            x=5700)]},
+            flt("Only if Tier 1 folder missing", missing("tier1")),
+            x=5400)]},
         {"flow": [placeholder_mod(90)]}
+    ], x=5400),
+
+    # 75 — resolve Tier 1 ID (cached or just created)
+    setvars_mod(75, "Resolve Tier 1 folder ID", [
+        {"name": "resolved_tier1", "value": "{{ifempty(58.tier1_folder_id; 60.id)}}"}
     ], x=5700),
 
     # Router 70: create Tier 2 if missing
@@ -273,25 +291,14 @@ new_modules = [
         {"flow": [drive_mod(61, "Create Tier 2 (contact) folder",
             "[{{2.`5`}}] {{58.primary_contact}}",
             TIER1_ID,
-            flt("Only if Tier 2 folder missing", empty("{{58.tier2_folder_id}}")),
+            flt("Only if Tier 2 folder missing", missing("tier2")),
             x=6000)]},
         {"flow": [placeholder_mod(91)]}
     ], x=6000),
 
-    # Router 71: store Tier 1+2 IDs if either was just created
-    router_mod(71, [
-        {"flow": [pg_mod(62, "update_client_folder_ids", "Store Tier 1+2 folder IDs",
-            {
-                "@01:text": "{{2.`5`}}",
-                "@02:text": TIER1_ID,
-                "@03:text": TIER2_ID
-            },
-            [{"name": "update_client_folder_ids", "type": "boolean", "label": "update_client_folder_ids"}],
-            flt("Only if Tier 1 or Tier 2 was missing",
-                empty("{{58.tier1_folder_id}}"),
-                empty("{{58.tier2_folder_id}}")),
-            x=6300)]},
-        {"flow": [placeholder_mod(92)]}
+    # 76 — resolve Tier 2 ID (cached or just created)
+    setvars_mod(76, "Resolve Tier 2 folder ID", [
+        {"name": "resolved_tier2", "value": "{{ifempty(58.tier2_folder_id; 61.id)}}"}
     ], x=6300),
 
     # Router 72: create Tier 3 if missing
@@ -299,56 +306,54 @@ new_modules = [
         {"flow": [drive_mod(63, "Create Tier 3 (product type) folder",
             "[{{2.`5`}}] {{57.tier3FolderName}}",
             TIER2_ID,
-            flt("Only if Tier 3 folder missing", empty("{{59.product_type_folder_id}}")),
+            flt("Only if Tier 3 folder missing", missing("tier3")),
             x=6600)]},
         {"flow": [placeholder_mod(93)]}
     ], x=6600),
 
+    # 77 — resolve Tier 3 ID (cached or just created)
+    setvars_mod(77, "Resolve Tier 3 folder ID", [
+        {"name": "resolved_tier3", "value": "{{ifempty(58.tier3_folder_id; 63.id)}}"}
+    ], x=6900),
+
     # Router 73: create Tier 4 if missing
     router_mod(73, [
         {"flow": [drive_mod(64, "Create Tier 4 (year) folder",
             YEAR_EXPR,
             TIER3_ID,
-            flt("Only if Tier 4 folder missing", empty("{{59.year_folder_id}}")),
-            x=6900)]},
-        {"flow": [placeholder_mod(94)]}
-    ], x=6900),
-
-    # Router 74: store Tier 3+4 IDs if either was just created
-    router_mod(74, [
-        {"flow": [pg_mod(65, "upsert_product_folder", "Store Tier 3+4 folder IDs",
-            {
-                "@01:text": "{{2.`5`}}",
-                "@02:text": "{{40.`0`}}",
-                "@03:text": YEAR_EXPR,
-                "@04:text": TIER3_ID,
-                "@05:text": TIER4_ID
-            },
-            [{"name": "upsert_product_folder", "type": "text", "label": "upsert_product_folder"}],
-            flt("Only if Tier 3 or Tier 4 was missing",
-                empty("{{59.product_type_folder_id}}"),
-                empty("{{59.year_folder_id}}")),
+            flt("Only if Tier 4 folder missing", missing("tier4")),
             x=7200)]},
-        {"flow": [placeholder_mod(95)]}
+        {"flow": [placeholder_mod(94)]}
     ], x=7200),
 
+    # 78 — resolve Tier 4 ID (cached or just created)
+    setvars_mod(78, "Resolve Tier 4 folder ID", [
+        {"name": "resolved_tier4", "value": "{{ifempty(58.tier4_folder_id; 64.id)}}"}
+    ], x=7500),
+
     # 66 — create IO folder (always)
     drive_mod(66, "Create IO folder",
         IO_FOLDER_NAME,
         TIER4_ID,
-        None, x=7500),
+        None, x=7800),
 
-    # 67 — record product in DB
-    pg_mod(67, "upsert_io_product", "Record product in DB",
+    # 67 — store created tier IDs + record product in DB (one transaction)
+    pg_mod(67, "record_created_folders", "Record folders and product in DB",
         {
-            "@01:text": "{{2.`4`}}",
+            "@01:text": "{{2.`5`}}",
             "@02:text": "{{40.`0`}}",
-            "@03:text": "{{40.`1`}}",
-            "@04:text": "{{32.`Unique ID`}}",
-            "@05:text": "{{66.id}}"
+            "@03:text": YEAR_EXPR,
+            "@04:text": TIER1_ID,
+            "@05:text": TIER2_ID,
+            "@06:text": TIER3_ID,
+            "@07:text": TIER4_ID,
+            "@08:text": "{{2.`4`}}",
+            "@09:text": "{{40.`1`}}",
+            "@10:text": "{{32.`Unique ID`}}",
+            "@11:text": "{{66.id}}"
         },
-        [{"name": "upsert_io_product", "type": "integer", "label": "upsert_io_product"}],
-        None, x=7800),
+        [{"name": "record_created_folders", "type": "integer", "label": "record_created_folders"}],
+        None, x=8100),
 
     # 68 — write unique_id back to Products sheet col E
     {
@@ -367,7 +372,7 @@ new_modules = [
             "valueInputOption": "USER_ENTERED"
         },
         "metadata": {
-            "designer": {"x": 8100, "y": 300, "name": "Write unique ID to Products sheet"},
+            "designer": {"x": 8400, "y": 300, "name": "Write unique ID to Products sheet"},
             "restore": {
                 "expect": {
                     "from":  {"label": "Shared with me"},
@@ -408,51 +413,72 @@ new_modules = [
     }
 ]
 
-# ── apply changes ─────────────────────────────────────────────────────────────
-
-with open(BLUEPRINT_PATH) as f:
-    data = json.load(f)
-
-flow = data['flow']
+# ── patch steps ──────────────────────────────────────────────────────────────
+#
+# Applied in order by blueprint.apply_patch. Steps already present in the
+# blueprint are skipped, so re-running the build is a no-op.
 
-# 0. Fix placeholder ID conflicts: existing router uses 65+66 as placeholder IDs,
-#    which clash with new modules 65+66. Rename them to 80+81.
-rename_module_id(flow, 65, 80)
-rename_module_id(flow, 66, 81)
+STEPS = [
+    # Existing router uses 65+66 as placeholder IDs; 66 clashes with the new
+    # IO folder module. Rename both to 80+81.
+    RenameModule(65, 80, "placeholder:Placeholder", "Rename placeholder 65 -> 80"),
+    RenameModule(66, 81, "placeholder:Placeholder", "Rename placeholder 66 -> 81"),
 
-# 1. Remove module 12 (old flat Drive folder creation)
-flow[:] = [m for m in flow if m.get('id') != 12]
+    RemoveModule(12, "google-drive:createAFolder", "Remove module 12 (old flat Drive folder)"),
 
-# 2. Module 10: remove Drive link write-back (col S, field "18")
-for m in flow:
-    if m.get('id') == 10:
-        m['mapper']['values'].pop('18', None)
+    SetValue(10, ("mapper", "values", "18"), SetValue.DELETE,
+             "Module 10: remove Drive link write-back (col S)"),
 
-# 3. Module 54: store Metabase IO dashboard link instead of Drive link
-for m in flow:
-    if m.get('id') == 54:
-        m['mapper']['@03:text'] = METABASE_IO_URL
+    SetValue(54, ("mapper", "@03:text"), METABASE_IO_URL,
+             "Module 54: store Metabase IO dashboard link"),
 
-# 4. Module 41: strip deliverables to product type only
-for m in flow:
-    if m.get('id') == 41:
-        m['mapper']['value'] = '- {{40.`0`}}'
+    SetValue(41, ("mapper", "value"), '- {{40.`0`}}',
+             "Module 41: deliverables list shows product type only"),
 
-# 5. Module 47: add Metabase IO dashboard link to goal notes
-for m in flow:
-    if m.get('id') == 47:
-        m['mapper']['data']['notes'] += '\n\nFull IO details: ' + METABASE_IO_URL
+    AppendText(47, ("mapper", "data", "notes"), '\n\nFull IO details: ' + METABASE_IO_URL,
+               "Module 47: add Metabase IO dashboard link to goal notes"),
 
-# 6. Replace module 23 with new modules 57-68 (wrapped in routers where conditional)
-for i, m in enumerate(flow):
-    if m.get('id') == 23:
-        flow[i:i+1] = new_modules
-        print(f"Replaced module 23 at index {i} with {len(new_modules)} new modules")
-        break
-else:
-    print("WARNING: module 23 not found in top-level flow")
+    ReplaceModules(23, new_modules,
+                   f"Replace module 23 with {len(new_modules)} folder modules"),
+]
 
-with open(BLUEPRINT_PATH, 'w') as f:
-    json.dump(data, f, indent=2)
 
-print("Blueprint written.")
+# ── main ─────────────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the IO submission blueprint')
+    parser.add_argument('--out', metavar='FILE',
+                        help=f'Write to FILE instead of updating {BLUEPRINT_PATH} in place')
+    parser.add_argument('--check', action='store_true',
+                        help='Apply and validate in memory only; exit 1 if any step would apply')
+    parser.add_argument('--diff', action='store_true',
+                        help='Print a semantic diff of the written blueprint against the original')
+    args = parser.parse_args()
+
+    original = Blueprint.load(BLUEPRINT_PATH) if args.diff else None
+
+    try:
+        report = apply_patch(BLUEPRINT_PATH, STEPS, out=args.out, write=not args.check)
+    except PatchError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+    for name, result in report:
+        print(f"  {result:<8} {name}")
+    applied = sum(1 for _, r in report if r == 'applied')
+
+    if args.check:
+        print(f"\n{applied} step(s) would apply; result validates.")
+        sys.exit(1 if applied else 0)
+    if applied or args.out:
+        print(f"\nBlueprint written to {args.out or BLUEPRINT_PATH}.")
+    else:
+        print("\nBlueprint already up to date.")
+    if original and (applied or args.out):
+        print()
+        written = Blueprint.load(args.out or BLUEPRINT_PATH)
+        print_diff(diff(original, written), original, written)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Shared Script Helpers
+=====================
+Environment loading, the DB connection and Google API clients used by
+audit_drive_folders.py and sync_client_sheet.py.
+
+Google clients
+--------------
+- The google libraries are imported lazily, inside the functions that need
+  them, so `--help`, argument errors and DB-only code paths start without
+  paying their import cost.
+- Services are built from the discovery documents bundled with
+  google-api-python-client (static_discovery=True), so no discovery fetch
+  goes over the network on start-up.
+- Each thread gets one AuthorizedHttp (keep-alive httplib2 connection) and
+  one service per API, reused for every call that thread makes.
+  googleapiclient services and httplib2 connections are not thread-safe, so
+  they are never shared between threads.
+- Credentials are refreshed proactively once they are within REFRESH_MARGIN
+  of expiry, and the refreshed token is written back to token.json.
+
+Both scripts share token.json, so they request the same SCOPES.
+"""
+
+import os
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SCOPES = [
+    'https://www.googleapis.com/auth/drive.readonly',
+    'https://www.googleapis.com/auth/spreadsheets.readonly',
+]
+TOKEN_FILE = os.path.join(SCRIPT_DIR, 'token.json')
+SECRETS_FILE = os.path.join(SCRIPT_DIR, 'client_secrets.json')
+
+# Refresh the access token this long before it expires
+REFRESH_MARGIN = timedelta(minutes=5)
+
+HTTP_TIMEOUT = 60
+
+
+# ── Env loader ────────────────────────────────────────────────────────────────
+
+def load_env():
+    """Load key=value pairs from scripts/.env or scripts/scripts.env into os.environ."""
+    for name in ('.env', 'scripts.env'):
+        env_path = os.path.join(SCRIPT_DIR, name)
+        if os.path.exists(env_path):
+            with open(env_path) as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith('#') or '=' not in line:
+                        continue
+                    key, _, value = line.partition('=')
+                    os.environ.setdefault(key.strip(), value.strip())
+            break
+
+load_env()
+
+
+# ── DB ─────────────────────────────────────────────────────────────────────────
+
+def get_db_connection():
+    import psycopg2
+    return psycopg2.connect(
+        host=os.environ['DB_HOST'],
+        dbname=os.environ.get('DB_NAME', 'bitesize_bio'),
+        user=os.environ['DB_USER'],
+        password=os.environ['DB_PASS'],
+        port=int(os.environ.get('DB_PORT', 5432)),
+        connect_timeout=15,
+        client_encoding='UTF8',
+    )
+
+
+# ── Google auth ────────────────────────────────────────────────────────────────
+
+def _save_token(creds):
+    with open(TOKEN_FILE, 'w') as f:
+        f.write(creds.to_json())
+
+
+def refresh_if_expiring(creds):
+    """Refresh creds if they expire within REFRESH_MARGIN. Returns True if refreshed."""
+    from google.auth.transport.requests import Request
+
+    # google-auth stores expiry as a naive UTC datetime
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    if creds.expiry and creds.expiry - now > REFRESH_MARGIN:
+        return False
+    if not creds.refresh_token:
+        return False
+    creds.refresh(Request())
+    _save_token(creds)
+    return True
+
+
+def get_credentials():
+    """Load token.json, refreshing it (or running the browser flow) as needed."""
+    from google.oauth2.credentials import Credentials
+
+    creds = None
+    if os.path.exists(TOKEN_FILE):
+        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+
+    if creds:
+        try:
+            refresh_if_expiring(creds)
+        except Exception:
+            creds = None
+
+    if not creds or not creds.valid:
+        from google_auth_oauthlib.flow import InstalledAppFlow
+
+        if not os.path.exists(SECRETS_FILE):
+            print(f"ERROR: {SECRETS_FILE} not found.")
+            print("See audit_drive_folders.py docstring for setup instructions.")
+            sys.exit(1)
+        flow = InstalledAppFlow.from_client_secrets_file(SECRETS_FILE, SCOPES)
+        creds = flow.run_local_server(port=0)
+        _save_token(creds)
+
+    return creds
+
+
+# ── Services ───────────────────────────────────────────────────────────────────
+
+_local = threading.local()
+
+
+def get_service(api, version, creds):
+    """Return this thread's service for (api, version), building it on first use."""
+    services = getattr(_local, 'services', None)
+    if services is None:
+        services = _local.services = {}
+    key = (api, version, id(creds))
+    if key not in services:
+        import httplib2
+        from google_auth_httplib2 import AuthorizedHttp
+        from googleapiclient.discovery import build
+
+        http = getattr(_local, 'http', None)
+        if http is None or http.credentials is not creds:
+            http = _local.http = AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+        services[key] = build(api, version, http=http,
+                              static_discovery=True, cache_discovery=False)
+    return services[key]
+
+
+def service_factory(api, version, creds):
+    """Zero-argument callable returning the calling thread's service, for
+    drive_tree.walk_folders and other code that takes a service_factory."""
+    return lambda: get_service(api, version, creds)
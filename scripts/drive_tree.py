@@ -0,0 +1,335 @@
+"""
+Drive Folder Tree
+=================
+Breadth-first traversal of the Client Projects folder hierarchy, used by
+audit_drive_folders.py.
+
+Each tier is fetched with as few round-trips as possible: the parents on the
+current frontier are grouped into batched queries
+("'a' in parents or 'b' in parents ...") and the batches are run on a bounded
+worker pool. A four-tier walk therefore costs roughly one round-trip chain per
+tier rather than one per folder.
+
+inventory_folders() goes further for full audits: it pulls every folder in
+the shared drive with a single paginated query and rebuilds the tree locally
+from the parent index.
+
+For incremental audits, fetch_folder_changes() reads the Drive Changes feed
+from a saved page token, apply_changes() folds those changes into a saved
+{folder_id: {'name', 'parents'}} snapshot, and diff_trees() reports what
+moved between two trees.
+
+Nothing in this module imports the Google client libraries. Callers pass a
+`service_factory` — a zero-argument callable returning a Drive v3 service
+object — so a fake service can be injected in place of
+build('drive', 'v3', ...). The factory is called once per worker thread,
+because googleapiclient service objects are not thread-safe.
+"""
+
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+FOLDER_MIME = 'application/vnd.google-apps.folder'
+
+# Parents per batched files().list query. Keeps q well under Drive's
+# query length limit (each clause is ~50 chars).
+PARENTS_PER_QUERY = 40
+
+DEFAULT_WORKERS = 8
+
+# Changes feed: page token rejected as invalid/expired → caller falls back to a full rescan.
+# A 400 counts only when Drive's error names the page token; any other 400
+# (bad driveId, bad fields mask) is a real error and is raised.
+EXPIRED_TOKEN_STATUSES = {404, 410}
+INVALID_TOKEN_MARKERS = ('pagetoken', 'page token')
+
+# Retried with exponential backoff; 403 only when Drive reports a rate limit
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+
+
+# ── Backoff ───────────────────────────────────────────────────────────────────
+
+def _is_retryable(exc):
+    """True for googleapiclient HttpErrors that are worth retrying.
+    Duck-typed on exc.resp.status so fake services can raise their own errors."""
+    status = getattr(getattr(exc, 'resp', None), 'status', None)
+    if status is None:
+        return False
+    status = int(status)
+    if status in RETRY_STATUSES:
+        return True
+    if status == 403:
+        content = getattr(exc, 'content', b'') or b''
+        if isinstance(content, bytes):
+            content = content.decode('utf-8', 'replace')
+        return any(reason in content for reason in RATE_LIMIT_REASONS)
+    return False
+
+
+def _is_expired_token(exc):
+    """True if a changes().list error means the page token is no longer
+    usable. Duck-typed like _is_retryable."""
+    status = getattr(getattr(exc, 'resp', None), 'status', None)
+    if status is None:
+        return False
+    status = int(status)
+    if status in EXPIRED_TOKEN_STATUSES:
+        return True
+    if status == 400:
+        content = getattr(exc, 'content', b'') or b''
+        if isinstance(content, bytes):
+            content = content.decode('utf-8', 'replace')
+        text = f'{content} {exc}'.lower()
+        return any(marker in text for marker in INVALID_TOKEN_MARKERS)
+    return False
+
+
+def execute_with_backoff(request, max_retries=6, base_delay=1.0, sleep=time.sleep):
+    """Execute a Drive API request, backing off on rate limits and 5xx errors.
+    Delay doubles each attempt (1s, 2s, 4s, ...) plus up to base_delay of jitter."""
+    for attempt in range(max_retries + 1):
+        try:
+            return request.execute()
+        except Exception as e:
+            if attempt == max_retries or not _is_retryable(e):
+                raise
+            sleep(base_delay * 2 ** attempt + random.uniform(0, base_delay))
+
+
+# ── Tree ──────────────────────────────────────────────────────────────────────
+
+class FolderTree:
+    """In-memory folder hierarchy below root_id, indexed by id and by parent.
+
+    Each folder is a dict: {'id', 'name', 'parent_id', 'tier'} where tier 1 is
+    a direct child of the root.
+    """
+
+    def __init__(self, root_id):
+        self.root_id = root_id
+        self.folders = {}
+        self.children = defaultdict(list)
+
+    def add(self, folder, parent_id, tier):
+        node = {'id': folder['id'], 'name': folder['name'],
+                'parent_id': parent_id, 'tier': tier}
+        self.folders[node['id']] = node
+        self.children[parent_id].append(node)
+        return node
+
+    def children_of(self, folder_id):
+        """Subfolders of folder_id, sorted by name."""
+        return sorted(self.children.get(folder_id, []), key=lambda f: f['name'])
+
+    def tier(self, n):
+        """All folders at tier n, sorted by name."""
+        return sorted((f for f in self.folders.values() if f['tier'] == n),
+                      key=lambda f: f['name'])
+
+    def __len__(self):
+        return len(self.folders)
+
+
+# ── Drive queries ─────────────────────────────────────────────────────────────
+
+def list_children(service, parent_ids, drive_id):
+    """Return {parent_id: [folder, ...]} for all non-trashed subfolders of
+    parent_ids, using one paginated query for the whole batch."""
+    wanted = set(parent_ids)
+    result = {pid: [] for pid in parent_ids}
+    parents_q = ' or '.join(f"'{pid}' in parents" for pid in parent_ids)
+    page_token = None
+    while True:
+        resp = execute_with_backoff(service.files().list(
+            q=(
+                f"({parents_q})"
+                f" and mimeType='{FOLDER_MIME}'"
+                " and trashed=false"
+            ),
+            fields='nextPageToken, files(id, name, parents)',
+            pageSize=1000,
+            includeItemsFromAllDrives=True,
+            supportsAllDrives=True,
+            corpora='drive',
+            driveId=drive_id,
+            pageToken=page_token,
+        ))
+        for f in resp.get('files', []):
+            for pid in f.get('parents', []):
+                if pid in wanted:
+                    result[pid].append(f)
+        page_token = resp.get('nextPageToken')
+        if not page_token:
+            break
+    return result
+
+
+def walk_folders(service_factory, root_id, drive_id, depth,
+                 workers=DEFAULT_WORKERS, batch_size=PARENTS_PER_QUERY):
+    """Walk root_id breadth-first down to `depth` tiers and return a FolderTree.
+
+    Each tier's frontier is split into batches of batch_size parents; batches
+    run concurrently on up to `workers` threads, each with its own service.
+    """
+    tree = FolderTree(root_id)
+    local = threading.local()
+
+    def fetch(batch):
+        service = getattr(local, 'service', None)
+        if service is None:
+            service = local.service = service_factory()
+        return list_children(service, batch, drive_id)
+
+    frontier = [root_id]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for tier in range(1, depth + 1):
+            if not frontier:
+                break
+            batches = [frontier[i:i + batch_size]
+                       for i in range(0, len(frontier), batch_size)]
+            next_frontier = []
+            for result in pool.map(fetch, batches):
+                for parent_id, folders in result.items():
+                    for f in folders:
+                        next_frontier.append(tree.add(f, parent_id, tier)['id'])
+            frontier = next_frontier
+
+    return tree
+
+
+def build_tree(children_by_parent, root_id, depth):
+    """Rebuild a FolderTree from a {parent_id: [folder, ...]} index, keeping
+    only folders within `depth` tiers of root_id."""
+    tree = FolderTree(root_id)
+    frontier = [root_id]
+    for tier in range(1, depth + 1):
+        next_frontier = []
+        for parent_id in frontier:
+            for f in children_by_parent.get(parent_id, []):
+                next_frontier.append(tree.add(f, parent_id, tier)['id'])
+        frontier = next_frontier
+    return tree
+
+
+def fetch_all_folders(service, drive_id):
+    """Return every non-trashed folder in the shared drive as
+    [{'id', 'name', 'parents'}, ...], in pages of 1000."""
+    folders = []
+    page_token = None
+    while True:
+        resp = execute_with_backoff(service.files().list(
+            q=f"mimeType='{FOLDER_MIME}' and trashed=false",
+            fields='nextPageToken, files(id, name, parents)',
+            pageSize=1000,
+            includeItemsFromAllDrives=True,
+            supportsAllDrives=True,
+            corpora='drive',
+            driveId=drive_id,
+            pageToken=page_token,
+        ))
+        folders.extend(resp.get('files', []))
+        page_token = resp.get('nextPageToken')
+        if not page_token:
+            break
+    return folders
+
+
+def inventory_folders(service, root_id, drive_id, depth):
+    """Build the FolderTree below root_id from a single whole-drive listing.
+    A handful of paginated calls instead of one query chain per parent."""
+    return tree_from_snapshot(snapshot_folders(fetch_all_folders(service, drive_id)),
+                              root_id, depth)
+
+
+# ── Snapshots and the Changes feed ────────────────────────────────────────────
+
+class PageTokenExpired(Exception):
+    """The saved changes page token is no longer accepted by Drive."""
+
+
+def snapshot_folders(folders):
+    """{folder_id: {'name', 'parents'}} from a list of Drive folder resources."""
+    return {f['id']: {'name': f['name'], 'parents': list(f.get('parents', []))}
+            for f in folders}
+
+
+def tree_from_snapshot(snapshot, root_id, depth):
+    children_by_parent = defaultdict(list)
+    for folder_id, f in snapshot.items():
+        for pid in f['parents']:
+            children_by_parent[pid].append({'id': folder_id, 'name': f['name']})
+    return build_tree(children_by_parent, root_id, depth)
+
+
+def get_start_page_token(service, drive_id):
+    resp = execute_with_backoff(service.changes().getStartPageToken(
+        supportsAllDrives=True,
+        driveId=drive_id,
+    ))
+    return resp['startPageToken']
+
+
+def fetch_folder_changes(service, drive_id, page_token):
+    """Return (changes, new_start_page_token) for everything since page_token.
+    Raises PageTokenExpired if Drive rejects the token."""
+    changes = []
+    while True:
+        try:
+            resp = execute_with_backoff(service.changes().list(
+                pageToken=page_token,
+                driveId=drive_id,
+                includeItemsFromAllDrives=True,
+                supportsAllDrives=True,
+                includeRemoved=True,
+                pageSize=1000,
+                fields=('nextPageToken, newStartPageToken, '
+                        'changes(fileId, removed, file(id, name, parents, trashed, mimeType))'),
+            ))
+        except Exception as e:
+            if _is_expired_token(e):
+                raise PageTokenExpired(str(e)) from e
+            raise
+        changes.extend(resp.get('changes', []))
+        if resp.get('newStartPageToken'):
+            return changes, resp['newStartPageToken']
+        page_token = resp['nextPageToken']
+
+
+def apply_changes(snapshot, changes):
+    """Fold Changes feed entries into a copy of snapshot.
+    Returns (new_snapshot, ids of folders that changed)."""
+    snapshot = dict(snapshot)
+    changed = set()
+    for change in changes:
+        file_id = change.get('fileId')
+        f = change.get('file') or {}
+        if change.get('removed') or f.get('trashed'):
+            if snapshot.pop(file_id, None) is not None:
+                changed.add(file_id)
+        elif f.get('mimeType') == FOLDER_MIME:
+            snapshot[file_id] = {'name': f['name'], 'parents': list(f.get('parents', []))}
+            changed.add(file_id)
+    return snapshot, changed
+
+
+def diff_trees(old, new):
+    """Compare two FolderTrees and return [(change, old_node, new_node), ...]
+    where change is NEW, RENAMED, MOVED or REMOVED. A folder that was both
+    moved and renamed is reported as MOVED."""
+    diff = []
+    for folder_id, node in new.folders.items():
+        before = old.folders.get(folder_id)
+        if before is None:
+            diff.append(('NEW', None, node))
+        elif (before['parent_id'], before['tier']) != (node['parent_id'], node['tier']):
+            diff.append(('MOVED', before, node))
+        elif before['name'] != node['name']:
+            diff.append(('RENAMED', before, node))
+    for folder_id, before in old.folders.items():
+        if folder_id not in new.folders:
+            diff.append(('REMOVED', before, None))
+    return diff
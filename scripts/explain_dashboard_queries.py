@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Dashboard Query Plans
+=====================
+Runs EXPLAIN (ANALYZE, BUFFERS) for every Metabase question in
+docs/metabase-queries.md, every view in the public schema and the live
+queries in REPORT_QUERIES, and records planning/execution time, shared
+buffers and the scans each plan uses.
+
+Point it at a seeded local copy of the database, not production: EXPLAIN
+ANALYZE executes the queries, and --migration locks the tables it indexes.
+
+Usage:
+    python3 scripts/explain_dashboard_queries.py --migration sql/migrate-dashboard-indexes.sql
+    python3 scripts/explain_dashboard_queries.py --label baseline --out plans.json
+    python3 scripts/explain_dashboard_queries.py --param cycle=FC3 --repeat 10
+    python3 scripts/explain_dashboard_queries.py --compare plans.json before after
+
+--migration FILE measures before and after in one transaction that is
+rolled back at the end: indexes the file creates are dropped first (so
+"before" is the pre-migration state even if the DB already has them), the
+queries are measured, the file is executed, and the queries are measured
+again. Results are stored under the labels "before" and "after".
+
+Without --migration the current DB is measured under --label. Results are
+merged into --out (default: dashboard-plans.json), so separate runs can be
+compared later with --compare.
+
+Metabase parameters: optional [[ ... ]] clauses are dropped unless every
+{{param}} in them is given with --param; questions with a required
+parameter that is not given are skipped. Each query runs --repeat times
+and the median execution time is reported.
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import statistics
+
+from common import SCRIPT_DIR, get_db_connection
+
+# ── Constants ──────────────────────────────────────────────────────────────────
+
+DOC_PATH = os.path.join(SCRIPT_DIR, '..', 'docs', 'metabase-queries.md')
+
+DEFAULT_OUT = 'dashboard-plans.json'
+DEFAULT_REPEAT = 5
+
+# Live (non-rollup) queries of generate_weekly_slack_report
+REPORT_QUERIES = [
+    ('report: Due This Week', """
+SELECT m.name, p.name, m.target_date
+FROM milestones m
+JOIN projects p ON m.project_id = p.id
+WHERE m.target_date BETWEEN CURRENT_DATE AND CURRENT_DATE + INTERVAL '7 days'
+  AND m.status NOT IN ('complete', 'cancelled')
+ORDER BY m.target_date"""),
+]
+
+_SECTION_RE = re.compile(r'^## (.+)$', re.M)
+_QUESTION_RE = re.compile(r'^### (.+?)\n(.*?)(?=^##)', re.M | re.S)
+_SQL_FENCE_RE = re.compile(r'```sql\n(.*?)```', re.S)
+_OPTIONAL_RE = re.compile(r'\[\[(.*?)\]\]', re.S)
+_PARAM_RE = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+_CREATE_INDEX_RE = re.compile(
+    r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?(\w+)', re.I)
+
+
+# ── Queries ────────────────────────────────────────────────────────────────────
+
+def load_doc_queries(path=DOC_PATH):
+    """[(name, sql)] for each question under a '## Dashboard...' heading."""
+    with open(path) as f:
+        text = f.read() + '\n##'
+    queries = []
+    sections = list(_SECTION_RE.finditer(text))
+    for i, section in enumerate(sections):
+        if not section.group(1).startswith('Dashboard'):
+            continue
+        end = sections[i + 1].start() if i + 1 < len(sections) else len(text)
+        body = text[section.end():end] + '\n##'
+        for q in _QUESTION_RE.finditer(body):
+            fence = _SQL_FENCE_RE.search(q.group(2))
+            if fence:
+                queries.append((q.group(1).strip(), fence.group(1).strip().rstrip(';')))
+    return queries
+
+
+def _literal(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+def apply_params(sql, params):
+    """Resolve Metabase [[optional]] clauses and {{params}}. None if a
+    required parameter is missing."""
+    def optional(m):
+        names = _PARAM_RE.findall(m.group(1))
+        return m.group(1) if all(n in params for n in names) else ''
+
+    sql = _OPTIONAL_RE.sub(optional, sql)
+    if any(n not in params for n in _PARAM_RE.findall(sql)):
+        return None
+    return _PARAM_RE.sub(lambda m: _literal(params[m.group(1)]), sql)
+
+
+def view_queries(cur):
+    cur.execute("SELECT viewname FROM pg_views WHERE schemaname = 'public' ORDER BY viewname")
+    return [(f'view {name}', f'SELECT * FROM {name}') for (name,) in cur.fetchall()]
+
+
+# ── EXPLAIN ────────────────────────────────────────────────────────────────────
+
+def _walk(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _walk(child)
+
+
+def scans(plan):
+    """Sorted scan descriptions, e.g. 'Index Scan idx_x', 'Seq Scan milestones'."""
+    found = set()
+    for node in _walk(plan):
+        if 'Index Name' in node:
+            found.add(f"{node['Node Type']} {node['Index Name']}")
+        elif node['Node Type'] == 'Seq Scan':
+            found.add(f"Seq Scan {node['Relation Name']}")
+    return sorted(found)
+
+
+def explain(cur, sql, repeat):
+    """Median timings over `repeat` EXPLAIN ANALYZE runs, plus the last plan's shape."""
+    runs = []
+    for _ in range(repeat):
+        cur.execute('SAVEPOINT explain_query')
+        cur.execute(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}')
+        runs.append(cur.fetchone()[0][0])
+        cur.execute('RELEASE SAVEPOINT explain_query')
+    last = runs[-1]['Plan']
+    return {
+        'planning_ms':  round(statistics.median(r['Planning Time'] for r in runs), 3),
+        'execution_ms': round(statistics.median(r['Execution Time'] for r in runs), 3),
+        'shared_hit':   last.get('Shared Hit Blocks', 0),
+        'shared_read':  last.get('Shared Read Blocks', 0),
+        'rows':         last.get('Actual Rows'),
+        'scans':        scans(last),
+    }
+
+
+def measure(cur, queries, repeat):
+    results = {}
+    for name, sql in queries:
+        try:
+            results[name] = explain(cur, sql, repeat)
+        except Exception as e:
+            cur.execute('ROLLBACK TO SAVEPOINT explain_query')
+            results[name] = {'error': str(e).strip().splitlines()[0]}
+    return results
+
+
+def run_migration(cur, path, queries, repeat):
+    """Before/after results for the indexes in `path`. Caller rolls back."""
+    with open(path) as f:
+        migration = f.read()
+    for name in _CREATE_INDEX_RE.findall(migration):
+        cur.execute(f'DROP INDEX IF EXISTS {name}')
+    cur.execute('ANALYZE')
+    before = measure(cur, queries, repeat)
+    cur.execute(migration)
+    cur.execute('ANALYZE')
+    after = measure(cur, queries, repeat)
+    return {'before': before, 'after': after}
+
+
+# ── Output ─────────────────────────────────────────────────────────────────────
+
+def load_results(path):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def print_results(label, results):
+    print(f"\n{label}")
+    print(f"{'query':<52} {'plan ms':>8} {'exec ms':>9} {'hit':>7} {'read':>6}")
+    for name, r in results.items():
+        if 'error' in r:
+            print(f"{name[:52]:<52} ERROR: {r['error']}")
+            continue
+        print(f"{name[:52]:<52} {r['planning_ms']:>8.3f} {r['execution_ms']:>9.3f} "
+              f"{r['shared_hit']:>7} {r['shared_read']:>6}")
+
+
+def print_comparison(before, after, before_label='before', after_label='after'):
+    print(f"\n{'query':<52} {before_label[:9]:>9} {after_label[:9]:>9} {'speedup':>8}  scans changed")
+    for name in before:
+        b, a = before[name], after.get(name)
+        if not a or 'error' in a or 'error' in b:
+            print(f"{name[:52]:<52} {'—':>9} {'—':>9}")
+            continue
+        speedup = b['execution_ms'] / a['execution_ms'] if a['execution_ms'] else float('inf')
+        added = sorted(set(a['scans']) - set(b['scans']))
+        print(f"{name[:52]:<52} {b['execution_ms']:>9.3f} {a['execution_ms']:>9.3f} {speedup:>7.1f}x  "
+              f"{', '.join(added)}")
+
+
+# ── Main ───────────────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description='EXPLAIN ANALYZE the Metabase dashboard queries')
+    parser.add_argument('--migration', metavar='FILE',
+                        help='Measure before/after FILE in a rolled-back transaction')
+    parser.add_argument('--label', default='current',
+                        help='Result label when not using --migration (default: current)')
+    parser.add_argument('--out', default=DEFAULT_OUT,
+                        help=f'Results JSON to merge into (default: {DEFAULT_OUT})')
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=VALUE',
+                        help='Metabase {{parameter}} value (repeatable)')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help=f'EXPLAIN ANALYZE runs per query (default: {DEFAULT_REPEAT})')
+    parser.add_argument('--no-views', action='store_true',
+                        help='Only the documented Metabase questions (no views or report queries)')
+    parser.add_argument('--compare', nargs=3, metavar=('FILE', 'LABEL_A', 'LABEL_B'),
+                        help='Print a comparison of two labels from a results file and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        path, a, b = args.compare
+        results = load_results(path)
+        missing = [label for label in (a, b) if label not in results]
+        if missing:
+            print(f"ERROR: {path} has no results for {', '.join(missing)}.")
+            sys.exit(1)
+        print_comparison(results[a], results[b], a, b)
+        return
+
+    params = {}
+    for p in args.param:
+        name, sep, value = p.partition('=')
+        if not sep:
+            print(f"ERROR: --param must look like NAME=VALUE, got {p!r}")
+            sys.exit(1)
+        params[name] = value
+
+    queries, skipped = [], []
+    for name, sql in load_doc_queries():
+        resolved = apply_params(sql, params)
+        if resolved is None:
+            skipped.append(name)
+        else:
+            queries.append((name, resolved))
+
+    try:
+        conn = get_db_connection()
+    except KeyError as e:
+        print(f"ERROR: missing env var {e}. Set DB_HOST, DB_NAME, DB_USER, DB_PASS.")
+        sys.exit(1)
+
+    cur = conn.cursor()
+    if not args.no_views:
+        queries += view_queries(cur) + REPORT_QUERIES
+    print(f"{len(queries)} queries, {args.repeat} run(s) each")
+    if skipped:
+        print(f"Skipped (missing parameters): {', '.join(skipped)}")
+
+    try:
+        if args.migration:
+            new = run_migration(cur, args.migration, queries, args.repeat)
+        else:
+            new = {args.label: measure(cur, queries, args.repeat)}
+    finally:
+        conn.rollback()
+        cur.close()
+        conn.close()
+
+    results = load_results(args.out)
+    results.update(new)
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    if args.migration:
+        print_comparison(new['before'], new['after'])
+    else:
+        print_results(args.label, new[args.label])
+    print(f"\nResults written to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+"""
+Drive Folder Cache
+==================
+Small HTTP service that keeps the whole 4-tier Drive folder map
+(clients.drive_folder_id, bsb_client_codes.drive_folder_id and
+client_product_folders) in memory, so the IO scenario can resolve a
+product's folders without a Postgres round-trip.
+
+Requires sql/migrate-io-folder-plan.sql and sql/migrate-folder-cache-notify.sql.
+
+Usage:
+    python3 scripts/folder_cache.py                            # 127.0.0.1:8766
+    python3 scripts/folder_cache.py --host 0.0.0.0 --port 8080
+
+Endpoints
+---------
+GET  /plan?client_code=ZYM001&product_type=eBlast&year=2026
+     Same fields as resolve_io_folder_plan (sql/functions.sql) as a JSON
+     object: tla, client_name, primary_contact, primary_contact_email,
+     tier1_folder_id … tier4_folder_id, missing_tiers. 404 for an unknown
+     client code. Answered from memory; the X-Cache response header is
+     "hit", or "db" when the cache is not live (see below) and the lookup
+     fell through to resolve_io_folder_plan.
+POST /record
+     JSON body with the record_created_folders arguments, without the p_
+     prefix (client_code, product_type, year, tier1_folder_id …
+     tier4_folder_id, io_reference, product_name, unique_id, io_folder_id).
+     Writes through to the DB in one transaction, then reloads that client
+     code before answering, so the next /plan already sees the new folders.
+     Returns {"io_product_id": N}.
+GET  /health
+     {"live", "codes", "loaded_at", "reloads"}.
+
+The Make.com scenario can replace module 58 (resolve_io_folder_plan) with
+an HTTP "Make a request" module on /plan, and module 67 with one on /record.
+
+Invalidation: a listener connection runs LISTEN drive_folders. The
+trg_notify_drive_folders triggers send the affected bsb_client_codes.id on
+commit, and only those codes are reloaded. The cache is "live" while that
+connection is up; it is fully reloaded every time the connection is
+(re)established, because notifications sent while it was down are lost.
+While it is not live, /plan is answered by the DB instead.
+
+If FOLDER_CACHE_TOKEN is set (env or scripts/.env), every request must send
+"Authorization: Bearer <token>". Stop with SIGINT or SIGTERM.
+"""
+
+import os
+import sys
+import json
+import time
+import select
+import signal
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import psycopg2
+import psycopg2.extensions
+
+from common import get_db_connection
+
+# ── Constants ──────────────────────────────────────────────────────────────────
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8766
+
+CHANNEL = 'drive_folders'
+
+# Seconds between keep-alive queries on an idle listener connection (the
+# Sevalla proxy drops idle connections), and between reconnect attempts
+KEEPALIVE_SECONDS = 60
+RECONNECT_SECONDS = 5
+
+# Initial load wait before serving (lookups fall through to the DB until live)
+STARTUP_WAIT_SECONDS = 30
+
+LOAD_SQL = """
+SELECT
+    cc.id,
+    cc.bsb_client_code,
+    c.tla::TEXT,
+    c.client_name::TEXT,
+    cc.primary_contact::TEXT,
+    cc.primary_contact_email::TEXT,
+    NULLIF(c.drive_folder_id, ''),
+    NULLIF(cc.drive_folder_id, ''),
+    COALESCE(
+        jsonb_agg(jsonb_build_array(
+            cpf.product_type,
+            cpf.year,
+            NULLIF(cpf.product_type_folder_id, ''),
+            NULLIF(cpf.year_folder_id, '')
+        )) FILTER (WHERE cpf.id IS NOT NULL),
+        '[]'
+    )
+FROM bsb_client_codes cc
+JOIN clients c ON cc.client_id = c.id
+LEFT JOIN client_product_folders cpf ON cpf.client_code_id = cc.id
+{where}
+GROUP BY cc.id, c.id
+"""
+
+PLAN_FIELDS = (
+    'tla', 'client_name', 'primary_contact', 'primary_contact_email',
+    'tier1_folder_id', 'tier2_folder_id', 'tier3_folder_id', 'tier4_folder_id',
+    'missing_tiers',
+)
+
+RECORD_ARGS = (
+    'client_code', 'product_type', 'year',
+    'tier1_folder_id', 'tier2_folder_id', 'tier3_folder_id', 'tier4_folder_id',
+    'io_reference', 'product_name', 'unique_id', 'io_folder_id',
+)
+
+
+def log(msg):
+    print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {msg}", flush=True)
+
+
+# ── Folder map ─────────────────────────────────────────────────────────────────
+
+class FolderMap:
+    """In-memory copy of the folder map, keyed by client code.
+
+    Each entry is replaced whole on reload and never mutated, so lookups
+    only hold the lock for the dict access."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_code = {}
+        self.code_by_id = {}
+        self.live = threading.Event()
+        self.loaded_at = None
+        self.reloads = 0
+
+    @staticmethod
+    def _entry(row):
+        code_id, code, tla, client_name, contact, email, tier1, tier2, folders = row
+        products = {}
+        for product_type, year, tier3, tier4 in folders:
+            products.setdefault(product_type, {})[year] = (tier3, tier4)
+        return {
+            'id': code_id,
+            'code': code,
+            'tla': tla,
+            'client_name': client_name,
+            'primary_contact': contact,
+            'primary_contact_email': email,
+            'tier1_folder_id': tier1,
+            'tier2_folder_id': tier2,
+            'products': products,
+        }
+
+    def reload(self, cur, ids=None):
+        """Reload every client code, or only the bsb_client_codes ids in `ids`
+        (ids that no longer exist are dropped)."""
+        if ids is None:
+            cur.execute(LOAD_SQL.format(where=''))
+        else:
+            cur.execute(LOAD_SQL.format(where='WHERE cc.id = ANY(%s)'), (list(ids),))
+        entries = [self._entry(row) for row in cur.fetchall()]
+
+        with self.lock:
+            if ids is None:
+                self.by_code = {e['code']: e for e in entries}
+                self.code_by_id = {e['id']: e['code'] for e in entries}
+            else:
+                for code_id in ids:
+                    code = self.code_by_id.pop(code_id, None)
+                    if code is not None:
+                        self.by_code.pop(code, None)
+                for e in entries:
+                    self.by_code[e['code']] = e
+                    self.code_by_id[e['id']] = e['code']
+            self.loaded_at = datetime.now(timezone.utc)
+            self.reloads += 1
+        return len(entries)
+
+    def code_id(self, client_code):
+        with self.lock:
+            entry = self.by_code.get(client_code.strip())
+        return entry['id'] if entry else None
+
+    def plan(self, client_code, product_type, year):
+        """resolve_io_folder_plan from memory: dict of PLAN_FIELDS, or None
+        for an unknown client code."""
+        with self.lock:
+            entry = self.by_code.get(client_code.strip())
+        if entry is None:
+            return None
+
+        years = entry['products'].get(product_type.strip(), {})
+        # Tier 3 is shared across years: exact year first, then latest year
+        tier3 = next((years[y][0] for y in sorted(years, key=lambda y: (y == year, y), reverse=True)
+                      if years[y][0]), None)
+        tier4 = years.get(year, (None, None))[1]
+
+        tiers = (entry['tier1_folder_id'], entry['tier2_folder_id'], tier3, tier4)
+        plan = {k: entry[k] for k in PLAN_FIELDS[:4]}
+        plan.update(zip(PLAN_FIELDS[4:8], tiers))
+        plan['missing_tiers'] = [f'tier{i}' for i, t in enumerate(tiers, 1) if t is None]
+        return plan
+
+    def stats(self):
+        with self.lock:
+            return {
+                'live': self.live.is_set(),
+                'codes': len(self.by_code),
+                'loaded_at': self.loaded_at.isoformat() if self.loaded_at else None,
+                'reloads': self.reloads,
+            }
+
+
+# ── Invalidation ───────────────────────────────────────────────────────────────
+
+def listen(folder_map, stopping):
+    """LISTEN for trigger notifications and reload the codes they name, until
+    `stopping` is set. Reconnects (and fully reloads) if the connection drops."""
+    conn = None
+    last_activity = 0.0
+
+    while not stopping.is_set():
+        try:
+            if conn is None:
+                conn = get_db_connection()
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(f'LISTEN {CHANNEL}')
+                    n = folder_map.reload(cur)
+                folder_map.live.set()
+                last_activity = time.monotonic()
+                log(f"Loaded {n} client code(s); listening on {CHANNEL}")
+
+            if select.select([conn], [], [], 1.0) == ([], [], []):
+                if time.monotonic() - last_activity > KEEPALIVE_SECONDS:
+                    with conn.cursor() as cur:
+                        cur.execute('SELECT 1')
+                    last_activity = time.monotonic()
+                continue
+
+            conn.poll()
+            ids = {int(n.payload) for n in conn.notifies}
+            conn.notifies.clear()
+            last_activity = time.monotonic()
+            if ids:
+                with conn.cursor() as cur:
+                    folder_map.reload(cur, ids)
+                log(f"Reloaded {len(ids)} client code(s)")
+
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            folder_map.live.clear()
+            log(f"Listener connection lost: {str(e).strip()}")
+            if conn is not None:
+                conn.close()
+            conn = None
+            stopping.wait(RECONNECT_SECONDS)
+
+    if conn is not None:
+        conn.close()
+
+
+# ── DB calls ───────────────────────────────────────────────────────────────────
+
+class Database:
+    """One connection for writes and fall-through lookups, shared by the
+    request threads under a lock and reopened if it drops."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.conn = get_db_connection()
+
+    def _call(self, fn):
+        with self.lock:
+            for attempt in (1, 2):
+                if self.conn.closed:
+                    self.conn = get_db_connection()
+                try:
+                    with self.conn.cursor() as cur:
+                        result = fn(cur)
+                    self.conn.commit()
+                    return result
+                except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                    self.conn.close()
+                    if attempt == 2:
+                        raise
+                except Exception:
+                    self.conn.rollback()
+                    raise
+
+    def plan(self, client_code, product_type, year):
+        def fn(cur):
+            cur.execute("SELECT * FROM resolve_io_folder_plan(%s, %s, %s)",
+                        (client_code, product_type, year))
+            row = cur.fetchone()
+            return dict(zip(PLAN_FIELDS, row)) if row else None
+        return self._call(fn)
+
+    def record(self, folder_map, args):
+        """record_created_folders, then reload that code into folder_map
+        (after the commit, so the reload sees the new folder IDs)."""
+        def write(cur):
+            placeholders = ', '.join(['%s'] * len(RECORD_ARGS))
+            cur.execute(f"SELECT record_created_folders({placeholders})",
+                        [args.get(k) for k in RECORD_ARGS])
+            return cur.fetchone()[0]
+
+        def reload(cur):
+            code_id = folder_map.code_id(args['client_code'])
+            if code_id is None:
+                cur.execute("SELECT id FROM bsb_client_codes WHERE bsb_client_code = TRIM(%s)",
+                            (args['client_code'],))
+                row = cur.fetchone()
+                code_id = row[0] if row else None
+            if code_id is not None:
+                folder_map.reload(cur, [code_id])
+
+        io_product_id = self._call(write)
+        self._call(reload)
+        return io_product_id
+
+
+# ── HTTP ───────────────────────────────────────────────────────────────────────
+
+class BadRequest(Exception):
+    pass
+
+
+def _year(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise BadRequest(f"year must be an integer, got {value!r}")
+
+
+def make_handler(folder_map, db, token):
+    class FolderCacheHandler(BaseHTTPRequestHandler):
+        def _send(self, status, body, cache=None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            if cache:
+                self.send_header('X-Cache', cache)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _authorized(self):
+            if token and self.headers.get('Authorization') != f'Bearer {token}':
+                self._send(401, {'error': 'unauthorized'})
+                return False
+            return True
+
+        def _handle(self, route):
+            if not self._authorized():
+                return
+            try:
+                route()
+            except BadRequest as e:
+                self._send(400, {'error': str(e)})
+            except psycopg2.Error as e:
+                log(f"ERROR: {self.requestline}: {str(e).strip()}")
+                self._send(500, {'error': str(e).strip().splitlines()[0]})
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path == '/plan':
+                self._handle(lambda: self._plan(parse_qs(url.query)))
+            elif url.path == '/health':
+                self._handle(lambda: self._send(200, folder_map.stats()))
+            else:
+                self._send(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if urlsplit(self.path).path == '/record':
+                self._handle(self._record)
+            else:
+                self._send(404, {'error': 'not found'})
+
+        def _plan(self, query):
+            params = {k: query.get(k, [''])[0] for k in ('client_code', 'product_type', 'year')}
+            missing = [k for k, v in params.items() if not v]
+            if missing:
+                raise BadRequest(f"missing parameter(s): {', '.join(missing)}")
+            year = _year(params['year'])
+
+            if folder_map.live.is_set():
+                plan, cache = folder_map.plan(params['client_code'], params['product_type'], year), 'hit'
+            else:
+                plan, cache = db.plan(params['client_code'], params['product_type'], year), 'db'
+            if plan is None:
+                self._send(404, {'error': f"unknown client code {params['client_code']!r}"}, cache)
+            else:
+                self._send(200, plan, cache)
+
+        def _record(self):
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                args = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                raise BadRequest("body must be a JSON object")
+            if not isinstance(args, dict):
+                raise BadRequest("body must be a JSON object")
+            missing = [k for k in ('client_code', 'product_type', 'year', 'io_reference') if not args.get(k)]
+            if missing:
+                raise BadRequest(f"missing field(s): {', '.join(missing)}")
+            args['year'] = _year(args['year'])
+
+            io_product_id = db.record(folder_map, args)
+            log(f"Recorded {args.get('unique_id')} for {args['client_code']} "
+                f"{args['product_type']} {args['year']}")
+            self._send(200, {'io_product_id': io_product_id})
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return FolderCacheHandler
+
+
+# ── Main ───────────────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the Drive folder map from memory')
+    parser.add_argument('--host', default=DEFAULT_HOST,
+                        help=f'Address to bind (default: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help=f'Port to bind (default: {DEFAULT_PORT})')
+    args = parser.parse_args()
+
+    try:
+        db = Database()
+    except KeyError as e:
+        print(f"ERROR: missing env var {e}. Set DB_HOST, DB_NAME, DB_USER, DB_PASS.")
+        sys.exit(1)
+
+    folder_map = FolderMap()
+    stopping = threading.Event()
+    listener = threading.Thread(target=listen, args=(folder_map, stopping), daemon=True)
+    listener.start()
+    if not folder_map.live.wait(STARTUP_WAIT_SECONDS):
+        log("Cache not loaded yet; answering from the DB until it is")
+
+    handler = make_handler(folder_map, db, os.environ.get('FOLDER_CACHE_TOKEN'))
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+
+    def stop(signum, frame):
+        stopping.set()
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    log(f"Serving on {args.host}:{args.port}")
+    server.serve_forever()
+
+    log("Stopping")
+    server.server_close()
+    listener.join(RECONNECT_SECONDS)
+    db.conn.close()
+
+
+if __name__ == '__main__':
+    main()
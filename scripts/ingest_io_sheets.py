@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+IO Sheet Bulk Ingest
+====================
+Loads the IO Submissions spreadsheet ("IO Forms" and "Products" tabs, or CSV
+exports of them) into insertion_orders and io_products in bulk, for
+backfilling historical IOs or catching up after a missed Make.com run.
+
+Usage:
+    python3 scripts/ingest_io_sheets.py                          # dry-run (rolled back)
+    python3 scripts/ingest_io_sheets.py --apply
+    python3 scripts/ingest_io_sheets.py --io-csv forms.csv --products-csv products.csv --apply
+    python3 scripts/ingest_io_sheets.py --apply --resume         # skip chunks already loaded
+    python3 scripts/ingest_io_sheets.py --apply --workers 8 --chunk-rows 200
+
+Rows are split into chunks of about --chunk-rows rows (all rows for one IO
+reference / unique ID stay in the same chunk). Each chunk is COPYed into a
+temp staging table and merged with one INSERT ... ON CONFLICT, in its own
+transaction, on --workers parallel connections. The merges follow the
+Make.com functions:
+- insertion_orders: upsert_insertion_order. Existing IO references are left
+  untouched (DO NOTHING), the first sheet row per reference wins, and
+  unparseable dates become NULL.
+- io_products: upsert_io_product. New unique IDs are inserted. For existing
+  ones only a non-empty product_name is written, and only when it differs.
+  Products rows with no Unique ID (E) have not been processed by Make.com
+  yet and are skipped.
+
+CSV exports must have the sheet's header row and column layout (IO Forms
+A:Q, Products A:E). With CSVs, only the tables given are loaded.
+
+Checkpoints: after each chunk commits, its fingerprint (SHA-256 of its
+rows) is added to --checkpoint (default: scripts/io_ingest_checkpoint.json).
+--resume skips chunks whose fingerprint is already there, so a run that was
+interrupted, or had failing chunks, can be re-run and only does the rest.
+Rows edited since the last run change their chunk's fingerprint and are
+loaded again. Dry-runs never write the checkpoint. The script exits 1 if any
+chunk failed.
+"""
+
+import io
+import os
+import csv
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import psycopg2
+
+from common import SCRIPT_DIR, get_credentials, get_db_connection, get_service
+from sheet_reader import iter_rows
+
+# ── Constants ──────────────────────────────────────────────────────────────────
+
+SPREADSHEET_ID = '1tQfpYsQEfpO5XAPzWbkHUJeGWPKITDiSDOhp6GGJ0jA'  # IO Submissions
+
+CHECKPOINT_FILE = os.path.join(SCRIPT_DIR, 'io_ingest_checkpoint.json')
+
+DEFAULT_CHUNK_ROWS = 500
+DEFAULT_WORKERS = 4
+
+# Same date handling as upsert_insertion_order: unparseable → NULL
+TRY_TIMESTAMPTZ_SQL = """
+CREATE OR REPLACE FUNCTION pg_temp.try_timestamptz(p_value TEXT)
+RETURNS TIMESTAMPTZ AS $fn$
+BEGIN
+    RETURN NULLIF(TRIM(p_value), '')::timestamptz;
+EXCEPTION WHEN OTHERS THEN
+    RETURN NULL;
+END;
+$fn$ LANGUAGE plpgsql
+"""
+
+# IO Forms columns A:Q, in order (see module 2 / 52 in the IO blueprint).
+# Make.com passes column A as the first name and an empty last name.
+ORDER_FIELDS = [
+    'salesperson_first_name', 'salesperson_email', 'submission_date', 'date_io_signed',
+    'io_reference', 'bsb_client_code', 'new_client', 'other_company',
+    'primary_contact_name', 'primary_contact_email', 'additional_contacts',
+    'salesperson_notes', 'product_type', 'signed_io_pdf_url',
+    'io_submission_permalink', 'company_name', 'formatted_company_name',
+]
+
+MERGE_ORDERS_SQL = """
+    INSERT INTO insertion_orders (
+        io_reference, salesperson_first_name, salesperson_email, submission_date,
+        date_io_signed, bsb_client_code, new_client, other_company,
+        primary_contact_name, primary_contact_email, additional_contacts,
+        salesperson_notes, product_type, signed_io_pdf_url,
+        io_submission_permalink, company_name, formatted_company_name
+    )
+    SELECT DISTINCT ON (io_reference)
+        io_reference,
+        NULLIF(TRIM(salesperson_first_name), ''),
+        NULLIF(TRIM(salesperson_email), ''),
+        pg_temp.try_timestamptz(submission_date),
+        pg_temp.try_timestamptz(date_io_signed),
+        NULLIF(TRIM(bsb_client_code), ''),
+        CASE
+            WHEN UPPER(TRIM(new_client)) IN ('YES', 'TRUE', '1') THEN TRUE
+            WHEN UPPER(TRIM(new_client)) IN ('NO', 'FALSE', '0') THEN FALSE
+        END,
+        NULLIF(TRIM(other_company), ''),
+        NULLIF(TRIM(primary_contact_name), ''),
+        NULLIF(TRIM(primary_contact_email), ''),
+        NULLIF(TRIM(additional_contacts), ''),
+        NULLIF(TRIM(salesperson_notes), ''),
+        NULLIF(TRIM(product_type), ''),
+        NULLIF(TRIM(signed_io_pdf_url), ''),
+        NULLIF(TRIM(io_submission_permalink), ''),
+        NULLIF(TRIM(company_name), ''),
+        NULLIF(TRIM(formatted_company_name), '')
+    FROM io_order_stage
+    ORDER BY io_reference, row_num
+    ON CONFLICT (io_reference) DO NOTHING
+    RETURNING TRUE AS inserted
+"""
+
+# Products columns A:E
+PRODUCT_FIELDS = ['product_type', 'product_name', 'io_reference', 'company_name', 'unique_id']
+
+# Repeated upsert_io_product calls for one unique_id keep the first row's
+# io_reference / product_type and the last non-empty product_name
+MERGE_PRODUCTS_SQL = """
+    WITH src AS (
+        SELECT
+            unique_id,
+            (ARRAY_AGG(io_reference ORDER BY row_num))[1] AS io_reference,
+            (ARRAY_AGG(product_type ORDER BY row_num))[1] AS product_type,
+            (ARRAY_AGG(NULLIF(TRIM(product_name), '') ORDER BY row_num DESC)
+                FILTER (WHERE NULLIF(TRIM(product_name), '') IS NOT NULL))[1] AS product_name
+        FROM io_product_stage
+        GROUP BY unique_id
+    )
+    INSERT INTO io_products (io_reference, product_type, product_name, unique_id)
+    SELECT io_reference, product_type, product_name, unique_id FROM src
+    ON CONFLICT (unique_id) DO UPDATE SET
+        product_name = COALESCE(EXCLUDED.product_name, io_products.product_name)
+    WHERE io_products.product_name IS DISTINCT FROM
+          COALESCE(EXCLUDED.product_name, io_products.product_name)
+    RETURNING (xmax = 0) AS inserted
+"""
+
+TABLES = {
+    'insertion_orders': {
+        'sheet': 'IO Forms', 'columns': 'A:Q', 'fields': ORDER_FIELDS,
+        'key': 'io_reference', 'required': ['io_reference'],
+        'stage': 'io_order_stage', 'merge': MERGE_ORDERS_SQL,
+    },
+    'io_products': {
+        'sheet': 'Products', 'columns': 'A:E', 'fields': PRODUCT_FIELDS,
+        'key': 'unique_id', 'required': ['unique_id', 'product_type', 'io_reference'],
+        'stage': 'io_product_stage', 'merge': MERGE_PRODUCTS_SQL,
+    },
+}
+
+
+# ── Reading ────────────────────────────────────────────────────────────────────
+
+def sheet_rows(service, table):
+    spec = TABLES[table]
+    return iter_rows(service, SPREADSHEET_ID, columns=spec['columns'], sheet=spec['sheet'])
+
+
+def csv_rows(path):
+    """(row_num, row) pairs after the header row, numbered like the sheet."""
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row_num, row in enumerate(reader, 2):
+            if any(cell.strip() for cell in row):
+                yield row_num, row
+
+
+def parse_rows(table, numbered_rows):
+    """Record dicts for rows that have every required field, and the count skipped."""
+    spec = TABLES[table]
+    records, skipped = [], 0
+    for row_num, row in numbered_rows:
+        rec = {'row_num': row_num}
+        for i, field in enumerate(spec['fields']):
+            rec[field] = row[i] if i < len(row) else ''
+        if all(rec[f].strip() for f in spec['required']):
+            records.append(rec)
+        else:
+            skipped += 1
+    return records, skipped
+
+
+def chunk_records(records, key, chunk_rows):
+    """Split records into chunks of about chunk_rows, keeping all records with
+    the same key together (so chunks never race on a conflict key)."""
+    groups = {}
+    for rec in records:
+        groups.setdefault(rec[key], []).append(rec)
+    chunks, chunk = [], []
+    for group in groups.values():
+        chunk.extend(group)
+        if len(chunk) >= chunk_rows:
+            chunks.append(chunk)
+            chunk = []
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+# ── Checkpoints ────────────────────────────────────────────────────────────────
+
+def chunk_fingerprint(table, chunk):
+    fields = ['row_num'] + TABLES[table]['fields']
+    h = hashlib.sha256(table.encode())
+    for rec in chunk:
+        h.update(json.dumps([rec[f] for f in fields]).encode())
+    return h.hexdigest()
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)['chunks']
+
+
+def save_checkpoint(path, chunks):
+    """Write the checkpoint atomically so an interrupted run keeps the old one."""
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'chunks': chunks}, f)
+    os.replace(tmp, path)
+
+
+# ── Merge ──────────────────────────────────────────────────────────────────────
+
+_local = threading.local()
+
+
+def worker_connection(connections):
+    """This thread's DB connection, opened (with pg_temp.try_timestamptz) on first use."""
+    conn = getattr(_local, 'conn', None)
+    if conn is None or conn.closed:
+        conn = _local.conn = get_db_connection()
+        with conn.cursor() as cur:
+            cur.execute(TRY_TIMESTAMPTZ_SQL)
+        conn.commit()
+        connections.append(conn)
+    return conn
+
+
+def merge_chunk(conn, table, chunk, apply):
+    """Stage one chunk with COPY and merge it in one transaction.
+    Returns (inserted, updated, unchanged) for the chunk's distinct keys."""
+    spec = TABLES[table]
+    columns = ['row_num'] + spec['fields']
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for rec in chunk:
+        writer.writerow([rec[c] for c in columns])
+    buf.seek(0)
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"CREATE TEMP TABLE {spec['stage']} (row_num INTEGER, "
+                + ', '.join(f'{f} TEXT' for f in spec['fields'])
+                + ") ON COMMIT DROP"
+            )
+            cur.copy_expert(
+                f"COPY {spec['stage']} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf
+            )
+            cur.execute(spec['merge'])
+            flags = [row[0] for row in cur.fetchall()]
+    except Exception:
+        conn.rollback()
+        raise
+
+    if apply:
+        conn.commit()
+    else:
+        conn.rollback()
+
+    keys = len({rec[spec['key']] for rec in chunk})
+    inserted = sum(1 for f in flags if f)
+    return inserted, len(flags) - inserted, keys - len(flags)
+
+
+def ingest(table, chunks, args, done, checkpoint_lock):
+    """Merge `chunks` on args.workers connections. Records each committed chunk
+    in `done` / the checkpoint file. Returns (counts, errors)."""
+    counts = [0, 0, 0]
+    errors = []
+    connections = []
+
+    def run(chunk):
+        return merge_chunk(worker_connection(connections), table, chunk, args.apply)
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            futures = {pool.submit(run, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                rows = f"rows {chunk[0]['row_num']}-{chunk[-1]['row_num']}"
+                try:
+                    result = future.result()
+                except psycopg2.Error as e:
+                    errors.append(f"{table} {rows}: {str(e).strip().splitlines()[0]}")
+                    continue
+                counts = [a + b for a, b in zip(counts, result)]
+                if args.apply:
+                    with checkpoint_lock:
+                        done[chunk_fingerprint(table, chunk)] = {'table': table, 'rows': len(chunk)}
+                        save_checkpoint(args.checkpoint, done)
+    finally:
+        for conn in connections:
+            conn.close()
+    return counts, errors
+
+
+# ── Main ───────────────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk load IO Forms / Products into the DB')
+    parser.add_argument('--apply', action='store_true',
+                        help='Commit to DB (default: dry-run, rolled back)')
+    parser.add_argument('--io-csv', metavar='FILE',
+                        help='CSV export of the IO Forms tab (instead of reading the sheet)')
+    parser.add_argument('--products-csv', metavar='FILE',
+                        help='CSV export of the Products tab (instead of reading the sheet)')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f'Rows per chunk / transaction (default: {DEFAULT_CHUNK_ROWS})')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Parallel DB connections (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip chunks recorded in the checkpoint by an earlier --apply run')
+    parser.add_argument('--checkpoint', default=CHECKPOINT_FILE,
+                        help='Checkpoint file (default: scripts/io_ingest_checkpoint.json)')
+    args = parser.parse_args()
+
+    print(f"Mode: {'APPLY' if args.apply else 'DRY-RUN'}\n")
+
+    if not all(k in os.environ for k in ('DB_HOST', 'DB_USER', 'DB_PASS')):
+        print("ERROR: missing env vars. Set DB_HOST, DB_NAME, DB_USER, DB_PASS.")
+        sys.exit(1)
+
+    if args.io_csv or args.products_csv:
+        sources = {t: csv_rows(p) for t, p in (('insertion_orders', args.io_csv),
+                                                ('io_products', args.products_csv)) if p}
+    else:
+        service = get_service('sheets', 'v4', get_credentials())
+        sources = {t: sheet_rows(service, t) for t in TABLES}
+
+    done = load_checkpoint(args.checkpoint) if args.resume else {}
+    checkpoint_lock = threading.Lock()
+    all_errors = []
+    start = time.perf_counter()
+
+    # insertion_orders first, so products are loaded after the IOs they belong to
+    for table, numbered_rows in sources.items():
+        records, skipped = parse_rows(table, numbered_rows)
+        chunks = chunk_records(records, TABLES[table]['key'], args.chunk_rows)
+        todo = [c for c in chunks if chunk_fingerprint(table, c) not in done]
+
+        print(f"{table}: {len(records)} row(s) in {len(chunks)} chunk(s)"
+              + (f", {skipped} skipped (missing {'/'.join(TABLES[table]['required'])})" if skipped else ''))
+        if len(todo) < len(chunks):
+            print(f"  {len(chunks) - len(todo)} chunk(s) already loaded (--resume)")
+
+        (inserted, updated, unchanged), errors = ingest(table, todo, args, done, checkpoint_lock)
+        all_errors += errors
+        verb = 'inserted' if args.apply else 'would insert'
+        if table == 'insertion_orders':
+            print(f"  {inserted} {verb}, {unchanged} already present\n")
+        else:
+            print(f"  {inserted} {verb}, {updated} {'updated' if args.apply else 'would update'}, "
+                  f"{unchanged} unchanged\n")
+
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+    if all_errors:
+        print(f"\n{len(all_errors)} chunk(s) failed"
+              + (" (re-run with --resume to retry them):" if args.apply else ":"))
+        for err in all_errors:
+            print(f"  {err}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Asana Export Replay
+===================
+Replays an Asana export through upsert_projects_batch / upsert_milestones_batch
+(sql/functions.sql), so a full resync is a handful of DB calls instead of one
+upsert_project / upsert_milestone call per Asana object.
+
+Requires sql/migrate-asana-batch.sql.
+
+Usage:
+    python3 scripts/replay_asana_export.py export.json            # dry-run (rolled back)
+    python3 scripts/replay_asana_export.py export.json --apply    # write to DB
+    python3 scripts/replay_asana_export.py b1.json b2.json --apply --batch-size 200
+
+Export format
+-------------
+A JSON list of Asana project objects (or {"data": [...]}), as returned by
+GET /portfolios/{gid}/items with
+    opt_fields=name,owner.gid,owner.name,current_status_update.status_type,
+               custom_fields.name,custom_fields.display_value
+plus two keys added by whoever collects the export:
+    "bet_code"   — the initiative (B1–B5) of the portfolio the project came
+                   from; or "portfolio_gid", mapped through PORTFOLIO_BETS
+    "tasks"      — GET /projects/{gid}/tasks with
+                   opt_fields=name,due_on,completed,resource_subtype,
+                              custom_fields.name,custom_fields.display_value
+
+Only tasks with resource_subtype = milestone are synced, as in the Make.com
+scenario. Custom fields are matched by name (Teams, Start Cycle, End Cycle,
+Project Type on projects; Focus Cycle, Strategic Bet on milestones).
+
+The dry-run executes the batch functions inside a transaction and rolls it
+back, so it validates the whole export against the DB without writing.
+"""
+
+import sys
+import json
+import argparse
+
+from common import get_db_connection
+
+# ── Constants ──────────────────────────────────────────────────────────────────
+
+DEFAULT_BATCH_SIZE = 500
+
+# Portfolio GID → strategic_bets.code (see docs/session-logs.md)
+PORTFOLIO_BETS = {
+    '1213026203855296': 'B1',
+    '1213026203855292': 'B2',
+    '1213026203855288': 'B3',
+    '1213026203855284': 'B4',
+    '1213046199918957': None,   # Upcoming Projects — not yet assigned
+}
+
+
+# ── Export parsing ─────────────────────────────────────────────────────────────
+
+def custom_field(obj, name):
+    """display_value of the named custom field, or None."""
+    for f in obj.get('custom_fields') or []:
+        if f.get('name') == name:
+            return f.get('display_value')
+    return None
+
+
+def load_export(path):
+    with open(path) as f:
+        data = json.load(f)
+    return data['data'] if isinstance(data, dict) else data
+
+
+def project_payload(p):
+    """Asana project → upsert_projects_batch element."""
+    owner = p.get('owner') or {}
+    status = (p.get('current_status_update') or {}).get('status_type')
+    bet_code = p['bet_code'] if 'bet_code' in p else PORTFOLIO_BETS.get(p.get('portfolio_gid'))
+    return {
+        'asana_id':       p['gid'],
+        'name':           p['name'],
+        'bet_code':       bet_code,
+        'team_name':      custom_field(p, 'Teams'),
+        'owner_asana_id': owner.get('gid'),
+        'owner_name':     owner.get('name'),
+        'status':         status,
+        'start_cycle':    custom_field(p, 'Start Cycle'),
+        'end_cycle':      custom_field(p, 'End Cycle'),
+        'project_type':   custom_field(p, 'Project Type'),
+    }
+
+
+def milestone_payloads(p):
+    """Native milestones of an Asana project → upsert_milestones_batch elements."""
+    return [
+        {
+            'asana_id':           t['gid'],
+            'project_asana_id':   p['gid'],
+            'name':               t['name'],
+            'target_date':        t.get('due_on'),
+            'completed':          bool(t.get('completed')),
+            'focus_cycle':        custom_field(t, 'Focus Cycle'),
+            'strategic_bet_tags': custom_field(t, 'Strategic Bet'),
+        }
+        for t in p.get('tasks') or []
+        if t.get('resource_subtype') == 'milestone'
+    ]
+
+
+# ── Replay ─────────────────────────────────────────────────────────────────────
+
+def call_batched(cur, function, items, batch_size):
+    """Call function(jsonb) once per batch_size items. Returns rows upserted."""
+    total = 0
+    for i in range(0, len(items), batch_size):
+        cur.execute(f"SELECT {function}(%s::jsonb)", (json.dumps(items[i:i + batch_size]),))
+        total += cur.fetchone()[0]
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay an Asana export into the DB')
+    parser.add_argument('exports', nargs='+', metavar='EXPORT',
+                        help='Asana export JSON file(s)')
+    parser.add_argument('--apply', action='store_true',
+                        help='Commit to DB (default: dry-run, rolled back)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'Objects per batch function call (default: {DEFAULT_BATCH_SIZE})')
+    args = parser.parse_args()
+
+    print(f"Mode: {'APPLY' if args.apply else 'DRY-RUN'}\n")
+
+    projects, milestones = [], []
+    for path in args.exports:
+        for p in load_export(path):
+            projects.append(project_payload(p))
+            milestones.extend(milestone_payloads(p))
+    print(f"Export: {len(projects)} project(s), {len(milestones)} milestone(s)")
+
+    try:
+        conn = get_db_connection()
+    except KeyError as e:
+        print(f"ERROR: missing env var {e}. Set DB_HOST, DB_NAME, DB_USER, DB_PASS.")
+        sys.exit(1)
+
+    cur = conn.cursor()
+
+    # Projects first: milestones resolve project_id by asana_project_id
+    n_projects = call_batched(cur, 'upsert_projects_batch', projects, args.batch_size)
+    n_milestones = call_batched(cur, 'upsert_milestones_batch', milestones, args.batch_size)
+    calls = -(-len(projects) // args.batch_size) + -(-len(milestones) // args.batch_size)
+
+    if args.apply:
+        conn.commit()
+    else:
+        conn.rollback()
+
+    print(f"\n{'Upserted' if args.apply else 'Would upsert'} in {calls} call(s):")
+    print(f"  {n_projects} project(s)")
+    print(f"  {n_milestones} milestone(s) inserted or changed")
+
+    cur.close()
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
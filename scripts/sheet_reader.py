@@ -0,0 +1,76 @@
+"""
+Streaming Sheets Reader
+=======================
+Pages through a Google Sheet in fixed-size row ranges instead of fetching a
+whole column range in one values().get, so memory stays bounded by the chunk
+size and callers can start writing before the last page is downloaded.
+
+The sheet's gridProperties.rowCount (one metadata call) bounds the paging, so
+blank rows in the middle of a sheet do not end the read early.
+
+    for chunk in iter_row_chunks(service, SHEET_ID, columns='A:L'):
+        for row_num, row in chunk:
+            ...
+
+Rows are yielded as (sheet_row_number, [cell, ...]) with 1-based row numbers
+matching the Sheets UI. Cells are returned as the API gives them: trailing
+empty cells are omitted and fully blank rows are skipped. Works for any tab,
+e.g. the client directory, IO Submissions or Products (see build_blueprint.py).
+"""
+
+import re
+
+from drive_tree import execute_with_backoff
+
+DEFAULT_CHUNK_ROWS = 1000
+
+_COLUMNS_RE = re.compile(r'^([A-Z]+):([A-Z]+)$')
+
+
+def sheet_properties(service, spreadsheet_id, sheet=None):
+    """Return (title, row_count) for the named tab, or the first tab if sheet is None."""
+    resp = execute_with_backoff(service.spreadsheets().get(
+        spreadsheetId=spreadsheet_id,
+        fields='sheets(properties(title,gridProperties(rowCount)))',
+    ))
+    for s in resp.get('sheets', []):
+        props = s['properties']
+        if sheet is None or props['title'] == sheet:
+            return props['title'], props.get('gridProperties', {}).get('rowCount', 0)
+    raise ValueError(f"Sheet {sheet!r} not found in spreadsheet {spreadsheet_id}")
+
+
+def iter_row_chunks(service, spreadsheet_id, columns='A:Z', sheet=None,
+                    header_rows=1, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield lists of (row_num, row) for each chunk_rows-row page of the sheet,
+    skipping the first header_rows rows. columns is a column span like 'A:L'."""
+    m = _COLUMNS_RE.match(columns)
+    if not m:
+        raise ValueError(f"columns must look like 'A:L', got {columns!r}")
+    first_col, last_col = m.groups()
+
+    title, row_count = sheet_properties(service, spreadsheet_id, sheet)
+    quoted = "'" + title.replace("'", "''") + "'"
+
+    start = header_rows + 1
+    while start <= row_count:
+        end = min(start + chunk_rows - 1, row_count)
+        resp = execute_with_backoff(service.spreadsheets().values().get(
+            spreadsheetId=spreadsheet_id,
+            range=f"{quoted}!{first_col}{start}:{last_col}{end}",
+            majorDimension='ROWS',
+        ))
+        # The API trims trailing blank rows but keeps interior ones as [], so
+        # offsets within the page map straight to sheet row numbers.
+        chunk = [(start + i, row) for i, row in enumerate(resp.get('values', [])) if row]
+        if chunk:
+            yield chunk
+        start = end + 1
+
+
+def iter_rows(service, spreadsheet_id, columns='A:Z', sheet=None,
+              header_rows=1, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Flat (row_num, row) stream over iter_row_chunks."""
+    for chunk in iter_row_chunks(service, spreadsheet_id, columns, sheet,
+                                 header_rows, chunk_rows):
+        yield from chunk
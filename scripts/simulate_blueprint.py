@@ -0,0 +1,901 @@
+#!/usr/bin/env python3
+"""
+Blueprint Simulator
+===================
+Runs the IO submission scenario (make-blueprints/phase-1-io-submission-
+project-creation.json) locally, module by module, against stand-ins for
+the services it calls, and reports how long each module took. Use it to
+load-test the Drive folder logic and SQL function changes without
+running the scenario in Make.com.
+
+Point it at a local copy of the database (sql/schema.sql + functions.sql),
+not production: it writes insertion_orders, io_products and the folder
+cache, and seeds synthetic clients. It refuses to run against a DB_NAME
+of bitesize_bio (the production database). By default everything it
+writes, seeded clients included, is rolled back at the end; --commit
+keeps it until --cleanup.
+
+Usage:
+    python3 scripts/build_blueprint.py --out /tmp/io.json
+    python3 scripts/simulate_blueprint.py --blueprint /tmp/io.json --submissions 500
+    python3 scripts/simulate_blueprint.py --submissions 200 --products 1 4 --clients 20 --commit
+    python3 scripts/simulate_blueprint.py --cleanup
+
+Stand-ins:
+- postgres:StoredProcedure   the real DB (get_db_connection). Each
+                             submission runs in its own savepoint, rolled
+                             back when it ends; with --commit it is one
+                             transaction, committed at the end like
+                             Make.com's shared transaction.
+- google-sheets:*            FakeSheets, an in-memory "IO Forms" / "Products"
+                             spreadsheet holding the synthetic submissions
+- google-drive:createAFolder FakeDrive, an in-memory folder tree
+- asana / slack / http       FakeApps, which return generated ids
+
+Interpreted: util:SetVariable(s), util:TextAggregator (with its feeder),
+json:CreateJSON, routers, placeholders, module filters and the {{...}}
+expression subset the blueprint uses (references, if, ifempty, replace,
+formatDate, substring, uuid, comparisons). A module type or function
+outside that subset stops the run with an error naming it.
+
+Bundles follow Make.com: a module that outputs several bundles (a sheet
+search, a function returning rows) runs the rest of its flow once per
+bundle, and zero bundles end the flow. A failed filter ends the flow for
+that bundle. Modules after an aggregator still see the last bundle of
+its feeder; reading one is reported as a warning.
+
+At the end the Drive stand-in is checked for folders created twice under
+the same parent with the same name, i.e. find-or-create misses.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import itertools
+import statistics
+from datetime import datetime, timedelta
+
+from common import SCRIPT_DIR, get_db_connection
+from blueprint import Blueprint, child_flows, module_refs
+
+# ── Constants ──────────────────────────────────────────────────────────────────
+
+DEFAULT_BLUEPRINT = os.path.join(SCRIPT_DIR, '..', 'make-blueprints',
+                                 'phase-1-io-submission-project-creation.json')
+
+DEFAULT_SUBMISSIONS = 200
+DEFAULT_CLIENTS = 10
+DEFAULT_PRODUCTS = (1, 3)
+DEFAULT_SEED = 1
+
+SIM_PREFIX = 'SIM'
+PRODUCTION_DB = 'bitesize_bio'
+
+PRODUCT_TYPES = [
+    'Live Event', 'eBlast', 'Podcast', 'Newsletter Banner', 'Website Banner',
+    'Multi-Session Live Event', 'Article', 'Ebook', 'Masterclass',
+]
+YEARS = [2025, 2026]
+
+TRIGGERS = {'google-sheets:watchRows'}
+AGGREGATORS = {'util:TextAggregator'}
+FREE = {'builtin:BasicRouter', 'placeholder:Placeholder'}
+
+_AGGREGATED = '__aggregated__'
+
+
+class SimulationError(Exception):
+    pass
+
+
+# ── Expressions ────────────────────────────────────────────────────────────────
+#
+# {{...}} expressions compile once into closures taking the bundle context
+# ({module id: output bundle}).
+
+_EXPR_RE = re.compile(r'\{\{(.*?)\}\}', re.S)
+_TOKEN_RE = re.compile(r'''\s*(?:
+      (?P<str>"[^"]*")
+    | (?P<ref>\d+(?:\.(?:`[^`]*`|[A-Za-z_]\w*))+)
+    | (?P<num>\d+(?:\.\d+)?)
+    | (?P<name>[A-Za-z_]\w*)
+    | (?P<op><=|>=|!=|[=<>+\-*/();])
+    )''', re.X)
+_FIELD_RE = re.compile(r'`([^`]*)`|([A-Za-z_]\w*)')
+
+_DATE_FORMATS = ('%Y-%m-%d', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S', '%m/%d/%Y', '%d/%m/%Y',
+                 '%m/%d/%Y %H:%M:%S')
+_MAKE_DATE_TOKENS = [('YYYY', '%Y'), ('YY', '%y'), ('MM', '%m'), ('DD', '%d'),
+                     ('HH', '%H'), ('mm', '%M'), ('ss', '%S')]
+
+
+def _empty(value):
+    return value is None or value == '' or value == []
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, list):
+        return ', '.join(_text(v) for v in value)
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return str(value)
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value
+    text = _text(value).strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def _format_date(value, fmt, *_):
+    date = _parse_date(value)
+    if date is None:
+        return ''
+    fmt = _text(fmt)
+    for token, code in _MAKE_DATE_TOKENS:
+        fmt = fmt.replace(token, code)
+    return date.strftime(fmt)
+
+
+def _replace(text, find, replacement=''):
+    find = _text(find)
+    return _text(text).replace(find, _text(replacement)) if find else _text(text)
+
+
+def _substring(text, start, end=None):
+    text = _text(text)
+    return text[int(start or 0):None if end in (None, '') else int(end)]
+
+
+FUNCTIONS = {
+    'if':         lambda cond, a='', b='': a if cond else b,
+    'ifempty':    lambda a, b='': b if _empty(a) else a,
+    'replace':    _replace,
+    'formatDate': _format_date,
+    'substring':  _substring,
+    'lower':      lambda s: _text(s).lower(),
+    'upper':      lambda s: _text(s).upper(),
+    'trim':       lambda s: _text(s).strip(),
+    'length':     lambda s: len(s) if isinstance(s, (list, str)) else len(_text(s)),
+    'contains':   lambda s, x: (x in s) if isinstance(s, list) else _text(x) in _text(s),
+}
+
+KEYWORDS = {
+    'uuid':        lambda: str(uuid.uuid4()),
+    'now':         lambda: datetime.now().isoformat(timespec='seconds'),
+    'emptystring': lambda: '',
+    'newline':     lambda: '\n',
+    'space':       lambda: ' ',
+    'true':        lambda: True,
+    'false':       lambda: False,
+    'null':        lambda: None,
+}
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _compare(op, a, b):
+    if op == '=':
+        return _text(a) == _text(b)
+    if op == '!=':
+        return _text(a) != _text(b)
+    x, y = _number(a), _number(b)
+    if x is None or y is None:
+        x, y = _text(a), _text(b)
+    return {'<': x < y, '>': x > y, '<=': x <= y, '>=': x >= y}[op]
+
+
+def _arith(op, a, b):
+    x, y = _number(a), _number(b)
+    if op == '+' and (x is None or y is None):
+        return _text(a) + _text(b)
+    x, y = x or 0, y or 0
+    result = {'+': x + y, '-': x - y, '*': x * y, '/': x / y if y else None}[op]
+    return int(result) if isinstance(result, float) and result.is_integer() else result
+
+
+class _Parser:
+    """Recursive-descent parser: comparison > + - > * / > atoms."""
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = []
+        pos = 0
+        while pos < len(text):
+            if text[pos:].strip() == '':
+                break
+            m = _TOKEN_RE.match(text, pos)
+            if not m or m.end() == pos:
+                raise SimulationError(f"cannot parse expression {{{{{text}}}}} at {text[pos:]!r}")
+            self.tokens.append((m.lastgroup, m.group(m.lastgroup)))
+            pos = m.end()
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, value=None):
+        token = self.peek()
+        if value is not None and token[1] != value:
+            raise SimulationError(f"expected {value!r} in {{{{{self.text}}}}}")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        expr = self.comparison()
+        if self.pos != len(self.tokens):
+            raise SimulationError(f"unexpected {self.peek()[1]!r} in {{{{{self.text}}}}}")
+        return expr
+
+    def comparison(self):
+        left = self.additive()
+        kind, value = self.peek()
+        if kind == 'op' and value in ('=', '!=', '<', '>', '<=', '>='):
+            self.take()
+            right = self.additive()
+            return lambda ctx: _compare(value, left(ctx), right(ctx))
+        return left
+
+    def additive(self):
+        left = self.multiplicative()
+        while self.peek()[0] == 'op' and self.peek()[1] in '+-':
+            op = self.take()[1]
+            right, prev = self.multiplicative(), left
+            left = lambda ctx, op=op, a=prev, b=right: _arith(op, a(ctx), b(ctx))
+        return left
+
+    def multiplicative(self):
+        left = self.atom()
+        while self.peek()[0] == 'op' and self.peek()[1] in '*/':
+            op = self.take()[1]
+            right, prev = self.atom(), left
+            left = lambda ctx, op=op, a=prev, b=right: _arith(op, a(ctx), b(ctx))
+        return left
+
+    def atom(self):
+        kind, value = self.take()
+        if kind == 'str':
+            text = value[1:-1]
+            return lambda ctx: text
+        if kind == 'num':
+            number = float(value) if '.' in value else int(value)
+            return lambda ctx: number
+        if kind == 'ref':
+            return _compile_ref(value)
+        if kind == 'op' and value == '(':
+            expr = self.comparison()
+            self.take(')')
+            return expr
+        if kind == 'name':
+            if self.peek()[1] == '(':
+                return self.call(value)
+            if value not in KEYWORDS:
+                raise SimulationError(f"unsupported keyword {value!r} in {{{{{self.text}}}}}")
+            return lambda ctx, fn=KEYWORDS[value]: fn()
+        raise SimulationError(f"unexpected {value!r} in {{{{{self.text}}}}}")
+
+    def call(self, name):
+        if name not in FUNCTIONS:
+            raise SimulationError(f"unsupported function {name}() in {{{{{self.text}}}}}")
+        self.take('(')
+        args = []
+        while True:
+            if self.peek()[1] in (';', ')'):
+                args.append(lambda ctx: '')
+            else:
+                args.append(self.comparison())
+            if self.take()[1] == ')':
+                break
+        fn = FUNCTIONS[name]
+        return lambda ctx: fn(*(a(ctx) for a in args))
+
+
+def _compile_ref(text):
+    mid, _, rest = text.partition('.')
+    mid = int(mid)
+    path = [a or b for a, b in _FIELD_RE.findall(rest)]
+
+    def ref(ctx):
+        value = ctx.get(mid)
+        for key in path:
+            if isinstance(value, dict):
+                value = value.get(key)
+            elif isinstance(value, list) and key.isdigit() and int(key) < len(value):
+                value = value[int(key)]
+            else:
+                return None
+        return value
+    return ref
+
+
+def compile_template(text):
+    """Closure rendering a mapper string. A string that is exactly one
+    {{expr}} keeps the value's type (arrays, numbers); anything else is
+    rendered as text."""
+    parts = _EXPR_RE.split(text)
+    if len(parts) == 1:
+        return lambda ctx: text
+    compiled = [(p if i % 2 == 0 else _Parser(p).parse()) for i, p in enumerate(parts)]
+    if len(parts) == 3 and parts[0] == '' and parts[2] == '':
+        return compiled[1]
+
+    def render(ctx):
+        return ''.join(p if isinstance(p, str) else _text(p(ctx)) for p in compiled)
+    return render
+
+
+def compile_value(value):
+    """Closure evaluating every template in a mapper value (dict/list/str)."""
+    if isinstance(value, str):
+        return compile_template(value)
+    if isinstance(value, dict):
+        items = [(k, compile_value(v)) for k, v in value.items()]
+        return lambda ctx: {k: fn(ctx) for k, fn in items}
+    if isinstance(value, list):
+        items = [compile_value(v) for v in value]
+        return lambda ctx: [fn(ctx) for fn in items]
+    return lambda ctx: value
+
+
+# ── Filters ────────────────────────────────────────────────────────────────────
+
+def _ci(fn):
+    return lambda a, b: fn(_text(a).lower(), _text(b).lower())
+
+
+def _array(value):
+    return value if isinstance(value, list) else [] if _empty(value) else [value]
+
+
+OPERATORS = {
+    'text:equal':        lambda a, b: _text(a) == _text(b),
+    'text:notequal':     lambda a, b: _text(a) != _text(b),
+    'text:contain':      lambda a, b: _text(b) in _text(a),
+    'text:notcontain':   lambda a, b: _text(b) not in _text(a),
+    'text:startwith':    lambda a, b: _text(a).startswith(_text(b)),
+    'text:endwith':      lambda a, b: _text(a).endswith(_text(b)),
+    'text:empty':        lambda a, b: _text(a) == '',
+    'text:notempty':     lambda a, b: _text(a) != '',
+    'exist':             lambda a, b: not _empty(a),
+    'notexist':          lambda a, b: _empty(a),
+    'array:contain':     lambda a, b: _text(b) in [_text(x) for x in _array(a)],
+    'array:notcontain':  lambda a, b: _text(b) not in [_text(x) for x in _array(a)],
+    'array:empty':       lambda a, b: not _array(a),
+    'array:notempty':    lambda a, b: bool(_array(a)),
+    'number:equal':      lambda a, b: _number(a) == _number(b),
+    'number:notequal':   lambda a, b: _number(a) != _number(b),
+    'number:greater':    lambda a, b: (_number(a) or 0) > (_number(b) or 0),
+    'number:less':       lambda a, b: (_number(a) or 0) < (_number(b) or 0),
+}
+for _name in ('text:equal', 'text:notequal', 'text:contain', 'text:notcontain',
+              'text:startwith', 'text:endwith'):
+    OPERATORS[_name + ':ci'] = _ci(OPERATORS[_name])
+
+
+def _operator(name):
+    try:
+        return OPERATORS[name]
+    except KeyError:
+        raise SimulationError(f"unsupported filter operator {name!r}") from None
+
+
+def compile_filter(flt):
+    """Closure: True if the Make.com filter passes (OR of AND groups)."""
+    groups = [[(compile_template(c.get('a', '')), compile_template(c.get('b', '') or ''),
+                _operator(c['o'])) for c in group]
+              for group in flt.get('conditions') or []]
+    return lambda ctx: not groups or any(all(op(a(ctx), b(ctx)) for a, b, op in group)
+                                         for group in groups)
+
+
+# ── Stand-ins ──────────────────────────────────────────────────────────────────
+
+def column_index(letter):
+    """'A' -> 0, 'C' -> 2, 'AA' -> 26."""
+    n = 0
+    for ch in letter.upper():
+        n = n * 26 + ord(ch) - 64
+    return n - 1
+
+
+class FakeSheets:
+    """Tabs of rows ({'0': value, ...}); row numbers start at 2 (row 1 is
+    the header). text:equal searches on a single column use an index."""
+
+    def __init__(self):
+        self.tabs = {}
+        self._index = {}
+        self.updates = 0
+
+    def _key(self, tab):
+        return tab.strip('/').rsplit('/', 1)[-1]
+
+    def append(self, tab, values):
+        rows = self.tabs.setdefault(self._key(tab), [])
+        row = {str(i): v for i, v in enumerate(values)}
+        row['__ROW_NUMBER__'] = len(rows) + 2
+        rows.append(row)
+        for (t, col), index in self._index.items():
+            if t == self._key(tab):
+                index.setdefault(_text(row.get(col)), []).append(row)
+        return row
+
+    def row(self, tab, row_number):
+        rows = self.tabs.get(self._key(tab), [])
+        n = int(row_number) - 2
+        if not 0 <= n < len(rows):
+            raise SimulationError(f"sheet {tab!r} has no row {row_number}")
+        return rows[n]
+
+    def search(self, tab, conditions):
+        tab = self._key(tab)
+        rows = self.tabs.get(tab, [])
+        if len(conditions) == 1 and len(conditions[0]) == 1 and conditions[0][0]['o'] == 'text:equal':
+            cond = conditions[0][0]
+            col = str(column_index(cond['a']))
+            index = self._index.get((tab, col))
+            if index is None:
+                index = self._index[(tab, col)] = {}
+                for r in rows:
+                    index.setdefault(_text(r.get(col)), []).append(r)
+            found = index.get(_text(cond['b']), [])
+        else:
+            found = [r for r in rows
+                     if any(all(_operator(c['o'])(r.get(str(column_index(c['a']))), c.get('b'))
+                                for c in group) for group in conditions)]
+        return [dict(r, __IMTINDEX__=i, __IMTLENGTH__=len(found)) for i, r in enumerate(found, 1)]
+
+    def update(self, tab, row_number, values):
+        row = self.row(tab, row_number)
+        tab = self._key(tab)
+        for col, value in values.items():
+            for (t, c), index in self._index.items():
+                if t == tab and c == col:
+                    index.get(_text(row.get(col)), []).remove(row)
+                    index.setdefault(_text(value), []).append(row)
+            row[col] = value
+        self.updates += 1
+        return dict(row)
+
+
+class FakeDrive:
+    """Folder tree in memory: id -> (name, parent id)."""
+
+    def __init__(self):
+        self.folders = {}
+        self._ids = itertools.count(1)
+
+    def create_folder(self, name, parent):
+        if not parent:
+            raise SimulationError(f"createAFolder {name!r}: no parent folder id")
+        folder_id = f'fake-folder-{next(self._ids)}'
+        self.folders[folder_id] = (name, parent)
+        return {'id': folder_id, 'name': name, 'parents': [parent],
+                'webViewLink': f'https://drive.google.com/drive/folders/{folder_id}'}
+
+    def duplicates(self):
+        """[(parent, name, count)] for names created more than once in a folder."""
+        seen = {}
+        for name, parent in self.folders.values():
+            seen[(parent, name)] = seen.get((parent, name), 0) + 1
+        return [(p, n, c) for (p, n), c in seen.items() if c > 1]
+
+
+class FakeApps:
+    """Asana, Slack and HTTP calls: recorded, answered with generated ids."""
+
+    def __init__(self):
+        self.calls = []
+        self._ids = itertools.count(1_000_000)
+
+    def call(self, module_type, values):
+        self.calls.append(module_type)
+        gid = str(next(self._ids))
+        if module_type == 'http:MakeRequest':
+            return {'statusCode': 201, 'data': {'data': {'gid': gid}}}
+        if module_type == 'slack:CreateMessage':
+            return {'ts': f'{time.time():.6f}', 'channel': values.get('channel')}
+        if module_type == 'asana:DuplicateProject':
+            return {'gid': gid, 'new_project': {'gid': gid}}
+        return {'gid': gid, 'permalink_url': f'https://app.asana.com/0/0/{gid}'}
+
+
+APP_MODULES = {'asana:CreateTask', 'asana:DuplicateProject', 'slack:CreateMessage',
+               'http:MakeRequest'}
+
+
+class Postgres:
+    """postgres:StoredProcedure against a real connection. Arguments are
+    the @NN mapper fields in order; empty strings are passed as NULL."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.cur = conn.cursor()
+        self._sql = {}
+
+    def call(self, spname, mapper):
+        args = [None if mapper[k] in ('', None) else _text(mapper[k])
+                for k in sorted(k for k in mapper if k.startswith('@'))]
+        sql = self._sql.get((spname, len(args)))
+        if sql is None:
+            sql = self._sql[(spname, len(args))] = \
+                f"SELECT * FROM {spname}({', '.join(['%s'] * len(args))})"
+        self.cur.execute(sql, args)
+        names = [d[0] for d in self.cur.description]
+        return [dict(zip(names, row)) for row in self.cur.fetchall()]
+
+
+# ── Executor ───────────────────────────────────────────────────────────────────
+
+def _fork(ctx, mid, bundle):
+    sub = dict(ctx)
+    sub[mid] = bundle
+    return sub
+
+
+class Simulator:
+
+    def __init__(self, bp, db, sheets, drive, apps):
+        self.bp = bp
+        self.db = db
+        self.sheets = sheets
+        self.drive = drive
+        self.apps = apps
+        self.timings = {}       # module id -> [runs, total seconds, max seconds]
+        self.warnings = set()
+        self._mappers, self._filters, self._refs, self._closers = {}, {}, {}, {}
+        for module in bp.modules():
+            mid = module['id']
+            self._mappers[mid] = compile_value(module.get('mapper') or {})
+            if module.get('filter'):
+                self._filters[mid] = compile_filter(module['filter'])
+            self._refs[mid] = module_refs(module.get('mapper')) | module_refs(module.get('filter'))
+            kind = module['module']
+            if kind not in TRIGGERS | AGGREGATORS | FREE | APP_MODULES and kind not in self.HANDLERS:
+                raise SimulationError(f"module {mid}: {kind} is not supported by the simulator")
+        self._index_aggregators(bp.flow)
+        trigger = bp.flow[0] if bp.flow else None
+        if not trigger or trigger['module'] not in TRIGGERS:
+            raise SimulationError("the blueprint's first module is not a supported trigger")
+        self.trigger = trigger
+
+    def _index_aggregators(self, flow):
+        for pos, module in enumerate(flow):
+            if module['module'] in AGGREGATORS:
+                feeder = (module.get('parameters') or {}).get('feeder')
+                self._closers[feeder] = pos
+            for child in child_flows(module):
+                self._index_aggregators(child)
+
+    # ── Module handlers ──
+
+    def _sheets_search(self, module, values):
+        return self.sheets.search(values.get('sheetId', ''), values.get('filter') or [])
+
+    def _sheets_update(self, module, values):
+        return [self.sheets.update(values.get('sheetId', ''), values.get('rowNumber'),
+                                   values.get('values') or {})]
+
+    def _drive_create(self, module, values):
+        return [self.drive.create_folder(values.get('name'), values.get('folderId'))]
+
+    def _postgres(self, module, values):
+        spname = (module.get('parameters') or {}).get('spname')
+        try:
+            return self.db.call(spname, values)
+        except Exception as e:
+            raise SimulationError(f"module {module['id']} {spname}: "
+                                  f"{str(e).strip().splitlines()[0]}") from None
+
+    def _set_variables(self, module, values):
+        return [{v.get('name'): v.get('value') for v in values.get('variables') or []}]
+
+    def _set_variable(self, module, values):
+        return [{values.get('name'): values.get('value')}]
+
+    def _create_json(self, module, values):
+        return [{'json': json.dumps(values.get('data'))}]
+
+    HANDLERS = {
+        'google-sheets:filterRows':   _sheets_search,
+        'google-sheets:updateRow':    _sheets_update,
+        'google-drive:createAFolder': _drive_create,
+        'postgres:StoredProcedure':   _postgres,
+        'util:SetVariables':          _set_variables,
+        'util:SetVariable2':          _set_variable,
+        'json:CreateJSON':            _create_json,
+    }
+
+    # ── Flow ──
+
+    def _execute(self, module, ctx):
+        """Output bundles of one module for the current context."""
+        mid, kind = module['id'], module['module']
+        aggregated = ctx.get(_AGGREGATED)
+        if aggregated:
+            for ref in self._refs[mid] & aggregated.keys():
+                self.warnings.add(f"module {mid} reads module {ref}, whose bundles aggregator "
+                                  f"{aggregated[ref]} collapsed; the simulator uses the last bundle")
+        start = time.perf_counter()
+        if kind in FREE:
+            out = [{}]
+        else:
+            values = self._mappers[mid](ctx)
+            if kind in APP_MODULES:
+                out = [self.apps.call(kind, values)]
+            else:
+                out = self.HANDLERS[kind](self, module, values)
+        elapsed = time.perf_counter() - start
+        t = self.timings.setdefault(mid, [0, 0.0, 0.0])
+        t[0] += 1
+        t[1] += elapsed
+        t[2] = max(t[2], elapsed)
+        return out
+
+    def _passes(self, module, ctx):
+        flt = self._filters.get(module['id'])
+        return flt is None or flt(ctx)
+
+    def run_flow(self, flow, ctx, start=0, stop=None):
+        """Run flow[start:stop] for one bundle context. False if a filter
+        or an empty result ended it early."""
+        stop = len(flow) if stop is None else stop
+        pos = start
+        while pos < stop:
+            module = flow[pos]
+            if not self._passes(module, ctx):
+                return False
+            out = self._execute(module, ctx)
+            if module['module'] == 'builtin:BasicRouter':
+                for route in module.get('routes') or []:
+                    self.run_flow(route.get('flow') or [], ctx)
+                pos += 1
+                continue
+            if not out:
+                return False
+            closer = self._closers.get(module['id'])
+            if closer is not None and not pos < closer < stop:
+                closer = None
+            if len(out) == 1 and closer is None:
+                ctx[module['id']] = out[0]
+                pos += 1
+                continue
+            if closer is None:
+                for bundle in out:
+                    self.run_flow(flow, _fork(ctx, module['id'], bundle), pos + 1, stop)
+                return True
+
+            aggregator = flow[closer]
+            params = aggregator.get('parameters') or {}
+            texts, last, spent = [], None, 0.0
+            for bundle in out:
+                sub = _fork(ctx, module['id'], bundle)
+                if self.run_flow(flow, sub, pos + 1, closer):
+                    started = time.perf_counter()
+                    texts.append(_text(self._mappers[aggregator['id']](sub).get('value')))
+                    spent += time.perf_counter() - started
+                    last = sub
+            if last:
+                ctx.update(last)
+            ctx[aggregator['id']] = {'text': params.get('rowSeparator', '\n').join(texts)}
+            aggregated = dict(ctx.get(_AGGREGATED) or {})
+            aggregated.update((m['id'], aggregator['id']) for m in flow[pos:closer])
+            ctx[_AGGREGATED] = aggregated
+            t = self.timings.setdefault(aggregator['id'], [0, 0.0, 0.0])
+            t[0] += 1
+            t[1] += spent
+            t[2] = max(t[2], spent)
+            pos = closer + 1
+        return True
+
+    def run(self, row):
+        """One scenario run for a trigger bundle (an IO Forms row)."""
+        start = time.perf_counter()
+        ctx = {self.trigger['id']: row}
+        self.run_flow(self.bp.flow, ctx, start=1)
+        t = self.timings.setdefault(self.trigger['id'], [0, 0.0, 0.0])
+        t[0] += 1
+        return time.perf_counter() - start
+
+
+# ── Synthetic data ─────────────────────────────────────────────────────────────
+
+def seed_clients(cur, count):
+    """Synthetic clients SIM01.. with one client code each; returns the codes."""
+    codes = []
+    for i in range(1, count + 1):
+        tla = f'{SIM_PREFIX}{i:02d}'
+        cur.execute("SELECT upsert_client(%s, %s)", (tla, f'Simulated Client {i}'))
+        cur.execute("SELECT upsert_client_code(%s, %s, %s, %s)",
+                    (f'{tla}-01', tla, f'Contact {i}', f'contact{i}@example.com'))
+        codes.append(f'{tla}-01')
+    return codes
+
+
+def cleanup(cur):
+    """Delete every row the simulator created. Returns {table: rows}."""
+    deleted = {}
+    io_refs, tlas, codes = f'^{SIM_PREFIX}-', rf'^{SIM_PREFIX}\d{{2}}$', rf'^{SIM_PREFIX}\d{{2}}-01$'
+    statements = [
+        ('io_products', "DELETE FROM io_products WHERE io_reference ~ %s", io_refs),
+        ('insertion_orders', "DELETE FROM insertion_orders WHERE io_reference ~ %s", io_refs),
+        ('client_product_folders',
+         "DELETE FROM client_product_folders WHERE client_code_id IN "
+         "(SELECT id FROM bsb_client_codes WHERE bsb_client_code ~ %s)", codes),
+        ('bsb_client_codes', "DELETE FROM bsb_client_codes WHERE bsb_client_code ~ %s", codes),
+        ('clients', "DELETE FROM clients WHERE tla ~ %s", tlas),
+    ]
+    for table, sql, pattern in statements:
+        cur.execute(sql, (pattern,))
+        deleted[table] = cur.rowcount
+    return deleted
+
+
+def add_submission(sheets, rng, run_id, n, codes, products):
+    """Append one IO Forms row and its Products rows; returns the IO row."""
+    io_ref = f'{SIM_PREFIX}-{run_id}-{n:05d}'
+    code = rng.choice(codes)
+    signed = datetime(rng.choice(YEARS), rng.randint(1, 12), rng.randint(1, 28))
+    company = f'Simulated Client {code[3:5].lstrip("0")}'
+    row = sheets.append('IO Forms', [
+        'Sam', 'sam@example.com', (signed - timedelta(days=1)).strftime('%Y-%m-%d'),
+        signed.strftime('%Y-%m-%d'), io_ref, code, 'No', '', 'Pat Contact',
+        'pat@example.com', 'Alex|alex@example.com', 'Synthetic submission', '',
+        f'https://example.com/{io_ref}.pdf', f'https://example.com/forms/{io_ref}',
+        company, company, '', '', '', 'Pat', 'Contact',
+    ])
+    for i in range(rng.randint(*products)):
+        kind = rng.choice(PRODUCT_TYPES)
+        sheets.append('Products', [kind, f'{kind} {i + 1}', io_ref, company, ''])
+    return row
+
+
+# ── Output ─────────────────────────────────────────────────────────────────────
+
+def print_report(sim, durations, failures, elapsed):
+    done = len(durations)
+    rate = done / elapsed if elapsed else 0
+    print(f"\n{done} submission(s) in {elapsed:.2f}s ({rate:.0f}/s), {len(failures)} failed")
+    if durations:
+        ms = sorted(d * 1000 for d in durations)
+        p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+        print(f"per submission: median {statistics.median(ms):.2f} ms, p95 {p95:.2f} ms, "
+              f"max {ms[-1]:.2f} ms")
+
+    print(f"\n{'id':>4}  {'module':<28} {'runs':>6} {'total ms':>9} {'avg ms':>8} {'max ms':>8}  label")
+    total = sum(t[1] for t in sim.timings.values()) or 1
+    for module in sim.bp.modules():
+        t = sim.timings.get(module['id'])
+        if not t or not t[0]:
+            continue
+        label = (module.get('metadata') or {}).get('designer', {}).get('name') or ''
+        print(f"{module['id']:>4}  {module['module'][:28]:<28} {t[0]:>6} {t[1] * 1000:>9.1f} "
+              f"{t[1] * 1000 / t[0]:>8.3f} {t[2] * 1000:>8.3f}  {label[:32]}"
+              f"{'  ' + format(t[1] / total, '.0%') if t[1] / total >= 0.1 else ''}")
+
+    print(f"\nDrive: {len(sim.drive.folders)} folder(s) created; "
+          f"Sheets: {sim.sheets.updates} row update(s); other app calls: {len(sim.apps.calls)}")
+    duplicates = sim.drive.duplicates()
+    if duplicates:
+        print(f"WARNING: {len(duplicates)} folder name(s) created more than once in the same parent:")
+        for parent, name, count in duplicates[:10]:
+            print(f"  {count}x {name!r} in {parent}")
+    for warning in sorted(sim.warnings):
+        print(f"WARNING: {warning}")
+    for io_ref, error in failures[:10]:
+        print(f"FAILED {io_ref}: {error}")
+
+
+# ── Main ───────────────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the IO submission blueprint locally')
+    parser.add_argument('--blueprint', default=DEFAULT_BLUEPRINT, metavar='FILE',
+                        help='Blueprint JSON (default: the committed IO blueprint)')
+    parser.add_argument('--submissions', type=int, default=DEFAULT_SUBMISSIONS, metavar='N',
+                        help=f'Synthetic IO submissions to run (default: {DEFAULT_SUBMISSIONS})')
+    parser.add_argument('--products', type=int, nargs=2, default=DEFAULT_PRODUCTS,
+                        metavar=('MIN', 'MAX'),
+                        help=f'Products per IO, picked uniformly (default: {DEFAULT_PRODUCTS})')
+    parser.add_argument('--clients', type=int, default=DEFAULT_CLIENTS,
+                        help=f'Synthetic clients to spread IOs over (default: {DEFAULT_CLIENTS})')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED,
+                        help=f'Random seed (default: {DEFAULT_SEED})')
+    parser.add_argument('--commit', action='store_true',
+                        help='Commit the seeded clients and each submission instead of '
+                             'rolling them back (remove them later with --cleanup)')
+    parser.add_argument('--cleanup', action='store_true',
+                        help=f'Delete all {SIM_PREFIX}* rows from the DB and exit')
+    args = parser.parse_args()
+
+    if os.environ.get('DB_NAME', PRODUCTION_DB) == PRODUCTION_DB:
+        print(f"ERROR: refusing to run against {PRODUCTION_DB}. "
+              f"Point DB_NAME at a local scratch database.")
+        sys.exit(1)
+
+    try:
+        conn = get_db_connection()
+    except KeyError as e:
+        print(f"ERROR: missing env var {e}. Set DB_HOST, DB_NAME, DB_USER, DB_PASS.")
+        sys.exit(1)
+    cur = conn.cursor()
+
+    if args.cleanup:
+        deleted = cleanup(cur)
+        conn.commit()
+        print(', '.join(f"{table}: {n}" for table, n in deleted.items()))
+        return
+
+    try:
+        sim = Simulator(Blueprint.load(args.blueprint), Postgres(conn),
+                        FakeSheets(), FakeDrive(), FakeApps())
+    except (OSError, ValueError, SimulationError) as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+    # Without --commit the seeded clients stay in one open transaction and
+    # each submission in a savepoint inside it; the whole lot is rolled back
+    # at the end.
+    codes = seed_clients(cur, args.clients)
+    if args.commit:
+        conn.commit()
+
+    rng = random.Random(args.seed)
+    run_id = format(int(time.time()), 'x')
+    rows = [add_submission(sim.sheets, rng, run_id, n, codes, args.products)
+            for n in range(1, args.submissions + 1)]
+    print(f"{len(rows)} submission(s), {sum(len(r) for r in sim.sheets.tabs.values()) - len(rows)} "
+          f"product row(s), {len(codes)} client(s); blueprint {os.path.basename(args.blueprint)}")
+
+    durations, failures = [], []
+    start = time.perf_counter()
+    for row in rows:
+        if not args.commit:
+            cur.execute("SAVEPOINT submission")
+        try:
+            durations.append(sim.run(row))
+        except SimulationError as e:
+            failures.append((row['4'], str(e)))
+            if args.commit:
+                conn.rollback()
+                continue
+        if args.commit:
+            conn.commit()
+        else:
+            cur.execute("ROLLBACK TO SAVEPOINT submission")
+    elapsed = time.perf_counter() - start
+
+    if not args.commit:
+        conn.rollback()
+    cur.close()
+    conn.close()
+    print_report(sim, durations, failures, elapsed)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
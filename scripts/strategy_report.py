@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+"""
+Strategy Report Engine
+======================
+Renders the weekly strategy report for any focus cycle and report date, as
+Slack mrkdwn (identical to generate_weekly_slack_report), Slack Block Kit
+JSON, Markdown or CSV. Backfilling every weekly report since the first cycle
+is one DB query.
+
+Usage:
+    python3 scripts/strategy_report.py                            # active cycle, today, Slack mrkdwn
+    python3 scripts/strategy_report.py --date 2026-10-16 --format markdown
+    python3 scripts/strategy_report.py --cycle FC3 --format blocks --out reports/
+    python3 scripts/strategy_report.py --backfill --format csv > weekly.csv
+    python3 scripts/strategy_report.py --backfill --format markdown --out reports/
+
+Report dates
+------------
+--date reports on the cycle that contains that date. --cycle reports on
+every --weekday (default Friday, like the Make.com schedule) of that cycle up
+to today; --backfill does the same for every cycle. A date between cycles
+has no report and is skipped.
+
+Data
+----
+All requested (cycle, date) pairs are fetched in one round-trip: each cycle's
+mv_cycle_rollup row, the milestones due in the 7 days from the report date,
+and the 5-day team pulse from mv_checkin_daily (sql/migrate-cycle-rollups.sql).
+Rollups older than STALE_AFTER are refreshed in the same round-trip, as the
+SQL report does.
+
+Project and milestone statuses are stored as current state only, so a
+backfilled report shows today's statuses with the report date's cycle
+progress, due dates and team pulse.
+
+Fetched data is cached as JSON in CACHE_DIR, one file per (cycle, date), so
+re-rendering in another format does not touch the DB. --no-cache ignores and
+rewrites the cache. Today's report is never read from the cache.
+
+--out DIR writes one file per report (<cycle>-<date>.<ext>; CSV writes one
+report.csv with a row per report); otherwise reports go to stdout.
+"""
+
+import os
+import io
+import csv
+import sys
+import json
+import argparse
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from common import SCRIPT_DIR, get_db_connection
+
+# ── Constants ──────────────────────────────────────────────────────────────────
+
+CACHE_DIR = os.path.join(SCRIPT_DIR, '.report_cache')
+
+STALE_AFTER = '1 hour'
+
+FORMATS = ('slack', 'blocks', 'markdown', 'csv')
+EXTENSIONS = {'slack': 'txt', 'blocks': 'json', 'markdown': 'md', 'csv': 'csv'}
+
+FRIDAY = 4
+
+STATUS_EMOJI = {
+    'complete': '✅',
+    'on_track': '🟢',
+    'at_risk':  '🟡',
+    'blocked':  '🔴',
+}
+
+# Slack rejects section text over 3000 characters
+BLOCK_TEXT_LIMIT = 3000
+
+CSV_COLUMNS = [
+    'cycle', 'report_date', 'days_remaining', 'pct_elapsed',
+    'projects', 'on_track', 'at_risk', 'blocked', 'complete',
+    'overall_completion', 'needs_attention', 'due_this_week',
+    'pulse_responses', 'avg_mood', 'avg_busyness',
+]
+
+# One row per requested date that falls inside a cycle. List columns are
+# JSONB in the same order as generate_weekly_slack_report.
+FETCH_SQL = f"""
+SELECT refresh_cycle_rollups()
+WHERE EXISTS (SELECT 1 FROM mv_cycle_rollup WHERE refreshed_at < NOW() - INTERVAL '{STALE_AFTER}')
+   OR NOT EXISTS (SELECT 1 FROM mv_cycle_rollup);
+
+SELECT jsonb_build_object(
+    'report_date',     d.report_date,
+    'code',            r.code,
+    'name',            r.name,
+    'start_date',      r.start_date,
+    'end_date',        r.end_date,
+    'project_count',   r.project_count,
+    'on_track',        r.on_track,
+    'at_risk',         r.at_risk,
+    'blocked',         r.blocked,
+    'complete',        r.complete,
+    'overall_pct',     ROUND(r.avg_completion),
+    'projects',        COALESCE(r.projects, '[]'),
+    'needs_attention', COALESCE(r.needs_attention, '[]'),
+    'initiatives',     COALESCE(r.initiatives, '[]'),
+    'due_this_week',   COALESCE(due.items, '[]'),
+    'pulse_responses', pulse.responses,
+    'avg_mood',        ROUND(pulse.mood_sum::NUMERIC / NULLIF(pulse.responses, 0), 1),
+    'avg_busyness',    ROUND(pulse.busyness_sum::NUMERIC / NULLIF(pulse.responses, 0), 1),
+    'refreshed_at',    r.refreshed_at
+)::text
+FROM unnest(%s::date[]) AS d(report_date)
+JOIN mv_cycle_rollup r ON d.report_date BETWEEN r.start_date AND r.end_date
+LEFT JOIN LATERAL (
+    SELECT jsonb_agg(jsonb_build_object(
+        'name', m.name,
+        'project', p.name,
+        'target_date', m.target_date
+    ) ORDER BY m.target_date) AS items
+    FROM milestones m
+    JOIN projects p ON m.project_id = p.id
+    WHERE m.target_date BETWEEN d.report_date AND d.report_date + INTERVAL '7 days'
+      AND m.status NOT IN ('complete', 'cancelled')
+) due ON true
+LEFT JOIN LATERAL (
+    SELECT SUM(c.response_count) AS responses,
+           SUM(c.mood_sum)       AS mood_sum,
+           SUM(c.busyness_sum)   AS busyness_sum
+    FROM mv_checkin_daily c
+    WHERE c.response_date BETWEEN d.report_date - 4 AND d.report_date
+) pulse ON true
+ORDER BY d.report_date
+"""
+
+
+# ── Report dates ───────────────────────────────────────────────────────────────
+
+def load_cycles(cur):
+    """[(code, start_date, end_date, status)] ordered by start_date."""
+    cur.execute("SELECT code, start_date, end_date, status FROM focus_cycles ORDER BY start_date")
+    return cur.fetchall()
+
+
+def weekly_dates(start, end, weekday=FRIDAY, until=None):
+    """Every `weekday` between start and end (inclusive), stopping at until."""
+    last = min(end, until) if until else end
+    d = start + timedelta(days=(weekday - start.weekday()) % 7)
+    dates = []
+    while d <= last:
+        dates.append(d)
+        d += timedelta(days=7)
+    return dates
+
+
+# ── Fetch + cache ──────────────────────────────────────────────────────────────
+
+def _decode(text):
+    # Decimals keep the DB's scale, so 98.00 renders as "98.00" like the SQL report
+    return json.loads(text, parse_float=Decimal)
+
+
+def _cache_path(cache_dir, code, report_date):
+    return os.path.join(cache_dir, f'{code}-{report_date.isoformat()}.json')
+
+
+def fetch_reports(cur, dates):
+    """{report_date: (cycle code, raw JSON text)} for dates inside a cycle, in one round-trip."""
+    cur.execute(FETCH_SQL, (list(dates),))
+    out = {}
+    for (text,) in cur.fetchall():
+        data = _decode(text)
+        out[date.fromisoformat(data['report_date'])] = (data['code'], text)
+    return out
+
+
+def load_reports(conn, dates, cycle_of, cache_dir=CACHE_DIR, use_cache=True, today=None):
+    """Report data for each date, from the cache where possible. cycle_of maps
+    a date to its cycle code (None between cycles). Returns [data] by date."""
+    today = today or date.today()
+    reports, missing = {}, []
+    for d in dates:
+        code = cycle_of(d)
+        if code is None:
+            continue
+        path = _cache_path(cache_dir, code, d)
+        if use_cache and d < today and os.path.exists(path):
+            with open(path) as f:
+                reports[d] = _decode(f.read())
+        else:
+            missing.append(d)
+
+    if missing:
+        cur = conn.cursor()
+        fetched = fetch_reports(cur, missing)
+        conn.commit()
+        cur.close()
+        os.makedirs(cache_dir, exist_ok=True)
+        for d, (code, text) in fetched.items():
+            with open(_cache_path(cache_dir, code, d), 'w') as f:
+                f.write(text)
+            reports[d] = _decode(text)
+
+    return [reports[d] for d in sorted(reports)]
+
+
+# ── Derived values ─────────────────────────────────────────────────────────────
+
+def _round(value, places=0):
+    """ROUND() as PostgreSQL does it for numerics: half away from zero."""
+    return Decimal(value).quantize(Decimal(1).scaleb(-places), rounding=ROUND_HALF_UP)
+
+
+def bar(tenths):
+    tenths = max(0, min(10, tenths))
+    return '█' * tenths + '░' * (10 - tenths)
+
+
+def cycle_progress(r):
+    """(days_remaining, pct_elapsed) at the report date."""
+    report_date = date.fromisoformat(r['report_date'])
+    start, end = date.fromisoformat(r['start_date']), date.fromisoformat(r['end_date'])
+    elapsed, total = (report_date - start).days, (end - start).days
+    return (end - report_date).days, int(_round(Decimal(100 * elapsed) / total))
+
+
+def _dash(value):
+    return '—' if value is None else str(value)
+
+
+def _day_month(iso):
+    return date.fromisoformat(iso).strftime('%d %b')
+
+
+def _long_date(iso):
+    return date.fromisoformat(iso).strftime('%d %b %Y')
+
+
+def needs_attention_lines(r):
+    return [
+        f"• {p['name']}  [{p['status']}]" + (f"  — {p['project_lead']}" if p.get('project_lead') is not None else '')
+        for p in r['needs_attention']
+    ]
+
+
+def due_lines(r):
+    return [f"• {m['name']}  ({m['project']})  — {_day_month(m['target_date'])}" for m in r['due_this_week']]
+
+
+def initiative_lines(r):
+    return [f"*{i['code']}*  ✅ {i['complete']}  ⬜ {i['incomplete']}" for i in r['initiatives']]
+
+
+def project_lines(r):
+    return [
+        f"{bar(int(_round(Decimal(p['percent_complete']) / 10)))} {p['percent_complete']}%  {p['name']}  "
+        f"{STATUS_EMOJI.get(p['status'], '⚪')}"
+        for p in r['projects']
+    ]
+
+
+# ── Renderers ──────────────────────────────────────────────────────────────────
+
+def render_slack(r):
+    """Slack mrkdwn, character-for-character what generate_weekly_slack_report returns."""
+    days_remaining, pct = cycle_progress(r)
+    return '\n'.join([
+        f"📊 *BsB Strategy — {r['code']} Weekly Report*",
+        f"_{_long_date(r['report_date'])}_",
+        '',
+        '*⏱ Cycle Progress*',
+        f"{r['name']} · {days_remaining} days remaining",
+        f"{bar(pct // 10)} {pct}% elapsed",
+        '',
+        '*🚦 Cycle Health*',
+        f"{r['on_track']} on track  ·  {r['at_risk']} at risk  ·  "
+        f"{r['blocked']} blocked  ·  {r['complete']} complete",
+        '',
+        '*⚠️ Needs Attention*',
+        '\n'.join(needs_attention_lines(r)) or '_None_ 🎉',
+        '',
+        '*📅 Due This Week*',
+        '\n'.join(due_lines(r)) or '_Nothing due this week_',
+        '',
+        '*🎯 Milestone Progress by Initiative*',
+        '\n'.join(initiative_lines(r)) or '_No milestone data this cycle_',
+        '',
+        '*📁 Projects This Cycle*',
+        '\n'.join(project_lines(r)) or '_No projects this cycle_',
+        '',
+        f"*Overall Completion: {_dash(r['overall_pct'])}%*",
+        '',
+        '*😊 Team Pulse* _(5-day avg)_',
+        f"Mood: {_dash(r['avg_mood'])} / 10  ·  Busyness: {_dash(r['avg_busyness'])} / 10",
+    ])
+
+
+def _sections(title, lines, empty):
+    """Section blocks for a titled list, split to stay under BLOCK_TEXT_LIMIT."""
+    blocks, text = [], f'*{title}*'
+    for line in lines or [empty]:
+        if len(text) + 1 + len(line) > BLOCK_TEXT_LIMIT:
+            blocks.append({'type': 'section', 'text': {'type': 'mrkdwn', 'text': text}})
+            text = line
+        else:
+            text += '\n' + line
+    blocks.append({'type': 'section', 'text': {'type': 'mrkdwn', 'text': text}})
+    return blocks
+
+
+def render_blocks(r):
+    """Slack Block Kit message payload ({"blocks": [...]}) as JSON."""
+    days_remaining, pct = cycle_progress(r)
+    blocks = [
+        {'type': 'header', 'text': {'type': 'plain_text', 'text': f"📊 BsB Strategy — {r['code']} Weekly Report"}},
+        {'type': 'context', 'elements': [{'type': 'mrkdwn', 'text': _long_date(r['report_date'])}]},
+        {'type': 'section', 'text': {'type': 'mrkdwn', 'text':
+            f"*⏱ Cycle Progress*\n{r['name']} · {days_remaining} days remaining\n{bar(pct // 10)} {pct}% elapsed"}},
+        {'type': 'section', 'fields': [
+            {'type': 'mrkdwn', 'text': f"*🟢 On track*\n{r['on_track']}"},
+            {'type': 'mrkdwn', 'text': f"*🟡 At risk*\n{r['at_risk']}"},
+            {'type': 'mrkdwn', 'text': f"*🔴 Blocked*\n{r['blocked']}"},
+            {'type': 'mrkdwn', 'text': f"*✅ Complete*\n{r['complete']}"},
+        ]},
+        {'type': 'divider'},
+    ]
+    blocks += _sections('⚠️ Needs Attention', needs_attention_lines(r), '_None_ 🎉')
+    blocks += _sections('📅 Due This Week', due_lines(r), '_Nothing due this week_')
+    blocks += _sections('🎯 Milestone Progress by Initiative', initiative_lines(r), '_No milestone data this cycle_')
+    blocks += _sections('📁 Projects This Cycle', project_lines(r), '_No projects this cycle_')
+    blocks += [
+        {'type': 'divider'},
+        {'type': 'section', 'fields': [
+            {'type': 'mrkdwn', 'text': f"*Overall Completion*\n{_dash(r['overall_pct'])}%"},
+            {'type': 'mrkdwn', 'text': f"*😊 Team Pulse* _(5-day avg)_\n"
+                                       f"Mood {_dash(r['avg_mood'])} / 10 · Busyness {_dash(r['avg_busyness'])} / 10"},
+        ]},
+    ]
+    return json.dumps({'text': f"BsB Strategy — {r['code']} Weekly Report", 'blocks': blocks},
+                      ensure_ascii=False, indent=2)
+
+
+def _md_cell(value):
+    return str(value).replace('|', '\\|')
+
+
+def render_markdown(r):
+    days_remaining, pct = cycle_progress(r)
+    out = [
+        f"# BsB Strategy — {r['code']} Weekly Report",
+        '',
+        f"_{_long_date(r['report_date'])}_",
+        '',
+        '## Cycle Progress',
+        '',
+        f"{r['name']} · {days_remaining} days remaining · {pct}% elapsed",
+        '',
+        '## Cycle Health',
+        '',
+        '| On track | At risk | Blocked | Complete | Overall completion |',
+        '|---:|---:|---:|---:|---:|',
+        f"| {r['on_track']} | {r['at_risk']} | {r['blocked']} | {r['complete']} | {_dash(r['overall_pct'])}% |",
+        '',
+        '## Needs Attention',
+        '',
+    ]
+    out += [f"- {p['name']} ({p['status']})" + (f" — {p['project_lead']}" if p.get('project_lead') is not None else '')
+            for p in r['needs_attention']] or ['_None_']
+    out += ['', '## Due This Week', '']
+    out += [f"- {_day_month(m['target_date'])}: {m['name']} ({m['project']})"
+            for m in r['due_this_week']] or ['_Nothing due this week_']
+    out += ['', '## Milestone Progress by Initiative', '']
+    if r['initiatives']:
+        out += ['| Initiative | Complete | Incomplete |', '|---|---:|---:|']
+        out += [f"| {i['code']} | {i['complete']} | {i['incomplete']} |" for i in r['initiatives']]
+    else:
+        out.append('_No milestone data this cycle_')
+    out += ['', '## Projects This Cycle', '']
+    if r['projects']:
+        out += ['| Project | Status | Complete |', '|---|---|---:|']
+        out += [f"| {_md_cell(p['name'])} | {p['status']} | {p['percent_complete']}% |" for p in r['projects']]
+    else:
+        out.append('_No projects this cycle_')
+    out += [
+        '',
+        '## Team Pulse (5-day avg)',
+        '',
+        f"Mood {_dash(r['avg_mood'])} / 10 · Busyness {_dash(r['avg_busyness'])} / 10",
+        '',
+    ]
+    return '\n'.join(out)
+
+
+def csv_row(r):
+    days_remaining, pct = cycle_progress(r)
+    return {
+        'cycle':              r['code'],
+        'report_date':        r['report_date'],
+        'days_remaining':     days_remaining,
+        'pct_elapsed':        pct,
+        'projects':           r['project_count'],
+        'on_track':           r['on_track'],
+        'at_risk':            r['at_risk'],
+        'blocked':            r['blocked'],
+        'complete':           r['complete'],
+        'overall_completion': r['overall_pct'],
+        'needs_attention':    len(r['needs_attention']),
+        'due_this_week':      len(r['due_this_week']),
+        'pulse_responses':    r['pulse_responses'] or 0,
+        'avg_mood':           r['avg_mood'],
+        'avg_busyness':       r['avg_busyness'],
+    }
+
+
+def render_csv(reports):
+    """One CSV row per report."""
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=CSV_COLUMNS, lineterminator='\n')
+    writer.writeheader()
+    for r in reports:
+        writer.writerow(csv_row(r))
+    return buf.getvalue()
+
+
+RENDERERS = {
+    'slack':    render_slack,
+    'blocks':   render_blocks,
+    'markdown': render_markdown,
+}
+
+
+# ── Main ───────────────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description='Render weekly strategy reports')
+    which = parser.add_mutually_exclusive_group()
+    which.add_argument('--date', type=date.fromisoformat,
+                       help='Report date, YYYY-MM-DD (default: today)')
+    which.add_argument('--cycle', metavar='CODE',
+                       help='Every weekly report of one cycle, e.g. FC3')
+    which.add_argument('--backfill', action='store_true',
+                       help='Every weekly report of every cycle up to today')
+    parser.add_argument('--format', choices=FORMATS, default='slack',
+                        help='Output format (default: slack)')
+    parser.add_argument('--weekday', type=int, default=FRIDAY, choices=range(7), metavar='0-6',
+                        help='Report weekday for --cycle/--backfill, Monday=0 (default: 4, Friday)')
+    parser.add_argument('--out', metavar='DIR',
+                        help='Write report files to DIR instead of stdout')
+    parser.add_argument('--no-cache', action='store_true',
+                        help=f'Fetch everything from the DB (cache: {CACHE_DIR})')
+    args = parser.parse_args()
+
+    try:
+        conn = get_db_connection()
+    except KeyError as e:
+        print(f"ERROR: missing env var {e}. Set DB_HOST, DB_NAME, DB_USER, DB_PASS.")
+        sys.exit(1)
+
+    today = date.today()
+    cur = conn.cursor()
+    cycles = load_cycles(cur)
+    cur.close()
+
+    if args.backfill:
+        dates = [d for _, start, end, _ in cycles for d in weekly_dates(start, end, args.weekday, today)]
+    elif args.cycle:
+        match = [c for c in cycles if c[0] == args.cycle]
+        if not match:
+            print(f"ERROR: unknown cycle {args.cycle!r}. Known: {', '.join(c[0] for c in cycles)}")
+            sys.exit(1)
+        _, start, end, _ = match[0]
+        dates = weekly_dates(start, end, args.weekday, today)
+    else:
+        dates = [args.date or today]
+
+    def cycle_of(d):
+        return next((code for code, start, end, _ in cycles if start <= d <= end), None)
+
+    reports = load_reports(conn, dates, cycle_of, use_cache=not args.no_cache, today=today)
+    conn.close()
+
+    if not reports:
+        if args.date or not (args.cycle or args.backfill):
+            print('No focus cycle covers that date.')
+        else:
+            print('No report dates to render.')
+        sys.exit(1)
+
+    if args.format == 'csv':
+        outputs = [('report.csv', render_csv(reports))]
+    else:
+        render = RENDERERS[args.format]
+        ext = EXTENSIONS[args.format]
+        outputs = [(f"{r['code']}-{r['report_date']}.{ext}", render(r)) for r in reports]
+
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        for name, text in outputs:
+            with open(os.path.join(args.out, name), 'w') as f:
+                f.write(text)
+        print(f"Wrote {len(outputs)} file(s) for {len(reports)} report(s) to {args.out}")
+    else:
+        print('\n\n'.join(text.rstrip('\n') for _, text in outputs))
+
+
+if __name__ == '__main__':
+    main()
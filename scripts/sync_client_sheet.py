@@ -10,8 +10,40 @@ Safe to re-run — all operations are upserts (existing records are updated,
 not duplicated).
 
 Usage:
-    python3 scripts/sync_client_sheet.py            # dry-run (no DB changes)
-    python3 scripts/sync_client_sheet.py --apply    # write to DB
+    python3 scripts/sync_client_sheet.py                  # dry-run (no DB changes)
+    python3 scripts/sync_client_sheet.py --apply          # write to DB
+    python3 scripts/sync_client_sheet.py --apply --bulk   # COPY + set-based merge
+    python3 scripts/sync_client_sheet.py --apply --errors sync-errors.jsonl
+    python3 scripts/sync_client_sheet.py --apply --watch --listen 8765
+
+The sheet is read in pages of --chunk-rows rows (see sheet_reader.py) and
+each page is COPYed into a temp staging table as it arrives, so memory stays
+flat and DB work starts before the whole sheet is downloaded.
+
+--bulk merges the staged rows with one INSERT ... ON CONFLICT per table (same rules as upsert_client /
+upsert_client_code), reporting inserted/updated/unchanged counts. Unchanged
+rows are not rewritten, so it is cheap enough to run every few minutes.
+
+Change detection: each client code's sheet row(s) are fingerprinted (SHA-256
+over the COL fields) and compared with client_sheet_sync_state, so only new
+or modified codes are written; codes that were synced before but are no
+longer in the sheet are reported. An unchanged sheet costs one read query
+and no writes outside the temp staging table. Pass --full to write every row regardless.
+Requires sql/migrate-client-sync-state.sql.
+
+Each upsert runs under its own savepoint, so a failing row is skipped and
+reported without discarding the rows written before it; its fingerprint is
+not updated, so the next run retries it. If a --bulk merge fails it falls
+back to per-row upserts. --errors FILE writes failed rows as JSON lines
+({"row", "code", "tla", "call", "error"}); the script exits 1 if any row
+failed.
+
+--watch runs as a daemon: it keeps one set of Google services and one DB
+connection open (reconnecting if the connection drops), checks the sheet's
+Drive version every --interval seconds, and only re-reads SHEET_RANGE when
+the version has changed. --listen PORT additionally serves 127.0.0.1:PORT;
+any request to it (e.g. a Make.com HTTP module, or a Drive push channel
+proxied to it) triggers an immediate check. Stop with SIGINT or SIGTERM.
 
 Notes:
 - TLA is derived from the client code by stripping trailing digits (ELR001 → ELR)
@@ -19,28 +51,33 @@ Notes:
   delete scripts/token.json and re-run to trigger browser auth
 """
 
+import io
 import os
 import re
+import csv
 import sys
+import json
+import time
+import signal
+import hashlib
 import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 import psycopg2
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
+import psycopg2.errors
+import psycopg2.extras
+
+from common import get_credentials, get_db_connection, get_service, refresh_if_expiring
+from drive_tree import execute_with_backoff
+from sheet_reader import DEFAULT_CHUNK_ROWS, iter_row_chunks
 
 # ── Constants ──────────────────────────────────────────────────────────────────
 
-SCOPES = [
-    'https://www.googleapis.com/auth/drive.readonly',
-    'https://www.googleapis.com/auth/spreadsheets.readonly',
-]
 SHEET_ID    = '1hSSJCG-QR6R6XIyB-CrxryDhA3_XqBt-SqhG9Oqy96E'
 SHEET_RANGE = 'A:L'
 
-TOKEN_FILE   = os.path.join(os.path.dirname(__file__), 'token.json')
-SECRETS_FILE = os.path.join(os.path.dirname(__file__), 'client_secrets.json')
+DEFAULT_POLL_SECONDS = 30
 
 # Column indices (0-based) matching sheet header order:
 # BsB Client Code | Client Name | Primary contact | Primary Contact Email |
@@ -63,66 +100,6 @@ COL = {
 }
 
 
-# ── Env loader ────────────────────────────────────────────────────────────────
-
-def _load_env():
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    for name in ('.env', 'scripts.env'):
-        env_path = os.path.join(script_dir, name)
-        if os.path.exists(env_path):
-            with open(env_path) as f:
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith('#') or '=' not in line:
-                        continue
-                    key, _, value = line.partition('=')
-                    os.environ.setdefault(key.strip(), value.strip())
-            break
-
-_load_env()
-
-
-# ── Auth ───────────────────────────────────────────────────────────────────────
-
-def get_sheets_service():
-    creds = None
-    if os.path.exists(TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            try:
-                creds.refresh(Request())
-            except Exception:
-                creds = None
-
-        if not creds or not creds.valid:
-            if not os.path.exists(SECRETS_FILE):
-                print(f"ERROR: {SECRETS_FILE} not found.")
-                print("See audit_drive_folders.py docstring for setup instructions.")
-                sys.exit(1)
-            flow = InstalledAppFlow.from_client_secrets_file(SECRETS_FILE, SCOPES)
-            creds = flow.run_local_server(port=0)
-
-        with open(TOKEN_FILE, 'w') as f:
-            f.write(creds.to_json())
-
-    return build('sheets', 'v4', credentials=creds)
-
-
-# ── DB ─────────────────────────────────────────────────────────────────────────
-
-def get_db_connection():
-    return psycopg2.connect(
-        host=os.environ['DB_HOST'],
-        dbname=os.environ.get('DB_NAME', 'bitesize_bio'),
-        user=os.environ['DB_USER'],
-        password=os.environ['DB_PASS'],
-        port=int(os.environ.get('DB_PORT', 5432)),
-        connect_timeout=15,
-    )
-
-
 # ── Helpers ────────────────────────────────────────────────────────────────────
 
 def extract_tla(client_code):
@@ -138,45 +115,18 @@ def cell(row, key):
     return val if val else None
 
 
-# ── Main ───────────────────────────────────────────────────────────────────────
-
-def main():
-    parser = argparse.ArgumentParser(description='Sync client directory sheet to DB')
-    parser.add_argument('--apply', action='store_true',
-                        help='Write to DB (default: dry-run)')
-    args = parser.parse_args()
-
-    print(f"Mode: {'APPLY' if args.apply else 'DRY-RUN'}\n")
-
-    service = get_sheets_service()
+def parse_rows(numbered_rows, first_by_tla=None):
+    """Turn (row_num, row) pairs into records ready to upsert, skipping rows
+    without a client code or a derivable TLA. Row numbers are 1-based sheet
+    rows. Pass the same first_by_tla dict for every chunk of one read.
 
-    try:
-        conn = get_db_connection()
-    except KeyError as e:
-        print(f"ERROR: missing env var {e}. Set DB_HOST, DB_NAME, DB_USER, DB_PASS.")
-        sys.exit(1)
-
-    cur = conn.cursor()
-
-    # Read sheet
-    result = service.spreadsheets().values().get(
-        spreadsheetId=SHEET_ID,
-        range=SHEET_RANGE,
-    ).execute()
-
-    rows = result.get('values', [])
-    if not rows:
-        print("No data found in sheet.")
-        return
-
-    data_rows = rows[1:]  # skip header row
-    print(f"Read {len(data_rows)} rows from sheet\n")
-
-    clients_seen = set()
-    codes_ok = 0
-    errors = []
-
-    for i, row in enumerate(data_rows, start=2):
+    Client name fields always come from the first row for each TLA (the row
+    upsert_client is called with), so any subset of records writes the same
+    client values as the full sheet."""
+    records = []
+    if first_by_tla is None:
+        first_by_tla = {}
+    for i, row in numbered_rows:
         code_val = cell(row, 'bsb_client_code')
         if not code_val:
             continue
@@ -186,65 +136,610 @@ def main():
             print(f"  [SKIP] Row {i}: can't extract TLA from '{code_val}'")
             continue
 
-        client_name      = cell(row, 'client_name') or code_val
-        formatted_name   = cell(row, 'formatted_client_name')
+        first = first_by_tla.setdefault(tla, {
+            'client_name':           cell(row, 'client_name') or code_val,
+            'formatted_client_name': cell(row, 'formatted_client_name'),
+        })
+        records.append({
+            'row_num':               i,
+            'bsb_client_code':       code_val,
+            'tla':                   tla,
+            'client_name':           first['client_name'],
+            'formatted_client_name': first['formatted_client_name'],
+            'primary_contact':       cell(row, 'primary_contact'),
+            'primary_contact_email': cell(row, 'primary_contact_email'),
+            'payment_terms':         cell(row, 'payment_terms'),
+            'po_required':           cell(row, 'po_required'),
+            'billing_contact':       cell(row, 'billing_contact'),
+            'billing_email':         cell(row, 'billing_email'),
+            'billing_address':       cell(row, 'billing_address'),
+            'fingerprint':           row_fingerprint(row),
+        })
+    return records
+
+
+# ── Per-row sync ───────────────────────────────────────────────────────────────
+
+def _pg_message(e):
+    """Primary Postgres error message, without the CONTEXT traceback."""
+    return getattr(e.diag, 'message_primary', None) or str(e).strip()
+
+
+def _savepoint_call(cur, sql, params):
+    """Run one statement inside its own savepoint. On failure only that
+    statement is undone; earlier work in the transaction is kept."""
+    cur.execute("SAVEPOINT sync_row")
+    try:
+        cur.execute(sql, params)
+    except psycopg2.Error:
+        cur.execute("ROLLBACK TO SAVEPOINT sync_row")
+        raise
+    finally:
+        cur.execute("RELEASE SAVEPOINT sync_row")
+
+
+def sync_per_row(cur, records, apply):
+    """Call upsert_client once per TLA and upsert_client_code once per row.
+    Each call runs under a savepoint, so a failing row is skipped without
+    discarding the rows written before it.
+    Returns (clients_seen, codes_ok, errors) where errors is a list of
+    {'row', 'code', 'tla', 'call', 'error'} dicts."""
+    clients_seen = set()
+    codes_ok = 0
+    errors = []
+
+    def fail(rec, call, e):
+        errors.append({
+            'row':   rec['row_num'],
+            'code':  rec['bsb_client_code'],
+            'tla':   rec['tla'],
+            'call':  call,
+            'error': _pg_message(e),
+        })
+        print(f"    ERROR: {_pg_message(e)}")
+
+    for rec in records:
+        code_val, tla = rec['bsb_client_code'], rec['tla']
 
         # Upsert client once per TLA
         if tla not in clients_seen:
             clients_seen.add(tla)
-            print(f"  [CLIENT] {tla} — {client_name}")
-            if args.apply:
+            print(f"  [CLIENT] {tla} — {rec['client_name']}")
+            if apply:
                 try:
-                    cur.execute(
+                    _savepoint_call(
+                        cur,
                         "SELECT upsert_client(%s, %s, %s)",
-                        (tla, client_name, formatted_name)
+                        (tla, rec['client_name'], rec['formatted_client_name'])
                     )
-                except Exception as e:
-                    errors.append(f"Row {i} upsert_client({tla}): {e}")
-                    conn.rollback()
-                    print(f"    ERROR: {e}")
+                except psycopg2.Error as e:
+                    fail(rec, 'upsert_client', e)
                     continue
 
         # Upsert client code
-        contact = cell(row, 'primary_contact')
+        contact = rec['primary_contact']
         print(f"    [CODE] {code_val}{' — ' + contact if contact else ''}")
-        if args.apply:
+        if apply:
             try:
-                cur.execute(
+                _savepoint_call(
+                    cur,
                     "SELECT upsert_client_code(%s, %s, %s, %s, %s, %s, %s, %s, %s)",
                     (
                         code_val,
                         tla,
                         contact,
-                        cell(row, 'primary_contact_email'),
-                        cell(row, 'payment_terms'),
-                        cell(row, 'po_required'),
-                        cell(row, 'billing_contact'),
-                        cell(row, 'billing_email'),
-                        cell(row, 'billing_address'),
+                        rec['primary_contact_email'],
+                        rec['payment_terms'],
+                        rec['po_required'],
+                        rec['billing_contact'],
+                        rec['billing_email'],
+                        rec['billing_address'],
                     )
                 )
                 codes_ok += 1
-            except Exception as e:
-                errors.append(f"Row {i} upsert_client_code({code_val}): {e}")
+            except psycopg2.Error as e:
+                fail(rec, 'upsert_client_code', e)
+
+    return clients_seen, codes_ok, errors
+
+
+# ── Staging and bulk sync ──────────────────────────────────────────────────────
+#
+# The sheet is read in row chunks (sheet_reader.py) and each chunk is COPYed
+# into a temp table as soon as it arrives. Unchanged codes are then deleted
+# from the stage, and what is left is either merged into clients and
+# bsb_client_codes with one INSERT ... ON CONFLICT each (--bulk) or replayed
+# through the per-row upserts. The merge normalisation and conflict rules
+# match upsert_client / upsert_client_code. Rows whose values already match
+# are filtered by the ON CONFLICT ... WHERE clause, so they are neither
+# rewritten nor returned.
+
+STAGE_COLUMNS = [
+    'row_num', 'bsb_client_code', 'tla', 'client_name', 'formatted_client_name',
+    'primary_contact', 'primary_contact_email', 'payment_terms', 'po_required',
+    'billing_contact', 'billing_email', 'billing_address',
+]
+
+STAGE_SQL = """
+    CREATE TEMP TABLE client_sheet_stage (
+        row_num                 INTEGER,
+        bsb_client_code         TEXT,
+        tla                     TEXT,
+        client_name             TEXT,
+        formatted_client_name   TEXT,
+        primary_contact         TEXT,
+        primary_contact_email   TEXT,
+        payment_terms           TEXT,
+        po_required             TEXT,
+        billing_contact         TEXT,
+        billing_email           TEXT,
+        billing_address         TEXT
+    ) ON COMMIT DROP
+"""
+
+# First sheet row per TLA wins, as in the per-row path
+MERGE_CLIENTS_SQL = """
+    WITH src AS (
+        SELECT DISTINCT ON (UPPER(TRIM(tla)))
+            UPPER(TRIM(tla))                        AS tla,
+            TRIM(client_name)                       AS client_name,
+            NULLIF(TRIM(formatted_client_name), '') AS formatted_client_name
+        FROM client_sheet_stage
+        ORDER BY UPPER(TRIM(tla)), row_num
+    )
+    INSERT INTO clients (tla, client_name, formatted_client_name)
+    SELECT tla, client_name, formatted_client_name FROM src
+    ON CONFLICT (tla) DO UPDATE SET
+        client_name           = EXCLUDED.client_name,
+        formatted_client_name = COALESCE(EXCLUDED.formatted_client_name, clients.formatted_client_name)
+    WHERE (clients.client_name, clients.formatted_client_name) IS DISTINCT FROM
+          (EXCLUDED.client_name, COALESCE(EXCLUDED.formatted_client_name, clients.formatted_client_name))
+    RETURNING (xmax = 0) AS inserted
+"""
+
+# Duplicate codes collapse to the last non-empty value per field, which is
+# what repeated upsert_client_code calls (COALESCE per column) would leave
+MERGE_CODES_SQL = """
+    WITH staged AS (
+        SELECT
+            UPPER(TRIM(s.bsb_client_code))            AS bsb_client_code,
+            s.row_num,
+            c.id                                      AS client_id,
+            NULLIF(TRIM(s.primary_contact), '')       AS primary_contact,
+            NULLIF(TRIM(s.primary_contact_email), '') AS primary_contact_email,
+            NULLIF(TRIM(s.payment_terms), '')         AS payment_terms,
+            NULLIF(TRIM(s.po_required), '')           AS po_required,
+            NULLIF(TRIM(s.billing_contact), '')       AS client_billing_contact,
+            NULLIF(TRIM(s.billing_email), '')         AS client_billing_email,
+            NULLIF(TRIM(s.billing_address), '')       AS client_billing_address
+        FROM client_sheet_stage s
+        LEFT JOIN clients c ON c.tla = UPPER(TRIM(s.tla))
+    ),
+    src AS (
+        SELECT
+            bsb_client_code,
+            (ARRAY_AGG(client_id              ORDER BY row_num DESC) FILTER (WHERE client_id IS NOT NULL))[1]              AS client_id,
+            (ARRAY_AGG(primary_contact        ORDER BY row_num DESC) FILTER (WHERE primary_contact IS NOT NULL))[1]        AS primary_contact,
+            (ARRAY_AGG(primary_contact_email  ORDER BY row_num DESC) FILTER (WHERE primary_contact_email IS NOT NULL))[1]  AS primary_contact_email,
+            (ARRAY_AGG(payment_terms          ORDER BY row_num DESC) FILTER (WHERE payment_terms IS NOT NULL))[1]          AS payment_terms,
+            (ARRAY_AGG(po_required            ORDER BY row_num DESC) FILTER (WHERE po_required IS NOT NULL))[1]            AS po_required,
+            (ARRAY_AGG(client_billing_contact ORDER BY row_num DESC) FILTER (WHERE client_billing_contact IS NOT NULL))[1] AS client_billing_contact,
+            (ARRAY_AGG(client_billing_email   ORDER BY row_num DESC) FILTER (WHERE client_billing_email IS NOT NULL))[1]   AS client_billing_email,
+            (ARRAY_AGG(client_billing_address ORDER BY row_num DESC) FILTER (WHERE client_billing_address IS NOT NULL))[1] AS client_billing_address
+        FROM staged
+        GROUP BY bsb_client_code
+    )
+    INSERT INTO bsb_client_codes (
+        bsb_client_code, client_id, primary_contact, primary_contact_email,
+        payment_terms, po_required, client_billing_contact, client_billing_email,
+        client_billing_address
+    )
+    SELECT bsb_client_code, client_id, primary_contact, primary_contact_email,
+           payment_terms, po_required, client_billing_contact, client_billing_email,
+           client_billing_address
+    FROM src
+    ON CONFLICT (bsb_client_code) DO UPDATE SET
+        client_id              = COALESCE(EXCLUDED.client_id, bsb_client_codes.client_id),
+        primary_contact        = COALESCE(EXCLUDED.primary_contact, bsb_client_codes.primary_contact),
+        primary_contact_email  = COALESCE(EXCLUDED.primary_contact_email, bsb_client_codes.primary_contact_email),
+        payment_terms          = COALESCE(EXCLUDED.payment_terms, bsb_client_codes.payment_terms),
+        po_required            = COALESCE(EXCLUDED.po_required, bsb_client_codes.po_required),
+        client_billing_contact = COALESCE(EXCLUDED.client_billing_contact, bsb_client_codes.client_billing_contact),
+        client_billing_email   = COALESCE(EXCLUDED.client_billing_email, bsb_client_codes.client_billing_email),
+        client_billing_address = COALESCE(EXCLUDED.client_billing_address, bsb_client_codes.client_billing_address)
+    WHERE (bsb_client_codes.client_id, bsb_client_codes.primary_contact,
+           bsb_client_codes.primary_contact_email, bsb_client_codes.payment_terms,
+           bsb_client_codes.po_required, bsb_client_codes.client_billing_contact,
+           bsb_client_codes.client_billing_email, bsb_client_codes.client_billing_address)
+      IS DISTINCT FROM
+          (COALESCE(EXCLUDED.client_id, bsb_client_codes.client_id),
+           COALESCE(EXCLUDED.primary_contact, bsb_client_codes.primary_contact),
+           COALESCE(EXCLUDED.primary_contact_email, bsb_client_codes.primary_contact_email),
+           COALESCE(EXCLUDED.payment_terms, bsb_client_codes.payment_terms),
+           COALESCE(EXCLUDED.po_required, bsb_client_codes.po_required),
+           COALESCE(EXCLUDED.client_billing_contact, bsb_client_codes.client_billing_contact),
+           COALESCE(EXCLUDED.client_billing_email, bsb_client_codes.client_billing_email),
+           COALESCE(EXCLUDED.client_billing_address, bsb_client_codes.client_billing_address))
+    RETURNING (xmax = 0) AS inserted
+"""
+
+
+def _merge_counts(cur, total):
+    """Split RETURNING (xmax = 0) rows into inserted/updated/unchanged counts."""
+    flags = [row[0] for row in cur.fetchall()]
+    inserted = sum(1 for f in flags if f)
+    updated = len(flags) - inserted
+    return {'inserted': inserted, 'updated': updated, 'unchanged': total - len(flags)}
+
+
+def stage_records(cur, records):
+    """Append records to client_sheet_stage with one COPY."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for rec in records:
+        writer.writerow([rec[col] for col in STAGE_COLUMNS])
+    buf.seek(0)
+    cur.copy_expert(
+        f"COPY client_sheet_stage ({', '.join(STAGE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        buf
+    )
+
+
+def stage_sheet(cur, row_chunks):
+    """Create client_sheet_stage and COPY each chunk of (row_num, row) pairs
+    into it as it arrives, fingerprinting codes along the way.
+    Returns (code_hashes, rows_read)."""
+    cur.execute(STAGE_SQL)
+    hashers = {}
+    first_by_tla = {}
+    rows_read = 0
+    for chunk in row_chunks:
+        rows_read += len(chunk)
+        records = parse_rows(chunk, first_by_tla)
+        add_fingerprints(hashers, records)
+        if records:
+            stage_records(cur, records)
+    return {code: h.hexdigest() for code, h in hashers.items()}, rows_read
+
+
+def keep_staged_codes(cur, codes):
+    """Drop staged rows whose code is not in codes (already upper-cased)."""
+    cur.execute(
+        "DELETE FROM client_sheet_stage WHERE NOT (UPPER(TRIM(bsb_client_code)) = ANY(%s))",
+        (sorted(codes),)
+    )
+
+
+def staged_records(cur):
+    """Staged rows as record dicts in sheet order, for the per-row path."""
+    cur.execute(f"SELECT {', '.join(STAGE_COLUMNS)} FROM client_sheet_stage ORDER BY row_num")
+    return [dict(zip(STAGE_COLUMNS, row)) for row in cur.fetchall()]
+
+
+def merge_stage(cur):
+    """Merge client_sheet_stage in two set-based statements.
+    Returns {'clients': counts, 'codes': counts}. Caller commits."""
+    cur.execute("""
+        SELECT COUNT(DISTINCT UPPER(TRIM(tla))), COUNT(DISTINCT UPPER(TRIM(bsb_client_code)))
+        FROM client_sheet_stage
+    """)
+    n_clients, n_codes = cur.fetchone()
+
+    cur.execute(MERGE_CLIENTS_SQL)
+    clients = _merge_counts(cur, n_clients)
+
+    cur.execute(MERGE_CODES_SQL)
+    codes = _merge_counts(cur, n_codes)
+
+    return {'clients': clients, 'codes': codes}
+
+
+# ── Change detection ───────────────────────────────────────────────────────────
+#
+# Each client code is fingerprinted with a SHA-256 over the normalised COL
+# fields of its sheet row(s). Fingerprints of written codes are stored in
+# client_sheet_sync_state, so a steady-state run reads the state once and
+# writes nothing outside the temp staging table.
+
+def row_fingerprint(row):
+    """Stable digest input for one sheet row: every COL field, stripped."""
+    return '\x1f'.join(cell(row, key) or '' for key in COL)
+
+
+def add_fingerprints(hashers, records):
+    """Feed records into per-code running SHA-256s ({CODE: hash object}),
+    so a code's rows hash the same however they are chunked."""
+    for rec in records:
+        code = rec['bsb_client_code'].upper()
+        h = hashers.get(code)
+        if h is None:
+            h = hashers[code] = hashlib.sha256()
+        else:
+            h.update(b'\x1e')
+        h.update(rec['fingerprint'].encode('utf-8'))
+
+
+def load_sync_state(cur):
+    try:
+        cur.execute("SELECT bsb_client_code, row_hash FROM client_sheet_sync_state")
+    except psycopg2.errors.UndefinedTable:
+        print("ERROR: client_sheet_sync_state table not found.")
+        print("Run sql/migrate-client-sync-state.sql, or pass --full to skip change detection.")
+        sys.exit(1)
+    return dict(cur.fetchall())
+
+
+def save_sync_state(cur, hashes):
+    """Upsert fingerprints for the codes just written (one statement)."""
+    if not hashes:
+        return
+    psycopg2.extras.execute_values(
+        cur,
+        """
+        INSERT INTO client_sheet_sync_state (bsb_client_code, row_hash)
+        VALUES %s
+        ON CONFLICT (bsb_client_code) DO UPDATE SET
+            row_hash  = EXCLUDED.row_hash,
+            synced_at = NOW()
+        """,
+        list(hashes.items()),
+        page_size=len(hashes),
+    )
+
+
+def select_changed(hashes, stored):
+    """Split codes into new/changed/unchanged against stored fingerprints.
+    Returns (codes_to_write, summary) where summary also lists codes that
+    are stored but no longer in the sheet."""
+    new = {c for c in hashes if c not in stored}
+    changed = {c for c in hashes if c in stored and stored[c] != hashes[c]}
+    summary = {
+        'new': sorted(new),
+        'changed': sorted(changed),
+        'unchanged': len(hashes) - len(new) - len(changed),
+        'missing': sorted(set(stored) - set(hashes)),
+    }
+    return new | changed, summary
+
+
+# ── Watch mode ─────────────────────────────────────────────────────────────────
+#
+# One process keeps the authorized services and the DB connection open and
+# polls the spreadsheet's Drive `version` (a cheap metadata call that bumps on
+# every edit). SHEET_RANGE is only re-read when the version moves. With
+# --listen PORT, any HTTP request to the local endpoint triggers an immediate
+# check — point a Drive files.watch channel (via a proxy) or a Make.com HTTP
+# module at it to sync within seconds of an edit.
+
+def log(msg):
+    print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {msg}", flush=True)
+
+
+def read_sheet_chunks(service, args):
+    return iter_row_chunks(service, SHEET_ID, columns=SHEET_RANGE,
+                           chunk_rows=args.chunk_rows)
+
+
+def get_sheet_version(drive):
+    resp = execute_with_backoff(drive.files().get(
+        fileId=SHEET_ID,
+        fields='version',
+        supportsAllDrives=True,
+    ))
+    return resp['version']
+
+
+def start_ping_listener(port, wake):
+    """Serve a local HTTP endpoint on a daemon thread; every request sets `wake`."""
+    class PingHandler(BaseHTTPRequestHandler):
+        def _ping(self):
+            wake.set()
+            self.send_response(202)
+            self.end_headers()
+
+        do_GET = do_POST = _ping
+
+        def log_message(self, fmt, *args):
+            log(f"ping from {self.client_address[0]}: {self.requestline}")
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), PingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def watch(service, drive, creds, args):
+    """Poll the sheet version and sync on change until SIGINT/SIGTERM."""
+    wake = threading.Event()
+    stopping = []
+
+    def stop(signum, frame):
+        stopping.append(signum)
+        wake.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    if args.listen:
+        start_ping_listener(args.listen, wake)
+        log(f"Listening for pings on 127.0.0.1:{args.listen}")
+
+    log(f"Watching sheet {SHEET_ID} every {args.interval}s")
+    conn = None
+    last_version = None
+
+    while not stopping:
+        try:
+            if conn is None or conn.closed:
+                conn = get_db_connection()
+            if refresh_if_expiring(creds):
+                log("Refreshed Google access token")
+            version = get_sheet_version(drive)
+            if version != last_version:
+                log(f"Sheet version {version}")
+                with conn.cursor() as cur:
+                    sync_sheet_rows(conn, cur, read_sheet_chunks(service, args), args.apply,
+                                    bulk=args.bulk, full=args.full, errors_path=args.errors)
+                # Rows that failed keep their old fingerprint and are retried
+                # on the next edit (or restart), not on every poll.
+                last_version = version
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            # Dropped connection: reconnect on the next cycle and re-read
+            log(f"DB connection lost: {str(e).strip()}")
+            if conn is not None:
+                conn.close()
+            conn = None
+        except Exception as e:
+            log(f"ERROR: {e}")
+            if conn is not None and not conn.closed:
                 conn.rollback()
-                print(f"    ERROR: {e}")
 
-    if args.apply:
+        wake.wait(args.interval)
+        wake.clear()
+
+    log("Stopping")
+    if conn is not None:
+        conn.close()
+
+
+# ── Main ───────────────────────────────────────────────────────────────────────
+
+def write_error_report(path, errors):
+    """One JSON object per line: row, code, tla, call, error."""
+    with open(path, 'w') as f:
+        for err in errors:
+            f.write(json.dumps(err) + '\n')
+
+
+def sync_sheet_rows(conn, cur, row_chunks, apply, bulk=False, full=False, errors_path=None):
+    """Stage, change-detect and write one read of the sheet. row_chunks is an
+    iterable of [(row_num, row), ...] lists, e.g. sheet_reader.iter_row_chunks.
+    Ends the transaction: commits on apply, rolls back otherwise.
+    Returns the list of row errors (empty on a clean run)."""
+    stored = None if full else load_sync_state(cur)
+    hashes, rows_read = stage_sheet(cur, row_chunks)
+
+    if not rows_read:
+        conn.rollback()
+        print("No data found in sheet.")
+        return []
+    print(f"Read {rows_read} rows from sheet\n")
+
+    if full:
+        written = set(hashes)
+    else:
+        written, summary = select_changed(hashes, stored)
+        print(f"Change detection: {len(summary['new'])} new, {len(summary['changed'])} changed, "
+              f"{summary['unchanged']} unchanged code(s)")
+        if summary['missing']:
+            print(f"  {len(summary['missing'])} code(s) synced before but missing from the sheet: "
+                  f"{', '.join(summary['missing'])}")
+        print()
+        if not written:
+            conn.rollback()
+            print("Nothing to write.")
+            if errors_path:
+                write_error_report(errors_path, [])
+            return []
+        keep_staged_codes(cur, written)
+
+    if bulk:
+        if not apply:
+            cur.execute("SELECT COUNT(*), COUNT(DISTINCT tla) FROM client_sheet_stage")
+            n_rows, n_tlas = cur.fetchone()
+            conn.rollback()
+            print(f"Would merge {n_rows} row(s) ({n_tlas} unique client TLA(s))")
+            return []
+        cur.execute("SAVEPOINT sync_bulk")
+        try:
+            counts = merge_stage(cur)
+        except psycopg2.Error as e:
+            # One bad row fails the whole merge; retry row by row so only
+            # that row is lost.
+            cur.execute("ROLLBACK TO SAVEPOINT sync_bulk")
+            print(f"Bulk merge failed, falling back to per-row upserts: {_pg_message(e)}\n")
+        else:
+            save_sync_state(cur, {code: hashes[code] for code in written})
+            conn.commit()
+            print("Merged:")
+            for table, c in counts.items():
+                print(f"  {table:<8} {c['inserted']} inserted, {c['updated']} updated, "
+                      f"{c['unchanged']} unchanged")
+            if errors_path:
+                write_error_report(errors_path, [])
+            return []
+
+    to_write = staged_records(cur)
+    clients_seen, codes_ok, errors = sync_per_row(cur, to_write, apply)
+
+    if apply:
+        # Failed codes keep their old fingerprint, so the next run retries
+        # just those rows.
+        failed = {err['code'].upper() for err in errors}
+        save_sync_state(cur, {code: hashes[code] for code in written - failed})
         conn.commit()
+    else:
+        conn.rollback()
 
-    print(f"\n{'Written' if args.apply else 'Would write'}:")
+    print(f"\n{'Written' if apply else 'Would write'}:")
     print(f"  {len(clients_seen)} unique client TLA(s)")
-    print(f"  {codes_ok if args.apply else len(data_rows)} client code row(s)")
+    print(f"  {codes_ok if apply else len(to_write)} client code row(s)")
 
     if errors:
         print(f"\n{len(errors)} error(s):")
         for err in errors:
-            print(f"  {err}")
+            print(f"  Row {err['row']} {err['call']}({err['code']}): {err['error']}")
+    if errors_path:
+        write_error_report(errors_path, errors)
+        print(f"\nError report written to {errors_path}")
+
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sync client directory sheet to DB')
+    parser.add_argument('--apply', action='store_true',
+                        help='Write to DB (default: dry-run)')
+    parser.add_argument('--bulk', action='store_true',
+                        help='Stage all rows with COPY and merge in one statement per table')
+    parser.add_argument('--full', action='store_true',
+                        help='Write every row, ignoring stored change-detection fingerprints')
+    parser.add_argument('--errors', metavar='FILE',
+                        help='Write failed rows to FILE as JSON lines')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f'Sheet rows fetched per request (default: {DEFAULT_CHUNK_ROWS})')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and sync whenever the sheet changes')
+    parser.add_argument('--interval', type=int, default=DEFAULT_POLL_SECONDS,
+                        help=f'--watch: seconds between version checks (default: {DEFAULT_POLL_SECONDS})')
+    parser.add_argument('--listen', type=int, metavar='PORT',
+                        help='--watch: trigger an immediate check on any HTTP request to 127.0.0.1:PORT')
+    args = parser.parse_args()
+
+    print(f"Mode: {'APPLY' if args.apply else 'DRY-RUN'}{' (bulk)' if args.bulk else ''}\n")
+
+    if not all(k in os.environ for k in ('DB_HOST', 'DB_USER', 'DB_PASS')):
+        print("ERROR: missing env vars. Set DB_HOST, DB_NAME, DB_USER, DB_PASS.")
+        sys.exit(1)
+
+    creds = get_credentials()
+    service = get_service('sheets', 'v4', creds)
+
+    if args.watch:
+        watch(service, get_service('drive', 'v3', creds), creds, args)
+        return
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+
+    errors = sync_sheet_rows(conn, cur, read_sheet_chunks(service, args), args.apply,
+                             bulk=args.bulk, full=args.full, errors_path=args.errors)
 
     cur.close()
     conn.close()
 
+    if errors:
+        sys.exit(1)
+
 
 if __name__ == '__main__':
     main()
@@ -1,12 +1,12 @@
 -- BsB Strategy Planning System
 -- Database Functions
--- Last updated: 2026-02-27
+-- Last updated: 2026-10-17
 --
 -- Note on dollar-quoting: Sevalla SQL studio requires each function to be
 -- pasted and run alone. New functions use single-quoted bodies to avoid
--- dollar-quoting issues entirely. Existing functions (upsert_project,
--- upsert_milestone) use $$ and are already deployed; re-deploy with $fn$
--- if Sevalla re-deployment is ever needed.
+-- dollar-quoting issues entirely. upsert_project still uses $$ and is
+-- already deployed; re-deploy with $fn$ if Sevalla re-deployment is ever
+-- needed. upsert_milestone was re-deployed with $fn$.
 
 -- ============================================
 -- upsert_project
@@ -95,6 +95,9 @@ $$ LANGUAGE plpgsql;
 -- Called by Make.com via PostgreSQL Execute Function module
 -- Maps Asana milestone data into the milestones table
 -- 7th param (p_strategic_bet_tags) is optional for backwards compatibility
+-- Idempotent calls write nothing: the row is only updated when a column
+-- actually changed, and tags are diffed against what is stored (only
+-- added/removed tags are inserted/deleted).
 -- ============================================
 
 CREATE OR REPLACE FUNCTION upsert_milestone(
@@ -105,12 +108,12 @@ CREATE OR REPLACE FUNCTION upsert_milestone(
     p_completed BOOLEAN,
     p_focus_cycle TEXT,
     p_strategic_bet_tags TEXT DEFAULT NULL
-) RETURNS VOID AS $$
+) RETURNS VOID AS $fn$
 DECLARE
     v_project_id INTEGER;
     v_milestone_id INTEGER;
     v_status TEXT;
-    v_tag TEXT;
+    v_tag_ids INTEGER[];
 BEGIN
     SELECT id INTO v_project_id FROM projects WHERE asana_project_id = p_project_asana_id;
 
@@ -131,25 +134,225 @@ BEGIN
     ON CONFLICT (asana_milestone_id) DO UPDATE SET
         name = EXCLUDED.name,
         target_date = EXCLUDED.target_date,
-        status = v_status,
-        focus_cycle_id = (SELECT id FROM focus_cycles WHERE code = REPLACE(p_focus_cycle, '2026 ', '')),
+        status = EXCLUDED.status,
+        focus_cycle_id = EXCLUDED.focus_cycle_id,
         updated_at = NOW()
+    WHERE (milestones.name, milestones.target_date, milestones.status, milestones.focus_cycle_id)
+          IS DISTINCT FROM
+          (EXCLUDED.name, EXCLUDED.target_date, EXCLUDED.status, EXCLUDED.focus_cycle_id)
     RETURNING id INTO v_milestone_id;
 
+    -- Nothing changed, so RETURNING gave no row
+    IF v_milestone_id IS NULL THEN
+        SELECT id INTO v_milestone_id FROM milestones WHERE asana_milestone_id = p_asana_id;
+    END IF;
+
     IF p_strategic_bet_tags IS NOT NULL AND p_strategic_bet_tags != '' THEN
-        DELETE FROM milestone_bet_tags WHERE milestone_id = v_milestone_id;
-
-        FOREACH v_tag IN ARRAY string_to_array(p_strategic_bet_tags, ',')
-        LOOP
-            INSERT INTO milestone_bet_tags (milestone_id, strategic_bet_tag_id)
-            SELECT v_milestone_id, sbt.id
-            FROM strategic_bet_tags sbt
-            WHERE sbt.name = TRIM(v_tag)
-            ON CONFLICT (milestone_id, strategic_bet_tag_id) DO NOTHING;
-        END LOOP;
+        SELECT COALESCE(array_agg(sbt.id), '{}') INTO v_tag_ids
+        FROM strategic_bet_tags sbt
+        WHERE sbt.name IN (SELECT TRIM(t) FROM unnest(string_to_array(p_strategic_bet_tags, ',')) AS t);
+
+        DELETE FROM milestone_bet_tags
+        WHERE milestone_id = v_milestone_id
+          AND strategic_bet_tag_id != ALL(v_tag_ids);
+
+        -- NOT EXISTS keeps existing tags from consuming sequence values
+        INSERT INTO milestone_bet_tags (milestone_id, strategic_bet_tag_id)
+        SELECT v_milestone_id, tag_id
+        FROM unnest(v_tag_ids) AS tag_id
+        WHERE NOT EXISTS (
+            SELECT 1 FROM milestone_bet_tags mbt
+            WHERE mbt.milestone_id = v_milestone_id
+              AND mbt.strategic_bet_tag_id = tag_id
+        )
+        ON CONFLICT (milestone_id, strategic_bet_tag_id) DO NOTHING;
     END IF;
 END;
-$$ LANGUAGE plpgsql;
+$fn$ LANGUAGE plpgsql;
+
+
+-- ============================================
+-- upsert_projects_batch
+-- Set-based variant of upsert_project for full Asana resyncs
+-- (scripts/replay_asana_export.py) and batched Make.com calls.
+-- Takes a JSON array of objects keyed like upsert_project's params without
+-- the p_ prefix: asana_id, name, bet_code, team_name, owner_asana_id,
+-- owner_name, status, start_cycle, end_cycle, project_type.
+-- Same mapping and overwrite rules as upsert_project; if an asana_id
+-- appears more than once the last element wins, as with sequential calls.
+-- Returns the number of projects upserted.
+-- ============================================
+
+CREATE OR REPLACE FUNCTION upsert_projects_batch(p_projects JSONB)
+RETURNS INTEGER AS $fn$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    -- Owners: one upsert per distinct Asana user, last occurrence wins
+    INSERT INTO users (asana_user_id, first_name, last_name)
+    SELECT DISTINCT ON (r.owner_asana_id)
+        r.owner_asana_id,
+        split_part(r.owner_name, ' ', 1),
+        split_part(r.owner_name, ' ', 2)
+    FROM jsonb_array_elements(p_projects) WITH ORDINALITY AS e(obj, ord),
+         jsonb_to_record(e.obj) AS r(owner_asana_id TEXT, owner_name TEXT)
+    WHERE r.owner_asana_id IS NOT NULL AND r.owner_asana_id != ''
+    ORDER BY r.owner_asana_id, e.ord DESC
+    ON CONFLICT (asana_user_id) DO UPDATE SET
+        first_name = EXCLUDED.first_name,
+        last_name = EXCLUDED.last_name,
+        updated_at = NOW();
+
+    WITH src AS (
+        SELECT DISTINCT ON (r.asana_id) r.*
+        FROM jsonb_array_elements(p_projects) WITH ORDINALITY AS e(obj, ord),
+             jsonb_to_record(e.obj) AS r(
+                 asana_id TEXT, name TEXT, bet_code TEXT, team_name TEXT,
+                 owner_asana_id TEXT, owner_name TEXT, status TEXT,
+                 start_cycle TEXT, end_cycle TEXT, project_type TEXT
+             )
+        WHERE r.asana_id IS NOT NULL
+        ORDER BY r.asana_id, e.ord DESC
+    )
+    INSERT INTO projects (
+        asana_project_id, code, name, strategic_bet_id, owning_department_id,
+        project_lead, project_lead_id, status, start_cycle_id, end_cycle_id, project_type
+    )
+    SELECT
+        s.asana_id,
+        'P-' || s.asana_id,
+        s.name,
+        sb.id,
+        d.id,
+        s.owner_name,
+        u.id,
+        CASE s.status
+            WHEN 'on_track' THEN 'on_track'
+            WHEN 'at_risk' THEN 'at_risk'
+            WHEN 'off_track' THEN 'blocked'
+            WHEN 'on_hold' THEN 'on_hold'
+            WHEN 'complete' THEN 'complete'
+            ELSE 'not_started'
+        END,
+        sc.id,
+        ec.id,
+        s.project_type
+    FROM src s
+    LEFT JOIN strategic_bets sb ON sb.code = s.bet_code
+    LEFT JOIN departments d     ON d.name = s.team_name
+    LEFT JOIN users u           ON u.asana_user_id = s.owner_asana_id
+    LEFT JOIN focus_cycles sc   ON sc.code = REPLACE(s.start_cycle, '2026 ', '')
+    LEFT JOIN focus_cycles ec   ON ec.code = REPLACE(s.end_cycle, '2026 ', '')
+    ON CONFLICT (asana_project_id) DO UPDATE SET
+        name = EXCLUDED.name,
+        strategic_bet_id = EXCLUDED.strategic_bet_id,
+        owning_department_id = EXCLUDED.owning_department_id,
+        project_lead = EXCLUDED.project_lead,
+        project_lead_id = EXCLUDED.project_lead_id,
+        status = EXCLUDED.status,
+        start_cycle_id = EXCLUDED.start_cycle_id,
+        end_cycle_id = EXCLUDED.end_cycle_id,
+        project_type = EXCLUDED.project_type,
+        updated_at = NOW();
+
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END;
+$fn$ LANGUAGE plpgsql;
+
+
+-- ============================================
+-- upsert_milestones_batch
+-- Set-based variant of upsert_milestone.
+-- Takes a JSON array of objects keyed like upsert_milestone's params without
+-- the p_ prefix: asana_id, project_asana_id, name, target_date (YYYY-MM-DD),
+-- completed (boolean), focus_cycle, strategic_bet_tags (comma-separated,
+-- optional). Projects must already exist — run upsert_projects_batch first.
+-- Tags are only touched for elements that supply strategic_bet_tags; for
+-- those, one diff pass inserts missing tags and deletes dropped ones.
+-- As in upsert_milestone, rows whose columns already match are not updated.
+-- Returns the number of milestones inserted or changed.
+-- ============================================
+
+CREATE OR REPLACE FUNCTION upsert_milestones_batch(p_milestones JSONB)
+RETURNS INTEGER AS $fn$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    WITH src AS (
+        SELECT DISTINCT ON (r.asana_id) r.*
+        FROM jsonb_array_elements(p_milestones) WITH ORDINALITY AS e(obj, ord),
+             jsonb_to_record(e.obj) AS r(
+                 asana_id TEXT, project_asana_id TEXT, name TEXT,
+                 target_date DATE, completed BOOLEAN, focus_cycle TEXT
+             )
+        WHERE r.asana_id IS NOT NULL
+        ORDER BY r.asana_id, e.ord DESC
+    )
+    INSERT INTO milestones (
+        asana_milestone_id, code, project_id, name, target_date, status, focus_cycle_id
+    )
+    SELECT
+        s.asana_id,
+        'M-' || s.asana_id,
+        p.id,
+        s.name,
+        s.target_date,
+        CASE WHEN s.completed THEN 'complete' ELSE 'upcoming' END,
+        fc.id
+    FROM src s
+    LEFT JOIN projects p      ON p.asana_project_id = s.project_asana_id
+    LEFT JOIN focus_cycles fc ON fc.code = REPLACE(s.focus_cycle, '2026 ', '')
+    ON CONFLICT (asana_milestone_id) DO UPDATE SET
+        name = EXCLUDED.name,
+        target_date = EXCLUDED.target_date,
+        status = EXCLUDED.status,
+        focus_cycle_id = EXCLUDED.focus_cycle_id,
+        updated_at = NOW()
+    WHERE (milestones.name, milestones.target_date, milestones.status, milestones.focus_cycle_id)
+          IS DISTINCT FROM
+          (EXCLUDED.name, EXCLUDED.target_date, EXCLUDED.status, EXCLUDED.focus_cycle_id);
+
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+
+    WITH tagged AS (
+        SELECT DISTINCT ON (r.asana_id) m.id AS milestone_id, r.strategic_bet_tags
+        FROM jsonb_array_elements(p_milestones) WITH ORDINALITY AS e(obj, ord),
+             jsonb_to_record(e.obj) AS r(asana_id TEXT, strategic_bet_tags TEXT)
+        JOIN milestones m ON m.asana_milestone_id = r.asana_id
+        ORDER BY r.asana_id, e.ord DESC
+    ),
+    wanted AS (
+        SELECT DISTINCT t.milestone_id, sbt.id AS tag_id
+        FROM tagged t
+        CROSS JOIN LATERAL unnest(string_to_array(t.strategic_bet_tags, ',')) AS tag(name)
+        JOIN strategic_bet_tags sbt ON sbt.name = TRIM(tag.name)
+        WHERE t.strategic_bet_tags != ''
+    ),
+    dropped AS (
+        DELETE FROM milestone_bet_tags mbt
+        USING tagged t
+        WHERE mbt.milestone_id = t.milestone_id
+          AND t.strategic_bet_tags != ''
+          AND NOT EXISTS (
+              SELECT 1 FROM wanted w
+              WHERE w.milestone_id = mbt.milestone_id
+                AND w.tag_id = mbt.strategic_bet_tag_id
+          )
+    )
+    INSERT INTO milestone_bet_tags (milestone_id, strategic_bet_tag_id)
+    SELECT w.milestone_id, w.tag_id
+    FROM wanted w
+    WHERE NOT EXISTS (
+        SELECT 1 FROM milestone_bet_tags mbt
+        WHERE mbt.milestone_id = w.milestone_id
+          AND mbt.strategic_bet_tag_id = w.tag_id
+    )
+    ON CONFLICT (milestone_id, strategic_bet_tag_id) DO NOTHING;
+
+    RETURN v_count;
+END;
+$fn$ LANGUAGE plpgsql;
 
 
 -- ============================================
@@ -463,6 +666,156 @@ END;
 ';
 
 
+-- ============================================
+-- resolve_io_folder_plan
+-- Called by Make.com once per product, replacing get_client_folder_info +
+-- get_product_folder_info. Returns the client/contact names used for folder
+-- names, all four cached tier folder IDs, and missing_tiers: the tiers
+-- ('tier1'..'tier4') that need creating in Drive, in creation order.
+-- Tier 3 prefers the exact year's row and falls back to any year for the
+-- same product type (it is shared across years). Tier 4 is exact year only.
+-- No row = unknown client code.
+-- ============================================
+
+CREATE OR REPLACE FUNCTION resolve_io_folder_plan(
+    p_client_code   TEXT,
+    p_product_type  TEXT,
+    p_year          INTEGER
+)
+RETURNS TABLE (
+    tla                     TEXT,
+    client_name             TEXT,
+    primary_contact         TEXT,
+    primary_contact_email   TEXT,
+    tier1_folder_id         TEXT,
+    tier2_folder_id         TEXT,
+    tier3_folder_id         TEXT,
+    tier4_folder_id         TEXT,
+    missing_tiers           TEXT[]
+) AS $fn$
+BEGIN
+    RETURN QUERY
+    SELECT
+        f.tla,
+        f.client_name,
+        f.primary_contact,
+        f.primary_contact_email,
+        f.tier1,
+        f.tier2,
+        f.tier3,
+        f.tier4,
+        ARRAY_REMOVE(ARRAY[
+            CASE WHEN f.tier1 IS NULL THEN 'tier1' END,
+            CASE WHEN f.tier2 IS NULL THEN 'tier2' END,
+            CASE WHEN f.tier3 IS NULL THEN 'tier3' END,
+            CASE WHEN f.tier4 IS NULL THEN 'tier4' END
+        ], NULL)
+    FROM (
+        SELECT
+            c.tla::TEXT                         AS tla,
+            c.client_name::TEXT                 AS client_name,
+            cc.primary_contact::TEXT            AS primary_contact,
+            cc.primary_contact_email::TEXT      AS primary_contact_email,
+            NULLIF(c.drive_folder_id, '')       AS tier1,
+            NULLIF(cc.drive_folder_id, '')      AS tier2,
+            (SELECT cpf.product_type_folder_id
+             FROM client_product_folders cpf
+             WHERE cpf.client_code_id = cc.id
+               AND cpf.product_type = TRIM(p_product_type)
+               AND NULLIF(cpf.product_type_folder_id, '') IS NOT NULL
+             ORDER BY cpf.year = p_year DESC, cpf.year DESC
+             LIMIT 1)                           AS tier3,
+            (SELECT NULLIF(cpf.year_folder_id, '')
+             FROM client_product_folders cpf
+             WHERE cpf.client_code_id = cc.id
+               AND cpf.product_type = TRIM(p_product_type)
+               AND cpf.year = p_year)           AS tier4
+        FROM bsb_client_codes cc
+        JOIN clients c ON cc.client_id = c.id
+        WHERE cc.bsb_client_code = TRIM(p_client_code)
+    ) f;
+END;
+$fn$ LANGUAGE plpgsql STABLE;
+
+
+-- ============================================
+-- record_created_folders
+-- Called by Make.com once per product after the IO folder is created,
+-- replacing update_client_folder_ids + upsert_product_folder +
+-- upsert_io_product. Pass the resolved ID for every tier (cached or just
+-- created); only IDs that differ from the cache are written, so products
+-- whose folders all existed touch nothing but io_products.
+-- Runs as one function call, so the folder cache and the io_products row
+-- are committed together or not at all.
+-- Returns the io_products row id.
+-- ============================================
+
+CREATE OR REPLACE FUNCTION record_created_folders(
+    p_client_code       TEXT,
+    p_product_type      TEXT,
+    p_year              INTEGER,
+    p_tier1_folder_id   TEXT,
+    p_tier2_folder_id   TEXT,
+    p_tier3_folder_id   TEXT,
+    p_tier4_folder_id   TEXT,
+    p_io_reference      TEXT,
+    p_product_name      TEXT DEFAULT NULL,
+    p_unique_id         TEXT DEFAULT NULL,
+    p_io_folder_id      TEXT DEFAULT NULL
+) RETURNS INTEGER AS $fn$
+DECLARE
+    v_client_id         INTEGER;
+    v_client_code_id    INTEGER;
+    v_tier1             TEXT := NULLIF(TRIM(p_tier1_folder_id), '');
+    v_tier2             TEXT := NULLIF(TRIM(p_tier2_folder_id), '');
+    v_tier3             TEXT := NULLIF(TRIM(p_tier3_folder_id), '');
+    v_tier4             TEXT := NULLIF(TRIM(p_tier4_folder_id), '');
+BEGIN
+    SELECT cc.client_id, cc.id INTO v_client_id, v_client_code_id
+    FROM bsb_client_codes cc
+    WHERE cc.bsb_client_code = TRIM(p_client_code);
+
+    IF v_client_code_id IS NOT NULL THEN
+        IF v_tier1 IS NOT NULL THEN
+            UPDATE clients
+            SET drive_folder_id = v_tier1
+            WHERE id = v_client_id
+              AND drive_folder_id IS DISTINCT FROM v_tier1;
+        END IF;
+
+        IF v_tier2 IS NOT NULL THEN
+            UPDATE bsb_client_codes
+            SET drive_folder_id = v_tier2
+            WHERE id = v_client_code_id
+              AND drive_folder_id IS DISTINCT FROM v_tier2;
+        END IF;
+
+        IF v_tier4 IS NOT NULL THEN
+            INSERT INTO client_product_folders (
+                client_code_id, product_type, product_type_folder_id, year, year_folder_id
+            ) VALUES (
+                v_client_code_id, TRIM(p_product_type), v_tier3, p_year, v_tier4
+            )
+            ON CONFLICT (client_code_id, product_type, year) DO UPDATE SET
+                product_type_folder_id = COALESCE(
+                    EXCLUDED.product_type_folder_id,
+                    client_product_folders.product_type_folder_id
+                ),
+                year_folder_id = EXCLUDED.year_folder_id
+            WHERE client_product_folders.year_folder_id IS DISTINCT FROM EXCLUDED.year_folder_id
+               OR client_product_folders.product_type_folder_id IS DISTINCT FROM
+                  COALESCE(EXCLUDED.product_type_folder_id, client_product_folders.product_type_folder_id);
+        END IF;
+    END IF;
+
+    RETURN upsert_io_product(
+        p_io_reference, p_product_type, p_product_name, p_unique_id,
+        NULLIF(TRIM(p_io_folder_id), '')
+    );
+END;
+$fn$ LANGUAGE plpgsql;
+
+
 -- ============================================
 -- upsert_client
 -- Called by Make.com when New Client = Yes on IO form submission.
@@ -606,6 +959,23 @@ END;
 $fn$ LANGUAGE plpgsql;
 
 
+-- ============================================
+-- refresh_cycle_rollups
+-- Rebuilds mv_cycle_rollup and mv_checkin_daily (sql/schema.sql) without
+-- blocking readers. Run after Asana syncs (e.g. from the Make.com sync
+-- scenario) or on a schedule; generate_weekly_slack_report also calls it
+-- when the rollup is older than an hour.
+-- ============================================
+
+CREATE OR REPLACE FUNCTION refresh_cycle_rollups()
+RETURNS VOID AS $fn$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_cycle_rollup;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_checkin_daily;
+END;
+$fn$ LANGUAGE plpgsql;
+
+
 -- ============================================
 -- generate_weekly_slack_report
 -- Returns a fully-formatted Slack mrkdwn message for the weekly strategy report.
@@ -613,25 +983,23 @@ $fn$ LANGUAGE plpgsql;
 -- Intended to be called by a Make.com scheduled scenario every Friday afternoon.
 -- Team pulse uses a 5-day average (CURRENT_DATE - 4 days) so a Friday run
 -- captures Mon–Fri data for the full working week.
+-- Cycle health, initiative and project sections read the active cycle's row
+-- of mv_cycle_rollup, and the pulse reads mv_checkin_daily, so the cost does
+-- not grow with history. Only "Due This Week" queries milestones directly
+-- (an index range scan on target_date). Stale rollups (> 1 hour) are
+-- refreshed first.
 -- ============================================
 
 CREATE OR REPLACE FUNCTION generate_weekly_slack_report()
 RETURNS TEXT AS $fn$
 DECLARE
     v_cycle_id            INTEGER;
-    v_cycle_code          TEXT;
-    v_cycle_name          TEXT;
-    v_start_date          DATE;
-    v_end_date            DATE;
+    v_rollup              mv_cycle_rollup%ROWTYPE;
     v_days_elapsed        INTEGER;
     v_total_days          INTEGER;
     v_days_remaining      INTEGER;
     v_pct_elapsed         INTEGER;
     v_progress_bar        TEXT;
-    v_on_track            INTEGER;
-    v_at_risk             INTEGER;
-    v_blocked             INTEGER;
-    v_complete            INTEGER;
     v_needs_attention     TEXT;
     v_due_this_week       TEXT;
     v_initiative_progress TEXT;
@@ -643,44 +1011,34 @@ DECLARE
 BEGIN
 
     -- Active cycle
-    SELECT id, code, name, start_date, end_date
-    INTO v_cycle_id, v_cycle_code, v_cycle_name, v_start_date, v_end_date
-    FROM focus_cycles WHERE status = 'active' LIMIT 1;
+    SELECT id INTO v_cycle_id FROM focus_cycles WHERE status = 'active' LIMIT 1;
 
     IF v_cycle_id IS NULL THEN
         RETURN 'No active focus cycle found.';
     END IF;
 
-    v_days_elapsed   := CURRENT_DATE - v_start_date;
-    v_total_days     := v_end_date - v_start_date;
-    v_days_remaining := v_end_date - CURRENT_DATE;
+    SELECT * INTO v_rollup FROM mv_cycle_rollup WHERE cycle_id = v_cycle_id;
+
+    IF v_rollup.cycle_id IS NULL OR v_rollup.refreshed_at < NOW() - INTERVAL '1 hour' THEN
+        PERFORM refresh_cycle_rollups();
+        SELECT * INTO v_rollup FROM mv_cycle_rollup WHERE cycle_id = v_cycle_id;
+    END IF;
+
+    v_days_elapsed   := CURRENT_DATE - v_rollup.start_date;
+    v_total_days     := v_rollup.end_date - v_rollup.start_date;
+    v_days_remaining := v_rollup.end_date - CURRENT_DATE;
     v_pct_elapsed    := ROUND(100.0 * v_days_elapsed / v_total_days);
     v_progress_bar   := repeat('█', LEAST(10, (v_pct_elapsed / 10)::int)) ||
                         repeat('░', GREATEST(0, 10 - (v_pct_elapsed / 10)::int));
 
-    -- Cycle health counts (projects active this cycle)
-    SELECT
-        COUNT(CASE WHEN p.status = 'on_track' THEN 1 END),
-        COUNT(CASE WHEN p.status = 'at_risk'  THEN 1 END),
-        COUNT(CASE WHEN p.status = 'blocked'  THEN 1 END),
-        COUNT(CASE WHEN p.status = 'complete' THEN 1 END)
-    INTO v_on_track, v_at_risk, v_blocked, v_complete
-    FROM projects p
-    WHERE p.start_cycle_id <= v_cycle_id
-      AND (p.end_cycle_id >= v_cycle_id OR p.end_cycle_id IS NULL)
-      AND p.status NOT IN ('cancelled', 'on_hold');
-
     -- Needs attention
     SELECT COALESCE(string_agg(
-        '• ' || p.name || '  [' || p.status || ']' ||
-        CASE WHEN p.project_lead IS NOT NULL THEN '  — ' || p.project_lead ELSE '' END,
-        chr(10) ORDER BY p.status, p.name
+        '• ' || (e.item->>'name') || '  [' || (e.item->>'status') || ']' ||
+        CASE WHEN e.item->>'project_lead' IS NOT NULL THEN '  — ' || (e.item->>'project_lead') ELSE '' END,
+        chr(10) ORDER BY e.ord
     ), '_None_ 🎉')
     INTO v_needs_attention
-    FROM projects p
-    WHERE p.status IN ('at_risk', 'blocked')
-      AND p.start_cycle_id <= v_cycle_id
-      AND (p.end_cycle_id >= v_cycle_id OR p.end_cycle_id IS NULL);
+    FROM jsonb_array_elements(COALESCE(v_rollup.needs_attention, '[]')) WITH ORDINALITY AS e(item, ord);
 
     -- Milestones due in the next 7 days
     SELECT COALESCE(string_agg(
@@ -695,71 +1053,52 @@ BEGIN
 
     -- Milestone progress by initiative (milestones ending this cycle)
     SELECT COALESCE(string_agg(
-        '*' || t.code || '*  ✅ ' || t.complete_count || '  ⬜ ' || t.incomplete_count,
-        chr(10) ORDER BY t.code
+        '*' || (e.item->>'code') || '*  ✅ ' || (e.item->>'complete') || '  ⬜ ' || (e.item->>'incomplete'),
+        chr(10) ORDER BY e.ord
     ), '_No milestone data this cycle_')
     INTO v_initiative_progress
-    FROM (
-        SELECT
-            sb.code,
-            COUNT(CASE WHEN m.status = 'complete' THEN 1 END)                       AS complete_count,
-            COUNT(CASE WHEN m.status NOT IN ('complete', 'cancelled') THEN 1 END)   AS incomplete_count
-        FROM milestones m
-        JOIN projects p ON m.project_id = p.id
-        JOIN strategic_bets sb ON p.strategic_bet_id = sb.id
-        WHERE m.focus_cycle_id = v_cycle_id
-        GROUP BY sb.code
-        HAVING COUNT(CASE WHEN m.status != 'cancelled' THEN 1 END) > 0
-    ) t;
+    FROM jsonb_array_elements(COALESCE(v_rollup.initiatives, '[]')) WITH ORDINALITY AS e(item, ord);
 
     -- Project progress (projects active this cycle)
     SELECT COALESCE(string_agg(
-        repeat('█', LEAST(10, (COALESCE(p.percent_complete, 0) / 10)::int)) ||
-        repeat('░', GREATEST(0, 10 - (COALESCE(p.percent_complete, 0) / 10)::int)) ||
-        ' ' || COALESCE(p.percent_complete, 0) || '%  ' || p.name || '  ' ||
-        CASE
-            WHEN p.status = 'complete' THEN '✅'
-            WHEN p.status = 'on_track' THEN '🟢'
-            WHEN p.status = 'at_risk'  THEN '🟡'
-            WHEN p.status = 'blocked'  THEN '🔴'
+        repeat('█', LEAST(10, ((e.item->>'percent_complete')::NUMERIC / 10)::int)) ||
+        repeat('░', GREATEST(0, 10 - ((e.item->>'percent_complete')::NUMERIC / 10)::int)) ||
+        ' ' || (e.item->>'percent_complete') || '%  ' || (e.item->>'name') || '  ' ||
+        CASE e.item->>'status'
+            WHEN 'complete' THEN '✅'
+            WHEN 'on_track' THEN '🟢'
+            WHEN 'at_risk'  THEN '🟡'
+            WHEN 'blocked'  THEN '🔴'
             ELSE '⚪'
         END,
-        chr(10) ORDER BY p.percent_complete DESC NULLS LAST
+        chr(10) ORDER BY e.ord
     ), '_No projects this cycle_')
     INTO v_project_progress
-    FROM projects p
-    WHERE p.start_cycle_id <= v_cycle_id
-      AND (p.end_cycle_id >= v_cycle_id OR p.end_cycle_id IS NULL)
-      AND p.status NOT IN ('cancelled', 'on_hold');
+    FROM jsonb_array_elements(COALESCE(v_rollup.projects, '[]')) WITH ORDINALITY AS e(item, ord);
 
     -- Overall completion %
-    SELECT ROUND(AVG(COALESCE(p.percent_complete, 0)))
-    INTO v_overall_pct
-    FROM projects p
-    WHERE p.start_cycle_id <= v_cycle_id
-      AND (p.end_cycle_id >= v_cycle_id OR p.end_cycle_id IS NULL)
-      AND p.status NOT IN ('cancelled', 'on_hold');
+    v_overall_pct := ROUND(v_rollup.avg_completion);
 
     -- Team pulse: 5-day average (Mon–Fri when run on Friday)
     SELECT
-        ROUND(AVG(mood_rating), 1),
-        ROUND(AVG(busyness_rating), 1)
+        ROUND(SUM(mood_sum)::NUMERIC / NULLIF(SUM(response_count), 0), 1),
+        ROUND(SUM(busyness_sum)::NUMERIC / NULLIF(SUM(response_count), 0), 1)
     INTO v_avg_mood, v_avg_busyness
-    FROM checkin_responses
+    FROM mv_checkin_daily
     WHERE response_date >= CURRENT_DATE - INTERVAL '4 days';
 
     -- Assemble message
     v_result :=
-        '📊 *BsB Strategy — ' || v_cycle_code || ' Weekly Report*' || chr(10) ||
+        '📊 *BsB Strategy — ' || v_rollup.code || ' Weekly Report*' || chr(10) ||
         '_' || TO_CHAR(CURRENT_DATE, 'DD Mon YYYY') || '_' || chr(10) ||
         chr(10) ||
         '*⏱ Cycle Progress*' || chr(10) ||
-        v_cycle_name || ' · ' || v_days_remaining || ' days remaining' || chr(10) ||
+        v_rollup.name || ' · ' || v_days_remaining || ' days remaining' || chr(10) ||
         v_progress_bar || ' ' || v_pct_elapsed || '% elapsed' || chr(10) ||
         chr(10) ||
         '*🚦 Cycle Health*' || chr(10) ||
-        v_on_track || ' on track  ·  ' || v_at_risk || ' at risk  ·  ' ||
-        v_blocked || ' blocked  ·  ' || v_complete || ' complete' || chr(10) ||
+        v_rollup.on_track || ' on track  ·  ' || v_rollup.at_risk || ' at risk  ·  ' ||
+        v_rollup.blocked || ' blocked  ·  ' || v_rollup.complete || ' complete' || chr(10) ||
         chr(10) ||
         '*⚠️ Needs Attention*' || chr(10) ||
         v_needs_attention || chr(10) ||
@@ -783,4 +1122,258 @@ BEGIN
 
 END;
 $fn$ LANGUAGE plpgsql;
-clauc
\ No newline at end of file
+
+
+-- ============================================
+-- bump_project_status_count
+-- Adds (p_sign = 1) or removes (p_sign = -1) one project from its
+-- project_status_counts row. Used by trg_projects_summary_counts.
+-- ============================================
+
+CREATE OR REPLACE FUNCTION bump_project_status_count(
+    p_bet_id INTEGER,
+    p_dept_id INTEGER,
+    p_status TEXT,
+    p_percent NUMERIC,
+    p_sign INTEGER
+) RETURNS VOID AS $fn$
+BEGIN
+    IF p_status IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO project_status_counts AS c (
+        strategic_bet_id, owning_department_id, status, project_count, percent_sum, percent_count
+    )
+    VALUES (
+        COALESCE(p_bet_id, 0),
+        COALESCE(p_dept_id, 0),
+        p_status,
+        p_sign,
+        p_sign * COALESCE(p_percent, 0),
+        CASE WHEN p_percent IS NULL THEN 0 ELSE p_sign END
+    )
+    ON CONFLICT (strategic_bet_id, owning_department_id, status) DO UPDATE SET
+        project_count = c.project_count + EXCLUDED.project_count,
+        percent_sum   = c.percent_sum + EXCLUDED.percent_sum,
+        percent_count = c.percent_count + EXCLUDED.percent_count;
+END;
+$fn$ LANGUAGE plpgsql;
+
+
+-- ============================================
+-- trg_projects_summary_counts
+-- Keeps project_status_counts in step with projects, so upsert_project,
+-- upsert_projects_batch and manual edits all update the counters.
+-- Updates that leave bet, department, status and percent_complete alone
+-- (e.g. a renamed project) write nothing.
+-- ============================================
+
+CREATE OR REPLACE FUNCTION trg_projects_summary_counts()
+RETURNS TRIGGER AS $fn$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND (NEW.strategic_bet_id, NEW.owning_department_id, NEW.status, NEW.percent_complete)
+           IS NOT DISTINCT FROM
+           (OLD.strategic_bet_id, OLD.owning_department_id, OLD.status, OLD.percent_complete) THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_project_status_count(OLD.strategic_bet_id, OLD.owning_department_id,
+                                          OLD.status, OLD.percent_complete, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_project_status_count(NEW.strategic_bet_id, NEW.owning_department_id,
+                                          NEW.status, NEW.percent_complete, 1);
+    END IF;
+    RETURN NULL;
+END;
+$fn$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS projects_summary_counts ON projects;
+CREATE TRIGGER projects_summary_counts
+    AFTER INSERT OR DELETE OR UPDATE OF strategic_bet_id, owning_department_id, status, percent_complete
+    ON projects
+    FOR EACH ROW EXECUTE FUNCTION trg_projects_summary_counts();
+
+
+-- ============================================
+-- trg_strategy_milestones_summary_counts
+-- Keeps strategy_milestone_counts in step with strategy_milestones.
+-- ============================================
+
+CREATE OR REPLACE FUNCTION trg_strategy_milestones_summary_counts()
+RETURNS TRIGGER AS $fn$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND (NEW.strategic_bet_id, NEW.status) IS NOT DISTINCT FROM (OLD.strategic_bet_id, OLD.status) THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE strategy_milestone_counts SET
+            total    = total - 1,
+            complete = complete - CASE WHEN OLD.status = 'complete' THEN 1 ELSE 0 END
+        WHERE strategic_bet_id = COALESCE(OLD.strategic_bet_id, 0);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO strategy_milestone_counts AS c (strategic_bet_id, total, complete)
+        VALUES (COALESCE(NEW.strategic_bet_id, 0), 1, CASE WHEN NEW.status = 'complete' THEN 1 ELSE 0 END)
+        ON CONFLICT (strategic_bet_id) DO UPDATE SET
+            total    = c.total + 1,
+            complete = c.complete + EXCLUDED.complete;
+    END IF;
+    RETURN NULL;
+END;
+$fn$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS strategy_milestones_summary_counts ON strategy_milestones;
+CREATE TRIGGER strategy_milestones_summary_counts
+    AFTER INSERT OR DELETE OR UPDATE OF strategic_bet_id, status
+    ON strategy_milestones
+    FOR EACH ROW EXECUTE FUNCTION trg_strategy_milestones_summary_counts();
+
+
+-- ============================================
+-- check_summary_counts
+-- Recomputes the summary counters from projects / strategy_milestones and
+-- returns every key where the stored counters differ. No rows = consistent.
+--   SELECT * FROM check_summary_counts();
+-- ============================================
+
+CREATE OR REPLACE FUNCTION check_summary_counts()
+RETURNS TABLE (counter TEXT, counter_key TEXT, stored TEXT, expected TEXT) AS $fn$
+    WITH expected_projects AS (
+        SELECT COALESCE(strategic_bet_id, 0) AS strategic_bet_id,
+               COALESCE(owning_department_id, 0) AS owning_department_id,
+               status,
+               COUNT(*)::INTEGER AS project_count,
+               COALESCE(SUM(percent_complete), 0) AS percent_sum,
+               COUNT(percent_complete)::INTEGER AS percent_count
+        FROM projects
+        WHERE status IS NOT NULL
+        GROUP BY 1, 2, 3
+    ),
+    stored_projects AS (
+        SELECT * FROM project_status_counts
+        WHERE project_count != 0 OR percent_sum != 0 OR percent_count != 0
+    ),
+    expected_milestones AS (
+        SELECT COALESCE(strategic_bet_id, 0) AS strategic_bet_id,
+               COUNT(*)::INTEGER AS total,
+               COUNT(*) FILTER (WHERE status = 'complete')::INTEGER AS complete
+        FROM strategy_milestones
+        GROUP BY 1
+    ),
+    stored_milestones AS (
+        SELECT * FROM strategy_milestone_counts WHERE total != 0 OR complete != 0
+    )
+    SELECT 'project_status_counts',
+           format('bet=%s dept=%s status=%s', strategic_bet_id, owning_department_id, status),
+           format('%s projects, sum %s over %s', s.project_count, s.percent_sum, s.percent_count),
+           format('%s projects, sum %s over %s', e.project_count, e.percent_sum, e.percent_count)
+    FROM expected_projects e
+    FULL JOIN stored_projects s USING (strategic_bet_id, owning_department_id, status)
+    WHERE (e.project_count, e.percent_sum, e.percent_count)
+          IS DISTINCT FROM (s.project_count, s.percent_sum, s.percent_count)
+    UNION ALL
+    SELECT 'strategy_milestone_counts',
+           format('bet=%s', strategic_bet_id),
+           format('%s total, %s complete', s.total, s.complete),
+           format('%s total, %s complete', e.total, e.complete)
+    FROM expected_milestones e
+    FULL JOIN stored_milestones s USING (strategic_bet_id)
+    WHERE (e.total, e.complete) IS DISTINCT FROM (s.total, s.complete)
+    ORDER BY 1, 2;
+$fn$ LANGUAGE sql STABLE;
+
+
+-- ============================================
+-- rebuild_summary_counts
+-- Recomputes the summary counters from scratch (initial load, or after
+-- check_summary_counts reports drift). Blocks writes to projects and
+-- strategy_milestones while it runs.
+--   SELECT rebuild_summary_counts();
+-- ============================================
+
+CREATE OR REPLACE FUNCTION rebuild_summary_counts()
+RETURNS VOID AS $fn$
+BEGIN
+    LOCK TABLE projects, strategy_milestones IN SHARE MODE;
+
+    DELETE FROM project_status_counts;
+    INSERT INTO project_status_counts (
+        strategic_bet_id, owning_department_id, status, project_count, percent_sum, percent_count
+    )
+    SELECT COALESCE(strategic_bet_id, 0),
+           COALESCE(owning_department_id, 0),
+           status,
+           COUNT(*),
+           COALESCE(SUM(percent_complete), 0),
+           COUNT(percent_complete)
+    FROM projects
+    WHERE status IS NOT NULL
+    GROUP BY 1, 2, 3;
+
+    DELETE FROM strategy_milestone_counts;
+    INSERT INTO strategy_milestone_counts (strategic_bet_id, total, complete)
+    SELECT COALESCE(strategic_bet_id, 0),
+           COUNT(*),
+           COUNT(*) FILTER (WHERE status = 'complete')
+    FROM strategy_milestones
+    GROUP BY 1;
+END;
+$fn$ LANGUAGE plpgsql;
+
+
+-- ============================================
+-- trg_notify_drive_folders
+-- Invalidation for scripts/folder_cache.py: on any change to the Drive
+-- folder map (clients, bsb_client_codes, client_product_folders) sends
+-- NOTIFY drive_folders with the affected bsb_client_codes.id as payload.
+-- A change to a client notifies every code under it. Notifications are
+-- delivered on commit, and identical payloads within one transaction are
+-- collapsed into one.
+-- ============================================
+
+CREATE OR REPLACE FUNCTION trg_notify_drive_folders()
+RETURNS TRIGGER AS $fn$
+BEGIN
+    IF TG_TABLE_NAME = 'clients' THEN
+        PERFORM pg_notify('drive_folders', cc.id::TEXT)
+        FROM bsb_client_codes cc
+        WHERE cc.client_id = CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END;
+    ELSIF TG_TABLE_NAME = 'bsb_client_codes' THEN
+        PERFORM pg_notify('drive_folders',
+                          (CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END)::TEXT);
+    ELSE
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM pg_notify('drive_folders', OLD.client_code_id::TEXT);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM pg_notify('drive_folders', NEW.client_code_id::TEXT);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$fn$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS clients_notify_drive_folders ON clients;
+CREATE TRIGGER clients_notify_drive_folders
+    AFTER DELETE OR UPDATE OF tla, client_name, drive_folder_id
+    ON clients
+    FOR EACH ROW EXECUTE FUNCTION trg_notify_drive_folders();
+
+DROP TRIGGER IF EXISTS bsb_client_codes_notify_drive_folders ON bsb_client_codes;
+CREATE TRIGGER bsb_client_codes_notify_drive_folders
+    AFTER INSERT OR DELETE OR UPDATE OF bsb_client_code, client_id, primary_contact,
+                                        primary_contact_email, drive_folder_id
+    ON bsb_client_codes
+    FOR EACH ROW EXECUTE FUNCTION trg_notify_drive_folders();
+
+DROP TRIGGER IF EXISTS client_product_folders_notify_drive_folders ON client_product_folders;
+CREATE TRIGGER client_product_folders_notify_drive_folders
+    AFTER INSERT OR DELETE OR UPDATE
+    ON client_product_folders
+    FOR EACH ROW EXECUTE FUNCTION trg_notify_drive_folders();
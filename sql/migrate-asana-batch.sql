@@ -0,0 +1,195 @@
+-- Asana Batch Upsert Migration
+-- Run on Sevalla PostgreSQL (bitesize_bio database)
+-- Adds set-based variants of upsert_project / upsert_milestone that take a
+-- JSON array, used by scripts/replay_asana_export.py for full resyncs.
+--
+-- Sevalla SQL studio runs the entire editor content as one batch.
+-- Paste each function block separately. Canonical copies live in
+-- sql/functions.sql.
+-- Last updated: 2026-10-17
+
+
+-- ============================================
+-- BLOCK 1: upsert_projects_batch
+-- Paste and run alone in Sevalla SQL studio
+-- Set-based variant of upsert_project for full Asana resyncs
+-- (scripts/replay_asana_export.py) and batched Make.com calls.
+-- Takes a JSON array of objects keyed like upsert_project's params without
+-- the p_ prefix: asana_id, name, bet_code, team_name, owner_asana_id,
+-- owner_name, status, start_cycle, end_cycle, project_type.
+-- Same mapping and overwrite rules as upsert_project; if an asana_id
+-- appears more than once the last element wins, as with sequential calls.
+-- Returns the number of projects upserted.
+-- ============================================
+
+CREATE OR REPLACE FUNCTION upsert_projects_batch(p_projects JSONB)
+RETURNS INTEGER AS $fn$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    -- Owners: one upsert per distinct Asana user, last occurrence wins
+    INSERT INTO users (asana_user_id, first_name, last_name)
+    SELECT DISTINCT ON (r.owner_asana_id)
+        r.owner_asana_id,
+        split_part(r.owner_name, ' ', 1),
+        split_part(r.owner_name, ' ', 2)
+    FROM jsonb_array_elements(p_projects) WITH ORDINALITY AS e(obj, ord),
+         jsonb_to_record(e.obj) AS r(owner_asana_id TEXT, owner_name TEXT)
+    WHERE r.owner_asana_id IS NOT NULL AND r.owner_asana_id != ''
+    ORDER BY r.owner_asana_id, e.ord DESC
+    ON CONFLICT (asana_user_id) DO UPDATE SET
+        first_name = EXCLUDED.first_name,
+        last_name = EXCLUDED.last_name,
+        updated_at = NOW();
+
+    WITH src AS (
+        SELECT DISTINCT ON (r.asana_id) r.*
+        FROM jsonb_array_elements(p_projects) WITH ORDINALITY AS e(obj, ord),
+             jsonb_to_record(e.obj) AS r(
+                 asana_id TEXT, name TEXT, bet_code TEXT, team_name TEXT,
+                 owner_asana_id TEXT, owner_name TEXT, status TEXT,
+                 start_cycle TEXT, end_cycle TEXT, project_type TEXT
+             )
+        WHERE r.asana_id IS NOT NULL
+        ORDER BY r.asana_id, e.ord DESC
+    )
+    INSERT INTO projects (
+        asana_project_id, code, name, strategic_bet_id, owning_department_id,
+        project_lead, project_lead_id, status, start_cycle_id, end_cycle_id, project_type
+    )
+    SELECT
+        s.asana_id,
+        'P-' || s.asana_id,
+        s.name,
+        sb.id,
+        d.id,
+        s.owner_name,
+        u.id,
+        CASE s.status
+            WHEN 'on_track' THEN 'on_track'
+            WHEN 'at_risk' THEN 'at_risk'
+            WHEN 'off_track' THEN 'blocked'
+            WHEN 'on_hold' THEN 'on_hold'
+            WHEN 'complete' THEN 'complete'
+            ELSE 'not_started'
+        END,
+        sc.id,
+        ec.id,
+        s.project_type
+    FROM src s
+    LEFT JOIN strategic_bets sb ON sb.code = s.bet_code
+    LEFT JOIN departments d     ON d.name = s.team_name
+    LEFT JOIN users u           ON u.asana_user_id = s.owner_asana_id
+    LEFT JOIN focus_cycles sc   ON sc.code = REPLACE(s.start_cycle, '2026 ', '')
+    LEFT JOIN focus_cycles ec   ON ec.code = REPLACE(s.end_cycle, '2026 ', '')
+    ON CONFLICT (asana_project_id) DO UPDATE SET
+        name = EXCLUDED.name,
+        strategic_bet_id = EXCLUDED.strategic_bet_id,
+        owning_department_id = EXCLUDED.owning_department_id,
+        project_lead = EXCLUDED.project_lead,
+        project_lead_id = EXCLUDED.project_lead_id,
+        status = EXCLUDED.status,
+        start_cycle_id = EXCLUDED.start_cycle_id,
+        end_cycle_id = EXCLUDED.end_cycle_id,
+        project_type = EXCLUDED.project_type,
+        updated_at = NOW();
+
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END;
+$fn$ LANGUAGE plpgsql;
+
+
+-- ============================================
+-- BLOCK 2: upsert_milestones_batch
+-- Paste and run alone in Sevalla SQL studio
+-- Set-based variant of upsert_milestone.
+-- Takes a JSON array of objects keyed like upsert_milestone's params without
+-- the p_ prefix: asana_id, project_asana_id, name, target_date (YYYY-MM-DD),
+-- completed (boolean), focus_cycle, strategic_bet_tags (comma-separated,
+-- optional). Projects must already exist — run upsert_projects_batch first.
+-- Tags are only touched for elements that supply strategic_bet_tags; for
+-- those, one diff pass inserts missing tags and deletes dropped ones.
+-- As in upsert_milestone, rows whose columns already match are not updated.
+-- Returns the number of milestones inserted or changed.
+-- ============================================
+
+CREATE OR REPLACE FUNCTION upsert_milestones_batch(p_milestones JSONB)
+RETURNS INTEGER AS $fn$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    WITH src AS (
+        SELECT DISTINCT ON (r.asana_id) r.*
+        FROM jsonb_array_elements(p_milestones) WITH ORDINALITY AS e(obj, ord),
+             jsonb_to_record(e.obj) AS r(
+                 asana_id TEXT, project_asana_id TEXT, name TEXT,
+                 target_date DATE, completed BOOLEAN, focus_cycle TEXT
+             )
+        WHERE r.asana_id IS NOT NULL
+        ORDER BY r.asana_id, e.ord DESC
+    )
+    INSERT INTO milestones (
+        asana_milestone_id, code, project_id, name, target_date, status, focus_cycle_id
+    )
+    SELECT
+        s.asana_id,
+        'M-' || s.asana_id,
+        p.id,
+        s.name,
+        s.target_date,
+        CASE WHEN s.completed THEN 'complete' ELSE 'upcoming' END,
+        fc.id
+    FROM src s
+    LEFT JOIN projects p      ON p.asana_project_id = s.project_asana_id
+    LEFT JOIN focus_cycles fc ON fc.code = REPLACE(s.focus_cycle, '2026 ', '')
+    ON CONFLICT (asana_milestone_id) DO UPDATE SET
+        name = EXCLUDED.name,
+        target_date = EXCLUDED.target_date,
+        status = EXCLUDED.status,
+        focus_cycle_id = EXCLUDED.focus_cycle_id,
+        updated_at = NOW()
+    WHERE (milestones.name, milestones.target_date, milestones.status, milestones.focus_cycle_id)
+          IS DISTINCT FROM
+          (EXCLUDED.name, EXCLUDED.target_date, EXCLUDED.status, EXCLUDED.focus_cycle_id);
+
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+
+    WITH tagged AS (
+        SELECT DISTINCT ON (r.asana_id) m.id AS milestone_id, r.strategic_bet_tags
+        FROM jsonb_array_elements(p_milestones) WITH ORDINALITY AS e(obj, ord),
+             jsonb_to_record(e.obj) AS r(asana_id TEXT, strategic_bet_tags TEXT)
+        JOIN milestones m ON m.asana_milestone_id = r.asana_id
+        ORDER BY r.asana_id, e.ord DESC
+    ),
+    wanted AS (
+        SELECT DISTINCT t.milestone_id, sbt.id AS tag_id
+        FROM tagged t
+        CROSS JOIN LATERAL unnest(string_to_array(t.strategic_bet_tags, ',')) AS tag(name)
+        JOIN strategic_bet_tags sbt ON sbt.name = TRIM(tag.name)
+        WHERE t.strategic_bet_tags != ''
+    ),
+    dropped AS (
+        DELETE FROM milestone_bet_tags mbt
+        USING tagged t
+        WHERE mbt.milestone_id = t.milestone_id
+          AND t.strategic_bet_tags != ''
+          AND NOT EXISTS (
+              SELECT 1 FROM wanted w
+              WHERE w.milestone_id = mbt.milestone_id
+                AND w.tag_id = mbt.strategic_bet_tag_id
+          )
+    )
+    INSERT INTO milestone_bet_tags (milestone_id, strategic_bet_tag_id)
+    SELECT w.milestone_id, w.tag_id
+    FROM wanted w
+    WHERE NOT EXISTS (
+        SELECT 1 FROM milestone_bet_tags mbt
+        WHERE mbt.milestone_id = w.milestone_id
+          AND mbt.strategic_bet_tag_id = w.tag_id
+    )
+    ON CONFLICT (milestone_id, strategic_bet_tag_id) DO NOTHING;
+
+    RETURN v_count;
+END;
+$fn$ LANGUAGE plpgsql;
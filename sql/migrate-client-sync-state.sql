@@ -0,0 +1,22 @@
+-- Client Sheet Sync State Migration
+-- Run on Sevalla PostgreSQL (bitesize_bio database)
+-- Adds the side table scripts/sync_client_sheet.py uses to skip unchanged
+-- sheet rows: one fingerprint per client code, written alongside the upserts.
+--
+-- Paste and run as one block in Sevalla SQL studio.
+-- Last updated: 2026-10-17
+
+
+-- ============================================
+-- client_sheet_sync_state
+-- row_hash: SHA-256 over the normalised COL fields of every sheet row
+-- for this code (see row_fingerprint in sync_client_sheet.py).
+-- Loose ref to bsb_client_codes — a code stays here if removed from the
+-- sheet so the sync can report it as missing.
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS client_sheet_sync_state (
+    bsb_client_code     VARCHAR(50) PRIMARY KEY,
+    row_hash            TEXT NOT NULL,
+    synced_at           TIMESTAMPTZ DEFAULT NOW()
+);
@@ -0,0 +1,289 @@
+-- Cycle Rollups Migration
+-- Run on Sevalla PostgreSQL (bitesize_bio database)
+-- Adds mv_cycle_rollup / mv_checkin_daily (materialized per-cycle and
+-- per-day rollups), the v_cycle_rollup view for Metabase, and
+-- refresh_cycle_rollups(), and re-deploys generate_weekly_slack_report to
+-- read from the rollups. Report output is unchanged.
+--
+-- Sevalla SQL studio runs the entire editor content as one batch.
+-- Paste each block separately, in order. Canonical copies live in
+-- sql/schema.sql and sql/functions.sql.
+-- Last updated: 2026-10-17
+
+
+-- ============================================
+-- BLOCK 1: materialized rollups
+-- Paste and run alone in Sevalla SQL studio
+-- Read by generate_weekly_slack_report and Metabase so their cost does not
+-- grow with history. Refresh with SELECT refresh_cycle_rollups();
+-- (sql/functions.sql) — the unique indexes allow REFRESH ... CONCURRENTLY.
+-- ============================================
+
+-- One row per focus cycle. "Active in cycle" matches the report:
+-- start_cycle_id <= cycle AND (end_cycle_id >= cycle OR end_cycle_id IS NULL).
+-- List columns are JSONB arrays, pre-sorted in report order.
+CREATE MATERIALIZED VIEW mv_cycle_rollup AS
+SELECT
+    fc.id AS cycle_id,
+    fc.code,
+    fc.name,
+    fc.start_date,
+    fc.end_date,
+    COALESCE(ps.project_count, 0) AS project_count,
+    COALESCE(ps.on_track, 0)      AS on_track,
+    COALESCE(ps.at_risk, 0)       AS at_risk,
+    COALESCE(ps.blocked, 0)       AS blocked,
+    COALESCE(ps.complete, 0)      AS complete,
+    ps.avg_completion,
+    ps.projects,
+    na.needs_attention,
+    ip.initiatives,
+    NOW() AS refreshed_at
+FROM focus_cycles fc
+LEFT JOIN LATERAL (
+    SELECT
+        COUNT(*)                                   AS project_count,
+        COUNT(*) FILTER (WHERE p.status = 'on_track') AS on_track,
+        COUNT(*) FILTER (WHERE p.status = 'at_risk')  AS at_risk,
+        COUNT(*) FILTER (WHERE p.status = 'blocked')  AS blocked,
+        COUNT(*) FILTER (WHERE p.status = 'complete') AS complete,
+        AVG(COALESCE(p.percent_complete, 0))       AS avg_completion,
+        jsonb_agg(jsonb_build_object(
+            'name', p.name,
+            'status', p.status,
+            'percent_complete', COALESCE(p.percent_complete, 0)
+        ) ORDER BY p.percent_complete DESC NULLS LAST) AS projects
+    FROM projects p
+    WHERE p.start_cycle_id <= fc.id
+      AND (p.end_cycle_id >= fc.id OR p.end_cycle_id IS NULL)
+      AND p.status NOT IN ('cancelled', 'on_hold')
+) ps ON true
+LEFT JOIN LATERAL (
+    SELECT jsonb_agg(jsonb_build_object(
+        'name', p.name,
+        'status', p.status,
+        'project_lead', p.project_lead
+    ) ORDER BY p.status, p.name) AS needs_attention
+    FROM projects p
+    WHERE p.status IN ('at_risk', 'blocked')
+      AND p.start_cycle_id <= fc.id
+      AND (p.end_cycle_id >= fc.id OR p.end_cycle_id IS NULL)
+) na ON true
+LEFT JOIN LATERAL (
+    SELECT jsonb_agg(jsonb_build_object(
+        'code', t.code,
+        'complete', t.complete_count,
+        'incomplete', t.incomplete_count
+    ) ORDER BY t.code) AS initiatives
+    FROM (
+        SELECT
+            sb.code,
+            COUNT(*) FILTER (WHERE m.status = 'complete')                     AS complete_count,
+            COUNT(*) FILTER (WHERE m.status NOT IN ('complete', 'cancelled')) AS incomplete_count
+        FROM milestones m
+        JOIN projects p ON m.project_id = p.id
+        JOIN strategic_bets sb ON p.strategic_bet_id = sb.id
+        WHERE m.focus_cycle_id = fc.id
+        GROUP BY sb.code
+        HAVING COUNT(*) FILTER (WHERE m.status != 'cancelled') > 0
+    ) t
+) ip ON true;
+
+CREATE UNIQUE INDEX idx_mv_cycle_rollup_cycle ON mv_cycle_rollup(cycle_id);
+CREATE UNIQUE INDEX idx_mv_cycle_rollup_code ON mv_cycle_rollup(code);
+
+-- Check-in sums per day. Averages over any date range (5-day pulse, whole
+-- cycle) are SUM(mood_sum) / SUM(response_count) over a handful of rows.
+CREATE MATERIALIZED VIEW mv_checkin_daily AS
+SELECT
+    response_date,
+    COUNT(*)             AS response_count,
+    SUM(mood_rating)     AS mood_sum,
+    SUM(busyness_rating) AS busyness_sum
+FROM checkin_responses
+GROUP BY response_date;
+
+CREATE UNIQUE INDEX idx_mv_checkin_daily_date ON mv_checkin_daily(response_date);
+
+-- Per-cycle view for Metabase: rollup plus check-in averages over the cycle
+CREATE VIEW v_cycle_rollup AS
+SELECT
+    r.*,
+    ck.response_count,
+    ROUND(ck.mood_sum::NUMERIC / NULLIF(ck.response_count, 0), 1)     AS avg_mood,
+    ROUND(ck.busyness_sum::NUMERIC / NULLIF(ck.response_count, 0), 1) AS avg_busyness
+FROM mv_cycle_rollup r
+LEFT JOIN LATERAL (
+    SELECT SUM(d.response_count) AS response_count,
+           SUM(d.mood_sum)       AS mood_sum,
+           SUM(d.busyness_sum)   AS busyness_sum
+    FROM mv_checkin_daily d
+    WHERE d.response_date BETWEEN r.start_date AND r.end_date
+) ck ON true;
+
+
+-- ============================================
+-- BLOCK 2: refresh_cycle_rollups
+-- Paste and run alone in Sevalla SQL studio
+-- Rebuilds mv_cycle_rollup and mv_checkin_daily (sql/schema.sql) without
+-- blocking readers. Run after Asana syncs (e.g. from the Make.com sync
+-- scenario) or on a schedule; generate_weekly_slack_report also calls it
+-- when the rollup is older than an hour.
+-- ============================================
+
+CREATE OR REPLACE FUNCTION refresh_cycle_rollups()
+RETURNS VOID AS $fn$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_cycle_rollup;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_checkin_daily;
+END;
+$fn$ LANGUAGE plpgsql;
+
+
+-- ============================================
+-- BLOCK 3: generate_weekly_slack_report
+-- Paste and run alone in Sevalla SQL studio
+-- Returns a fully-formatted Slack mrkdwn message for the weekly strategy report.
+-- Covers the active focus cycle only.
+-- Intended to be called by a Make.com scheduled scenario every Friday afternoon.
+-- Team pulse uses a 5-day average (CURRENT_DATE - 4 days) so a Friday run
+-- captures Mon–Fri data for the full working week.
+-- Cycle health, initiative and project sections read the active cycle's row
+-- of mv_cycle_rollup, and the pulse reads mv_checkin_daily, so the cost does
+-- not grow with history. Only "Due This Week" queries milestones directly
+-- (an index range scan on target_date). Stale rollups (> 1 hour) are
+-- refreshed first.
+-- ============================================
+
+CREATE OR REPLACE FUNCTION generate_weekly_slack_report()
+RETURNS TEXT AS $fn$
+DECLARE
+    v_cycle_id            INTEGER;
+    v_rollup              mv_cycle_rollup%ROWTYPE;
+    v_days_elapsed        INTEGER;
+    v_total_days          INTEGER;
+    v_days_remaining      INTEGER;
+    v_pct_elapsed         INTEGER;
+    v_progress_bar        TEXT;
+    v_needs_attention     TEXT;
+    v_due_this_week       TEXT;
+    v_initiative_progress TEXT;
+    v_project_progress    TEXT;
+    v_overall_pct         INTEGER;
+    v_avg_mood            NUMERIC;
+    v_avg_busyness        NUMERIC;
+    v_result              TEXT;
+BEGIN
+
+    -- Active cycle
+    SELECT id INTO v_cycle_id FROM focus_cycles WHERE status = 'active' LIMIT 1;
+
+    IF v_cycle_id IS NULL THEN
+        RETURN 'No active focus cycle found.';
+    END IF;
+
+    SELECT * INTO v_rollup FROM mv_cycle_rollup WHERE cycle_id = v_cycle_id;
+
+    IF v_rollup.cycle_id IS NULL OR v_rollup.refreshed_at < NOW() - INTERVAL '1 hour' THEN
+        PERFORM refresh_cycle_rollups();
+        SELECT * INTO v_rollup FROM mv_cycle_rollup WHERE cycle_id = v_cycle_id;
+    END IF;
+
+    v_days_elapsed   := CURRENT_DATE - v_rollup.start_date;
+    v_total_days     := v_rollup.end_date - v_rollup.start_date;
+    v_days_remaining := v_rollup.end_date - CURRENT_DATE;
+    v_pct_elapsed    := ROUND(100.0 * v_days_elapsed / v_total_days);
+    v_progress_bar   := repeat('█', LEAST(10, (v_pct_elapsed / 10)::int)) ||
+                        repeat('░', GREATEST(0, 10 - (v_pct_elapsed / 10)::int));
+
+    -- Needs attention
+    SELECT COALESCE(string_agg(
+        '• ' || (e.item->>'name') || '  [' || (e.item->>'status') || ']' ||
+        CASE WHEN e.item->>'project_lead' IS NOT NULL THEN '  — ' || (e.item->>'project_lead') ELSE '' END,
+        chr(10) ORDER BY e.ord
+    ), '_None_ 🎉')
+    INTO v_needs_attention
+    FROM jsonb_array_elements(COALESCE(v_rollup.needs_attention, '[]')) WITH ORDINALITY AS e(item, ord);
+
+    -- Milestones due in the next 7 days
+    SELECT COALESCE(string_agg(
+        '• ' || m.name || '  (' || p.name || ')  — ' || TO_CHAR(m.target_date, 'DD Mon'),
+        chr(10) ORDER BY m.target_date
+    ), '_Nothing due this week_')
+    INTO v_due_this_week
+    FROM milestones m
+    JOIN projects p ON m.project_id = p.id
+    WHERE m.target_date BETWEEN CURRENT_DATE AND CURRENT_DATE + INTERVAL '7 days'
+      AND m.status NOT IN ('complete', 'cancelled');
+
+    -- Milestone progress by initiative (milestones ending this cycle)
+    SELECT COALESCE(string_agg(
+        '*' || (e.item->>'code') || '*  ✅ ' || (e.item->>'complete') || '  ⬜ ' || (e.item->>'incomplete'),
+        chr(10) ORDER BY e.ord
+    ), '_No milestone data this cycle_')
+    INTO v_initiative_progress
+    FROM jsonb_array_elements(COALESCE(v_rollup.initiatives, '[]')) WITH ORDINALITY AS e(item, ord);
+
+    -- Project progress (projects active this cycle)
+    SELECT COALESCE(string_agg(
+        repeat('█', LEAST(10, ((e.item->>'percent_complete')::NUMERIC / 10)::int)) ||
+        repeat('░', GREATEST(0, 10 - ((e.item->>'percent_complete')::NUMERIC / 10)::int)) ||
+        ' ' || (e.item->>'percent_complete') || '%  ' || (e.item->>'name') || '  ' ||
+        CASE e.item->>'status'
+            WHEN 'complete' THEN '✅'
+            WHEN 'on_track' THEN '🟢'
+            WHEN 'at_risk'  THEN '🟡'
+            WHEN 'blocked'  THEN '🔴'
+            ELSE '⚪'
+        END,
+        chr(10) ORDER BY e.ord
+    ), '_No projects this cycle_')
+    INTO v_project_progress
+    FROM jsonb_array_elements(COALESCE(v_rollup.projects, '[]')) WITH ORDINALITY AS e(item, ord);
+
+    -- Overall completion %
+    v_overall_pct := ROUND(v_rollup.avg_completion);
+
+    -- Team pulse: 5-day average (Mon–Fri when run on Friday)
+    SELECT
+        ROUND(SUM(mood_sum)::NUMERIC / NULLIF(SUM(response_count), 0), 1),
+        ROUND(SUM(busyness_sum)::NUMERIC / NULLIF(SUM(response_count), 0), 1)
+    INTO v_avg_mood, v_avg_busyness
+    FROM mv_checkin_daily
+    WHERE response_date >= CURRENT_DATE - INTERVAL '4 days';
+
+    -- Assemble message
+    v_result :=
+        '📊 *BsB Strategy — ' || v_rollup.code || ' Weekly Report*' || chr(10) ||
+        '_' || TO_CHAR(CURRENT_DATE, 'DD Mon YYYY') || '_' || chr(10) ||
+        chr(10) ||
+        '*⏱ Cycle Progress*' || chr(10) ||
+        v_rollup.name || ' · ' || v_days_remaining || ' days remaining' || chr(10) ||
+        v_progress_bar || ' ' || v_pct_elapsed || '% elapsed' || chr(10) ||
+        chr(10) ||
+        '*🚦 Cycle Health*' || chr(10) ||
+        v_rollup.on_track || ' on track  ·  ' || v_rollup.at_risk || ' at risk  ·  ' ||
+        v_rollup.blocked || ' blocked  ·  ' || v_rollup.complete || ' complete' || chr(10) ||
+        chr(10) ||
+        '*⚠️ Needs Attention*' || chr(10) ||
+        v_needs_attention || chr(10) ||
+        chr(10) ||
+        '*📅 Due This Week*' || chr(10) ||
+        v_due_this_week || chr(10) ||
+        chr(10) ||
+        '*🎯 Milestone Progress by Initiative*' || chr(10) ||
+        v_initiative_progress || chr(10) ||
+        chr(10) ||
+        '*📁 Projects This Cycle*' || chr(10) ||
+        v_project_progress || chr(10) ||
+        chr(10) ||
+        '*Overall Completion: ' || COALESCE(v_overall_pct::TEXT, '—') || '%*' || chr(10) ||
+        chr(10) ||
+        '*😊 Team Pulse* _(5-day avg)_' || chr(10) ||
+        'Mood: ' || COALESCE(v_avg_mood::TEXT, '—') || ' / 10  ·  Busyness: ' ||
+        COALESCE(v_avg_busyness::TEXT, '—') || ' / 10';
+
+    RETURN v_result;
+
+END;
+$fn$ LANGUAGE plpgsql;
@@ -0,0 +1,63 @@
+-- Dashboard Index Migration
+-- Run on Sevalla PostgreSQL (bitesize_bio database)
+-- Adds indexes for the filters used by the Metabase questions
+-- (docs/metabase-queries.md), the dashboard views and the weekly report:
+-- open milestones by target date, milestones by cycle + status, active
+-- projects by cycle range, check-ins by date and IO products by IO +
+-- product type. Two single-column indexes become
+-- redundant (they are prefixes of the new composites) and are dropped.
+--
+-- Safe to paste and run as one block, and to re-run (IF [NOT] EXISTS).
+-- Plain CREATE INDEX briefly blocks writes to each table; at current table
+-- sizes this is well under a second.
+-- Before/after plans: scripts/explain_dashboard_queries.py
+-- Last updated: 2026-10-17
+
+
+-- ============================================
+-- milestones
+-- Open milestones by target_date: the weekly report's "Due This Week" and
+-- other due/overdue lookups are a date range over milestones that are not
+-- complete or cancelled, which over time is a small part of the table.
+-- (A full target_date index was tried for the ORDER BY target_date
+-- questions; those read the whole table, and it made them no faster.)
+-- (focus_cycle_id, status): per-cycle counts (v_cycle_progress, Q12,
+-- mv_cycle_rollup) filter on both.
+-- ============================================
+
+CREATE INDEX IF NOT EXISTS idx_milestones_open_target_date ON milestones(target_date)
+    WHERE status NOT IN ('complete', 'cancelled');
+CREATE INDEX IF NOT EXISTS idx_milestones_cycle_status ON milestones(focus_cycle_id, status);
+DROP INDEX IF EXISTS idx_milestones_cycle;
+
+
+-- ============================================
+-- projects
+-- "Active in cycle" (Q11, mv_cycle_rollup) is
+-- start_cycle_id <= cycle AND (end_cycle_id >= cycle OR end_cycle_id IS NULL)
+-- over projects that are not cancelled or on hold.
+-- ============================================
+
+CREATE INDEX IF NOT EXISTS idx_projects_active_cycle ON projects(start_cycle_id, end_cycle_id)
+    WHERE status NOT IN ('cancelled', 'on_hold');
+
+
+-- ============================================
+-- checkin_responses
+-- Date-range reads (v_checkin_daily / weekly / by_cycle, mv_checkin_daily).
+-- Already present where checkin-schema.sql was run.
+-- ============================================
+
+CREATE INDEX IF NOT EXISTS idx_checkin_date ON checkin_responses(response_date);
+
+
+-- ============================================
+-- io_products
+-- unique_id already has its UNIQUE index. Lookups by IO filter or group
+-- on product_type as well.
+-- ============================================
+
+CREATE INDEX IF NOT EXISTS idx_io_products_io_reference_type ON io_products(io_reference, product_type);
+DROP INDEX IF EXISTS idx_io_products_io_reference;
+
+ANALYZE milestones, projects, checkin_responses, io_products;
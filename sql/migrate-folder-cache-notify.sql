@@ -0,0 +1,58 @@
+-- Drive Folder Cache Notify Migration
+-- Run on Sevalla PostgreSQL (bitesize_bio database)
+-- Adds NOTIFY drive_folders triggers on clients, bsb_client_codes and
+-- client_product_folders, which scripts/folder_cache.py LISTENs on to
+-- invalidate its in-memory copy of the 4-tier Drive folder map.
+--
+-- Requires sql/migrate-drive-folders.sql and sql/migrate-io-folder-plan.sql
+-- (the cache writes through record_created_folders).
+-- Sevalla SQL studio runs the entire editor content as one batch.
+-- Paste the block alone. Canonical copy lives in sql/functions.sql.
+-- Last updated: 2026-10-17
+
+
+-- ============================================
+-- BLOCK 1: trg_notify_drive_folders + triggers
+-- Paste and run alone in Sevalla SQL studio
+-- ============================================
+
+CREATE OR REPLACE FUNCTION trg_notify_drive_folders()
+RETURNS TRIGGER AS $fn$
+BEGIN
+    IF TG_TABLE_NAME = 'clients' THEN
+        PERFORM pg_notify('drive_folders', cc.id::TEXT)
+        FROM bsb_client_codes cc
+        WHERE cc.client_id = CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END;
+    ELSIF TG_TABLE_NAME = 'bsb_client_codes' THEN
+        PERFORM pg_notify('drive_folders',
+                          (CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END)::TEXT);
+    ELSE
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM pg_notify('drive_folders', OLD.client_code_id::TEXT);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM pg_notify('drive_folders', NEW.client_code_id::TEXT);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$fn$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS clients_notify_drive_folders ON clients;
+CREATE TRIGGER clients_notify_drive_folders
+    AFTER DELETE OR UPDATE OF tla, client_name, drive_folder_id
+    ON clients
+    FOR EACH ROW EXECUTE FUNCTION trg_notify_drive_folders();
+
+DROP TRIGGER IF EXISTS bsb_client_codes_notify_drive_folders ON bsb_client_codes;
+CREATE TRIGGER bsb_client_codes_notify_drive_folders
+    AFTER INSERT OR DELETE OR UPDATE OF bsb_client_code, client_id, primary_contact,
+                                        primary_contact_email, drive_folder_id
+    ON bsb_client_codes
+    FOR EACH ROW EXECUTE FUNCTION trg_notify_drive_folders();
+
+DROP TRIGGER IF EXISTS client_product_folders_notify_drive_folders ON client_product_folders;
+CREATE TRIGGER client_product_folders_notify_drive_folders
+    AFTER INSERT OR DELETE OR UPDATE
+    ON client_product_folders
+    FOR EACH ROW EXECUTE FUNCTION trg_notify_drive_folders();
@@ -0,0 +1,151 @@
+-- IO Folder Plan Migration
+-- Run on Sevalla PostgreSQL (bitesize_bio database)
+-- Adds resolve_io_folder_plan() and record_created_folders(), so the IO
+-- scenario makes two Postgres calls per product (one before the Drive
+-- folders are created, one after) instead of get_client_folder_info +
+-- get_product_folder_info + update_client_folder_ids + upsert_product_folder
+-- + upsert_io_product. The old functions are left in place for the
+-- scenario version currently deployed.
+--
+-- Requires sql/migrate-drive-folders.sql and sql/migrate-io-products.sql.
+-- Sevalla SQL studio runs the entire editor content as one batch.
+-- Paste each block separately, in order. Canonical copies live in
+-- sql/functions.sql.
+-- Last updated: 2026-10-17
+
+
+-- ============================================
+-- BLOCK 1: resolve_io_folder_plan
+-- Paste and run alone in Sevalla SQL studio
+-- ============================================
+
+CREATE OR REPLACE FUNCTION resolve_io_folder_plan(
+    p_client_code   TEXT,
+    p_product_type  TEXT,
+    p_year          INTEGER
+)
+RETURNS TABLE (
+    tla                     TEXT,
+    client_name             TEXT,
+    primary_contact         TEXT,
+    primary_contact_email   TEXT,
+    tier1_folder_id         TEXT,
+    tier2_folder_id         TEXT,
+    tier3_folder_id         TEXT,
+    tier4_folder_id         TEXT,
+    missing_tiers           TEXT[]
+) AS $fn$
+BEGIN
+    RETURN QUERY
+    SELECT
+        f.tla,
+        f.client_name,
+        f.primary_contact,
+        f.primary_contact_email,
+        f.tier1,
+        f.tier2,
+        f.tier3,
+        f.tier4,
+        ARRAY_REMOVE(ARRAY[
+            CASE WHEN f.tier1 IS NULL THEN 'tier1' END,
+            CASE WHEN f.tier2 IS NULL THEN 'tier2' END,
+            CASE WHEN f.tier3 IS NULL THEN 'tier3' END,
+            CASE WHEN f.tier4 IS NULL THEN 'tier4' END
+        ], NULL)
+    FROM (
+        SELECT
+            c.tla::TEXT                         AS tla,
+            c.client_name::TEXT                 AS client_name,
+            cc.primary_contact::TEXT            AS primary_contact,
+            cc.primary_contact_email::TEXT      AS primary_contact_email,
+            NULLIF(c.drive_folder_id, '')       AS tier1,
+            NULLIF(cc.drive_folder_id, '')      AS tier2,
+            (SELECT cpf.product_type_folder_id
+             FROM client_product_folders cpf
+             WHERE cpf.client_code_id = cc.id
+               AND cpf.product_type = TRIM(p_product_type)
+               AND NULLIF(cpf.product_type_folder_id, '') IS NOT NULL
+             ORDER BY cpf.year = p_year DESC, cpf.year DESC
+             LIMIT 1)                           AS tier3,
+            (SELECT NULLIF(cpf.year_folder_id, '')
+             FROM client_product_folders cpf
+             WHERE cpf.client_code_id = cc.id
+               AND cpf.product_type = TRIM(p_product_type)
+               AND cpf.year = p_year)           AS tier4
+        FROM bsb_client_codes cc
+        JOIN clients c ON cc.client_id = c.id
+        WHERE cc.bsb_client_code = TRIM(p_client_code)
+    ) f;
+END;
+$fn$ LANGUAGE plpgsql STABLE;
+
+
+-- ============================================
+-- BLOCK 2: record_created_folders
+-- Paste and run alone in Sevalla SQL studio
+-- ============================================
+
+CREATE OR REPLACE FUNCTION record_created_folders(
+    p_client_code       TEXT,
+    p_product_type      TEXT,
+    p_year              INTEGER,
+    p_tier1_folder_id   TEXT,
+    p_tier2_folder_id   TEXT,
+    p_tier3_folder_id   TEXT,
+    p_tier4_folder_id   TEXT,
+    p_io_reference      TEXT,
+    p_product_name      TEXT DEFAULT NULL,
+    p_unique_id         TEXT DEFAULT NULL,
+    p_io_folder_id      TEXT DEFAULT NULL
+) RETURNS INTEGER AS $fn$
+DECLARE
+    v_client_id         INTEGER;
+    v_client_code_id    INTEGER;
+    v_tier1             TEXT := NULLIF(TRIM(p_tier1_folder_id), '');
+    v_tier2             TEXT := NULLIF(TRIM(p_tier2_folder_id), '');
+    v_tier3             TEXT := NULLIF(TRIM(p_tier3_folder_id), '');
+    v_tier4             TEXT := NULLIF(TRIM(p_tier4_folder_id), '');
+BEGIN
+    SELECT cc.client_id, cc.id INTO v_client_id, v_client_code_id
+    FROM bsb_client_codes cc
+    WHERE cc.bsb_client_code = TRIM(p_client_code);
+
+    IF v_client_code_id IS NOT NULL THEN
+        IF v_tier1 IS NOT NULL THEN
+            UPDATE clients
+            SET drive_folder_id = v_tier1
+            WHERE id = v_client_id
+              AND drive_folder_id IS DISTINCT FROM v_tier1;
+        END IF;
+
+        IF v_tier2 IS NOT NULL THEN
+            UPDATE bsb_client_codes
+            SET drive_folder_id = v_tier2
+            WHERE id = v_client_code_id
+              AND drive_folder_id IS DISTINCT FROM v_tier2;
+        END IF;
+
+        IF v_tier4 IS NOT NULL THEN
+            INSERT INTO client_product_folders (
+                client_code_id, product_type, product_type_folder_id, year, year_folder_id
+            ) VALUES (
+                v_client_code_id, TRIM(p_product_type), v_tier3, p_year, v_tier4
+            )
+            ON CONFLICT (client_code_id, product_type, year) DO UPDATE SET
+                product_type_folder_id = COALESCE(
+                    EXCLUDED.product_type_folder_id,
+                    client_product_folders.product_type_folder_id
+                ),
+                year_folder_id = EXCLUDED.year_folder_id
+            WHERE client_product_folders.year_folder_id IS DISTINCT FROM EXCLUDED.year_folder_id
+               OR client_product_folders.product_type_folder_id IS DISTINCT FROM
+                  COALESCE(EXCLUDED.product_type_folder_id, client_product_folders.product_type_folder_id);
+        END IF;
+    END IF;
+
+    RETURN upsert_io_product(
+        p_io_reference, p_product_type, p_product_name, p_unique_id,
+        NULLIF(TRIM(p_io_folder_id), '')
+    );
+END;
+$fn$ LANGUAGE plpgsql;
@@ -0,0 +1,91 @@
+-- Milestone Tag Diff Migration
+-- Run on Sevalla PostgreSQL (bitesize_bio database)
+-- Re-deploys upsert_milestone so idempotent Asana webhook calls write
+-- nothing: the milestones row is only updated when a column changed, and
+-- milestone_bet_tags is diffed instead of deleted and re-inserted.
+-- Same signature, so the Make.com module needs no changes.
+--
+-- Paste and run as one block in Sevalla SQL studio (uses $fn$ quoting).
+-- Benchmark: scripts/bench_milestone_upsert.py
+-- Last updated: 2026-10-17
+
+
+-- ============================================
+-- upsert_milestone
+-- Called by Make.com via PostgreSQL Execute Function module
+-- Maps Asana milestone data into the milestones table
+-- 7th param (p_strategic_bet_tags) is optional for backwards compatibility
+-- Idempotent calls write nothing: the row is only updated when a column
+-- actually changed, and tags are diffed against what is stored (only
+-- added/removed tags are inserted/deleted).
+-- ============================================
+
+CREATE OR REPLACE FUNCTION upsert_milestone(
+    p_asana_id TEXT,
+    p_project_asana_id TEXT,
+    p_name TEXT,
+    p_target_date DATE,
+    p_completed BOOLEAN,
+    p_focus_cycle TEXT,
+    p_strategic_bet_tags TEXT DEFAULT NULL
+) RETURNS VOID AS $fn$
+DECLARE
+    v_project_id INTEGER;
+    v_milestone_id INTEGER;
+    v_status TEXT;
+    v_tag_ids INTEGER[];
+BEGIN
+    SELECT id INTO v_project_id FROM projects WHERE asana_project_id = p_project_asana_id;
+
+    v_status := CASE WHEN p_completed THEN 'complete' ELSE 'upcoming' END;
+
+    INSERT INTO milestones (
+        asana_milestone_id, code, project_id, name, target_date, status, focus_cycle_id
+    )
+    VALUES (
+        p_asana_id,
+        'M-' || p_asana_id,
+        v_project_id,
+        p_name,
+        p_target_date,
+        v_status,
+        (SELECT id FROM focus_cycles WHERE code = REPLACE(p_focus_cycle, '2026 ', ''))
+    )
+    ON CONFLICT (asana_milestone_id) DO UPDATE SET
+        name = EXCLUDED.name,
+        target_date = EXCLUDED.target_date,
+        status = EXCLUDED.status,
+        focus_cycle_id = EXCLUDED.focus_cycle_id,
+        updated_at = NOW()
+    WHERE (milestones.name, milestones.target_date, milestones.status, milestones.focus_cycle_id)
+          IS DISTINCT FROM
+          (EXCLUDED.name, EXCLUDED.target_date, EXCLUDED.status, EXCLUDED.focus_cycle_id)
+    RETURNING id INTO v_milestone_id;
+
+    -- Nothing changed, so RETURNING gave no row
+    IF v_milestone_id IS NULL THEN
+        SELECT id INTO v_milestone_id FROM milestones WHERE asana_milestone_id = p_asana_id;
+    END IF;
+
+    IF p_strategic_bet_tags IS NOT NULL AND p_strategic_bet_tags != '' THEN
+        SELECT COALESCE(array_agg(sbt.id), '{}') INTO v_tag_ids
+        FROM strategic_bet_tags sbt
+        WHERE sbt.name IN (SELECT TRIM(t) FROM unnest(string_to_array(p_strategic_bet_tags, ',')) AS t);
+
+        DELETE FROM milestone_bet_tags
+        WHERE milestone_id = v_milestone_id
+          AND strategic_bet_tag_id != ALL(v_tag_ids);
+
+        -- NOT EXISTS keeps existing tags from consuming sequence values
+        INSERT INTO milestone_bet_tags (milestone_id, strategic_bet_tag_id)
+        SELECT v_milestone_id, tag_id
+        FROM unnest(v_tag_ids) AS tag_id
+        WHERE NOT EXISTS (
+            SELECT 1 FROM milestone_bet_tags mbt
+            WHERE mbt.milestone_id = v_milestone_id
+              AND mbt.strategic_bet_tag_id = tag_id
+        )
+        ON CONFLICT (milestone_id, strategic_bet_tag_id) DO NOTHING;
+    END IF;
+END;
+$fn$ LANGUAGE plpgsql;
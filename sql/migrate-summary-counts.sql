@@ -0,0 +1,312 @@
+-- Summary Counters Migration
+-- Run on Sevalla PostgreSQL (bitesize_bio database)
+-- Adds trigger-maintained counter tables (project_status_counts,
+-- strategy_milestone_counts) and re-points v_executive_summary and
+-- v_bet_health at them, so dashboard loads no longer scan projects or
+-- run per-bet strategy_milestones subqueries. Adds
+-- check_summary_counts() / rebuild_summary_counts().
+--
+-- Sevalla SQL studio runs the entire editor content as one batch.
+-- Paste each block separately, in order. Canonical copies live in
+-- sql/schema.sql and sql/functions.sql.
+-- Last updated: 2026-10-17
+
+
+-- ============================================
+-- BLOCK 1: summary counter tables
+-- Paste and run alone in Sevalla SQL studio
+-- Maintained row by row by triggers (sql/functions.sql) and read by
+-- v_executive_summary and v_bet_health, so dashboard cost does not grow
+-- with the projects / strategy_milestones tables.
+-- NULL bet / department ids are stored as 0 so they can be part of the
+-- key. Projects with a NULL status are not counted (no view counts them).
+-- Verify with SELECT * FROM check_summary_counts(); (no rows = consistent),
+-- rebuild with SELECT rebuild_summary_counts();
+-- ============================================
+
+CREATE TABLE project_status_counts (
+    strategic_bet_id     INTEGER NOT NULL,
+    owning_department_id INTEGER NOT NULL,
+    status               VARCHAR(20) NOT NULL,
+    project_count        INTEGER NOT NULL DEFAULT 0,
+    percent_sum          NUMERIC NOT NULL DEFAULT 0,   -- SUM(percent_complete)
+    percent_count        INTEGER NOT NULL DEFAULT 0,   -- projects with a non-NULL percent_complete
+    PRIMARY KEY (strategic_bet_id, owning_department_id, status)
+);
+
+CREATE TABLE strategy_milestone_counts (
+    strategic_bet_id INTEGER PRIMARY KEY,
+    total            INTEGER NOT NULL DEFAULT 0,
+    complete         INTEGER NOT NULL DEFAULT 0
+);
+
+
+-- ============================================
+-- BLOCK 2: bump_project_status_count
+-- Paste and run alone in Sevalla SQL studio
+-- Adds (p_sign = 1) or removes (p_sign = -1) one project from its
+-- project_status_counts row. Used by trg_projects_summary_counts.
+-- ============================================
+
+CREATE OR REPLACE FUNCTION bump_project_status_count(
+    p_bet_id INTEGER,
+    p_dept_id INTEGER,
+    p_status TEXT,
+    p_percent NUMERIC,
+    p_sign INTEGER
+) RETURNS VOID AS $fn$
+BEGIN
+    IF p_status IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO project_status_counts AS c (
+        strategic_bet_id, owning_department_id, status, project_count, percent_sum, percent_count
+    )
+    VALUES (
+        COALESCE(p_bet_id, 0),
+        COALESCE(p_dept_id, 0),
+        p_status,
+        p_sign,
+        p_sign * COALESCE(p_percent, 0),
+        CASE WHEN p_percent IS NULL THEN 0 ELSE p_sign END
+    )
+    ON CONFLICT (strategic_bet_id, owning_department_id, status) DO UPDATE SET
+        project_count = c.project_count + EXCLUDED.project_count,
+        percent_sum   = c.percent_sum + EXCLUDED.percent_sum,
+        percent_count = c.percent_count + EXCLUDED.percent_count;
+END;
+$fn$ LANGUAGE plpgsql;
+
+
+-- ============================================
+-- BLOCK 3: trg_projects_summary_counts
+-- Paste and run alone in Sevalla SQL studio
+-- Keeps project_status_counts in step with projects, so upsert_project,
+-- upsert_projects_batch and manual edits all update the counters.
+-- Updates that leave bet, department, status and percent_complete alone
+-- (e.g. a renamed project) write nothing.
+-- ============================================
+
+CREATE OR REPLACE FUNCTION trg_projects_summary_counts()
+RETURNS TRIGGER AS $fn$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND (NEW.strategic_bet_id, NEW.owning_department_id, NEW.status, NEW.percent_complete)
+           IS NOT DISTINCT FROM
+           (OLD.strategic_bet_id, OLD.owning_department_id, OLD.status, OLD.percent_complete) THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_project_status_count(OLD.strategic_bet_id, OLD.owning_department_id,
+                                          OLD.status, OLD.percent_complete, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_project_status_count(NEW.strategic_bet_id, NEW.owning_department_id,
+                                          NEW.status, NEW.percent_complete, 1);
+    END IF;
+    RETURN NULL;
+END;
+$fn$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS projects_summary_counts ON projects;
+CREATE TRIGGER projects_summary_counts
+    AFTER INSERT OR DELETE OR UPDATE OF strategic_bet_id, owning_department_id, status, percent_complete
+    ON projects
+    FOR EACH ROW EXECUTE FUNCTION trg_projects_summary_counts();
+
+
+-- ============================================
+-- BLOCK 4: trg_strategy_milestones_summary_counts
+-- Paste and run alone in Sevalla SQL studio
+-- Keeps strategy_milestone_counts in step with strategy_milestones.
+-- ============================================
+
+CREATE OR REPLACE FUNCTION trg_strategy_milestones_summary_counts()
+RETURNS TRIGGER AS $fn$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND (NEW.strategic_bet_id, NEW.status) IS NOT DISTINCT FROM (OLD.strategic_bet_id, OLD.status) THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE strategy_milestone_counts SET
+            total    = total - 1,
+            complete = complete - CASE WHEN OLD.status = 'complete' THEN 1 ELSE 0 END
+        WHERE strategic_bet_id = COALESCE(OLD.strategic_bet_id, 0);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO strategy_milestone_counts AS c (strategic_bet_id, total, complete)
+        VALUES (COALESCE(NEW.strategic_bet_id, 0), 1, CASE WHEN NEW.status = 'complete' THEN 1 ELSE 0 END)
+        ON CONFLICT (strategic_bet_id) DO UPDATE SET
+            total    = c.total + 1,
+            complete = c.complete + EXCLUDED.complete;
+    END IF;
+    RETURN NULL;
+END;
+$fn$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS strategy_milestones_summary_counts ON strategy_milestones;
+CREATE TRIGGER strategy_milestones_summary_counts
+    AFTER INSERT OR DELETE OR UPDATE OF strategic_bet_id, status
+    ON strategy_milestones
+    FOR EACH ROW EXECUTE FUNCTION trg_strategy_milestones_summary_counts();
+
+
+-- ============================================
+-- BLOCK 5: check_summary_counts
+-- Paste and run alone in Sevalla SQL studio
+-- Recomputes the summary counters from projects / strategy_milestones and
+-- returns every key where the stored counters differ. No rows = consistent.
+--   SELECT * FROM check_summary_counts();
+-- ============================================
+
+CREATE OR REPLACE FUNCTION check_summary_counts()
+RETURNS TABLE (counter TEXT, counter_key TEXT, stored TEXT, expected TEXT) AS $fn$
+    WITH expected_projects AS (
+        SELECT COALESCE(strategic_bet_id, 0) AS strategic_bet_id,
+               COALESCE(owning_department_id, 0) AS owning_department_id,
+               status,
+               COUNT(*)::INTEGER AS project_count,
+               COALESCE(SUM(percent_complete), 0) AS percent_sum,
+               COUNT(percent_complete)::INTEGER AS percent_count
+        FROM projects
+        WHERE status IS NOT NULL
+        GROUP BY 1, 2, 3
+    ),
+    stored_projects AS (
+        SELECT * FROM project_status_counts
+        WHERE project_count != 0 OR percent_sum != 0 OR percent_count != 0
+    ),
+    expected_milestones AS (
+        SELECT COALESCE(strategic_bet_id, 0) AS strategic_bet_id,
+               COUNT(*)::INTEGER AS total,
+               COUNT(*) FILTER (WHERE status = 'complete')::INTEGER AS complete
+        FROM strategy_milestones
+        GROUP BY 1
+    ),
+    stored_milestones AS (
+        SELECT * FROM strategy_milestone_counts WHERE total != 0 OR complete != 0
+    )
+    SELECT 'project_status_counts',
+           format('bet=%s dept=%s status=%s', strategic_bet_id, owning_department_id, status),
+           format('%s projects, sum %s over %s', s.project_count, s.percent_sum, s.percent_count),
+           format('%s projects, sum %s over %s', e.project_count, e.percent_sum, e.percent_count)
+    FROM expected_projects e
+    FULL JOIN stored_projects s USING (strategic_bet_id, owning_department_id, status)
+    WHERE (e.project_count, e.percent_sum, e.percent_count)
+          IS DISTINCT FROM (s.project_count, s.percent_sum, s.percent_count)
+    UNION ALL
+    SELECT 'strategy_milestone_counts',
+           format('bet=%s', strategic_bet_id),
+           format('%s total, %s complete', s.total, s.complete),
+           format('%s total, %s complete', e.total, e.complete)
+    FROM expected_milestones e
+    FULL JOIN stored_milestones s USING (strategic_bet_id)
+    WHERE (e.total, e.complete) IS DISTINCT FROM (s.total, s.complete)
+    ORDER BY 1, 2;
+$fn$ LANGUAGE sql STABLE;
+
+
+-- ============================================
+-- BLOCK 6: rebuild_summary_counts
+-- Paste and run alone in Sevalla SQL studio
+-- Recomputes the summary counters from scratch (initial load, or after
+-- check_summary_counts reports drift). Blocks writes to projects and
+-- strategy_milestones while it runs.
+--   SELECT rebuild_summary_counts();
+-- ============================================
+
+CREATE OR REPLACE FUNCTION rebuild_summary_counts()
+RETURNS VOID AS $fn$
+BEGIN
+    LOCK TABLE projects, strategy_milestones IN SHARE MODE;
+
+    DELETE FROM project_status_counts;
+    INSERT INTO project_status_counts (
+        strategic_bet_id, owning_department_id, status, project_count, percent_sum, percent_count
+    )
+    SELECT COALESCE(strategic_bet_id, 0),
+           COALESCE(owning_department_id, 0),
+           status,
+           COUNT(*),
+           COALESCE(SUM(percent_complete), 0),
+           COUNT(percent_complete)
+    FROM projects
+    WHERE status IS NOT NULL
+    GROUP BY 1, 2, 3;
+
+    DELETE FROM strategy_milestone_counts;
+    INSERT INTO strategy_milestone_counts (strategic_bet_id, total, complete)
+    SELECT COALESCE(strategic_bet_id, 0),
+           COUNT(*),
+           COUNT(*) FILTER (WHERE status = 'complete')
+    FROM strategy_milestones
+    GROUP BY 1;
+END;
+$fn$ LANGUAGE plpgsql;
+
+
+-- ============================================
+-- BLOCK 7: initial load
+-- Paste and run alone in Sevalla SQL studio
+-- Fills the counters from the existing rows; should return no rows after.
+-- ============================================
+
+SELECT rebuild_summary_counts();
+SELECT * FROM check_summary_counts();
+
+
+-- ============================================
+-- BLOCK 8: dashboard views
+-- Paste and run alone in Sevalla SQL studio
+-- Same columns and types as before, now read from the counters.
+-- ============================================
+
+CREATE OR REPLACE VIEW v_executive_summary AS
+SELECT
+    COALESCE(SUM(project_count) FILTER (WHERE status != 'cancelled'), 0) as total_projects,
+    COALESCE(SUM(project_count) FILTER (WHERE status = 'on_track'), 0) as on_track,
+    COALESCE(SUM(project_count) FILTER (WHERE status = 'at_risk'), 0) as at_risk,
+    COALESCE(SUM(project_count) FILTER (WHERE status = 'blocked'), 0) as blocked,
+    COALESCE(SUM(project_count) FILTER (WHERE status = 'on_hold'), 0) as on_hold,
+    COALESCE(SUM(project_count) FILTER (WHERE status = 'not_started'), 0) as not_started,
+    COALESCE(SUM(project_count) FILTER (WHERE status = 'complete'), 0) as complete,
+    ROUND(SUM(percent_sum) FILTER (WHERE status NOT IN ('cancelled', 'on_hold')) /
+          NULLIF(SUM(percent_count) FILTER (WHERE status NOT IN ('cancelled', 'on_hold')), 0), 1) as avg_completion,
+    (SELECT code FROM focus_cycles WHERE status = 'active' LIMIT 1) as current_cycle
+FROM project_status_counts;
+
+CREATE OR REPLACE VIEW v_bet_health AS
+SELECT
+    sb.id,
+    sb.code,
+    sb.name,
+    sb.target_outcome,
+    COALESCE(pc.project_count, 0) as project_count,
+    ROUND(pc.percent_sum / NULLIF(pc.percent_count, 0), 1) as avg_completion,
+    COALESCE(pc.on_track_count, 0) as on_track_count,
+    COALESCE(pc.at_risk_count, 0) as at_risk_count,
+    COALESCE(pc.blocked_count, 0) as blocked_count,
+    COALESCE(pc.on_hold_count, 0) as on_hold_count,
+    COALESCE(smc.complete, 0)::BIGINT as strategy_milestones_complete,
+    COALESCE(smc.total, 0)::BIGINT as strategy_milestones_total
+FROM strategic_bets sb
+         LEFT JOIN (
+    SELECT
+        strategic_bet_id,
+        SUM(project_count) as project_count,
+        SUM(percent_sum) as percent_sum,
+        SUM(percent_count) as percent_count,
+        SUM(project_count) FILTER (WHERE status = 'on_track') as on_track_count,
+        SUM(project_count) FILTER (WHERE status = 'at_risk') as at_risk_count,
+        SUM(project_count) FILTER (WHERE status = 'blocked') as blocked_count,
+        SUM(project_count) FILTER (WHERE status = 'on_hold') as on_hold_count
+    FROM project_status_counts
+    WHERE status != 'cancelled'
+    GROUP BY strategic_bet_id
+) pc ON pc.strategic_bet_id = sb.id
+         LEFT JOIN strategy_milestone_counts smc ON smc.strategic_bet_id = sb.id
+ORDER BY sb.code;
@@ -170,6 +170,16 @@ CREATE TABLE bsb_client_codes (
     created_at                  TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- Change-detection fingerprints for scripts/sync_client_sheet.py
+-- One SHA-256 per client code over its normalised sheet row(s); rows whose
+-- fingerprint is unchanged are not re-upserted. Loose ref (no FK) so codes
+-- removed from the sheet can still be reported as missing.
+CREATE TABLE client_sheet_sync_state (
+    bsb_client_code     VARCHAR(50) PRIMARY KEY,
+    row_hash            TEXT NOT NULL,
+    synced_at           TIMESTAMPTZ DEFAULT NOW()
+);
+
 -- Drive folder ID cache for Tiers 3+4 of the client folder hierarchy
 -- Tier 3: "[CODE] Product Type" folder (e.g. "[LMS001] Live Events")
 -- Tier 4: "YYYY" year folder inside Tier 3 (year derived from IO signed date)
@@ -238,6 +248,33 @@ CREATE TABLE checkin_responses (
     created_at      TIMESTAMP DEFAULT NOW()
 );
 
+-- ============================================
+-- SUMMARY COUNTERS
+-- Maintained row by row by triggers (sql/functions.sql) and read by
+-- v_executive_summary and v_bet_health, so dashboard cost does not grow
+-- with the projects / strategy_milestones tables.
+-- NULL bet / department ids are stored as 0 so they can be part of the
+-- key. Projects with a NULL status are not counted (no view counts them).
+-- Verify with SELECT * FROM check_summary_counts(); (no rows = consistent),
+-- rebuild with SELECT rebuild_summary_counts();
+-- ============================================
+
+CREATE TABLE project_status_counts (
+    strategic_bet_id     INTEGER NOT NULL,
+    owning_department_id INTEGER NOT NULL,
+    status               VARCHAR(20) NOT NULL,
+    project_count        INTEGER NOT NULL DEFAULT 0,
+    percent_sum          NUMERIC NOT NULL DEFAULT 0,   -- SUM(percent_complete)
+    percent_count        INTEGER NOT NULL DEFAULT 0,   -- projects with a non-NULL percent_complete
+    PRIMARY KEY (strategic_bet_id, owning_department_id, status)
+);
+
+CREATE TABLE strategy_milestone_counts (
+    strategic_bet_id INTEGER PRIMARY KEY,
+    total            INTEGER NOT NULL DEFAULT 0,
+    complete         INTEGER NOT NULL DEFAULT 0
+);
+
 -- ============================================
 -- INDEXES
 -- ============================================
@@ -245,13 +282,18 @@ CREATE TABLE checkin_responses (
 CREATE INDEX idx_projects_bet ON projects(strategic_bet_id);
 CREATE INDEX idx_projects_dept ON projects(owning_department_id);
 CREATE INDEX idx_projects_status ON projects(status);
+CREATE INDEX idx_projects_active_cycle ON projects(start_cycle_id, end_cycle_id)
+    WHERE status NOT IN ('cancelled', 'on_hold');
 CREATE INDEX idx_milestones_project ON milestones(project_id);
-CREATE INDEX idx_milestones_cycle ON milestones(focus_cycle_id);
+CREATE INDEX idx_milestones_cycle_status ON milestones(focus_cycle_id, status);
+CREATE INDEX idx_milestones_open_target_date ON milestones(target_date)
+    WHERE status NOT IN ('complete', 'cancelled');
 CREATE INDEX idx_users_asana_id ON users(asana_user_id);
 CREATE INDEX idx_milestone_bet_tags_milestone ON milestone_bet_tags(milestone_id);
 CREATE INDEX idx_milestone_bet_tags_tag ON milestone_bet_tags(strategic_bet_tag_id);
 CREATE INDEX idx_client_product_folders_code ON client_product_folders(client_code_id);
-CREATE INDEX idx_io_products_io_reference ON io_products(io_reference);
+CREATE INDEX idx_io_products_io_reference_type ON io_products(io_reference, product_type);
+CREATE INDEX idx_checkin_date ON checkin_responses(response_date);
 
 -- ============================================
 -- VIEWS
@@ -259,15 +301,17 @@ CREATE INDEX idx_io_products_io_reference ON io_products(io_reference);
 
 CREATE VIEW v_executive_summary AS
 SELECT
-    (SELECT COUNT(*) FROM projects WHERE status NOT IN ('cancelled')) as total_projects,
-    (SELECT COUNT(*) FROM projects WHERE status = 'on_track') as on_track,
-    (SELECT COUNT(*) FROM projects WHERE status = 'at_risk') as at_risk,
-    (SELECT COUNT(*) FROM projects WHERE status = 'blocked') as blocked,
-    (SELECT COUNT(*) FROM projects WHERE status = 'on_hold') as on_hold,
-    (SELECT COUNT(*) FROM projects WHERE status = 'not_started') as not_started,
-    (SELECT COUNT(*) FROM projects WHERE status = 'complete') as complete,
-    (SELECT ROUND(AVG(percent_complete), 1) FROM projects WHERE status NOT IN ('cancelled', 'on_hold')) as avg_completion,
-    (SELECT code FROM focus_cycles WHERE status = 'active' LIMIT 1) as current_cycle;
+    COALESCE(SUM(project_count) FILTER (WHERE status != 'cancelled'), 0) as total_projects,
+    COALESCE(SUM(project_count) FILTER (WHERE status = 'on_track'), 0) as on_track,
+    COALESCE(SUM(project_count) FILTER (WHERE status = 'at_risk'), 0) as at_risk,
+    COALESCE(SUM(project_count) FILTER (WHERE status = 'blocked'), 0) as blocked,
+    COALESCE(SUM(project_count) FILTER (WHERE status = 'on_hold'), 0) as on_hold,
+    COALESCE(SUM(project_count) FILTER (WHERE status = 'not_started'), 0) as not_started,
+    COALESCE(SUM(project_count) FILTER (WHERE status = 'complete'), 0) as complete,
+    ROUND(SUM(percent_sum) FILTER (WHERE status NOT IN ('cancelled', 'on_hold')) /
+          NULLIF(SUM(percent_count) FILTER (WHERE status NOT IN ('cancelled', 'on_hold')), 0), 1) as avg_completion,
+    (SELECT code FROM focus_cycles WHERE status = 'active' LIMIT 1) as current_cycle
+FROM project_status_counts;
 
 CREATE VIEW v_bet_health AS
 SELECT
@@ -275,17 +319,30 @@ SELECT
     sb.code,
     sb.name,
     sb.target_outcome,
-    COUNT(p.id) as project_count,
-    ROUND(AVG(p.percent_complete), 1) as avg_completion,
-    SUM(CASE WHEN p.status = 'on_track' THEN 1 ELSE 0 END) as on_track_count,
-    SUM(CASE WHEN p.status = 'at_risk' THEN 1 ELSE 0 END) as at_risk_count,
-    SUM(CASE WHEN p.status = 'blocked' THEN 1 ELSE 0 END) as blocked_count,
-    SUM(CASE WHEN p.status = 'on_hold' THEN 1 ELSE 0 END) as on_hold_count,
-    (SELECT COUNT(*) FROM strategy_milestones sm WHERE sm.strategic_bet_id = sb.id AND sm.status = 'complete') as strategy_milestones_complete,
-    (SELECT COUNT(*) FROM strategy_milestones sm WHERE sm.strategic_bet_id = sb.id) as strategy_milestones_total
+    COALESCE(pc.project_count, 0) as project_count,
+    ROUND(pc.percent_sum / NULLIF(pc.percent_count, 0), 1) as avg_completion,
+    COALESCE(pc.on_track_count, 0) as on_track_count,
+    COALESCE(pc.at_risk_count, 0) as at_risk_count,
+    COALESCE(pc.blocked_count, 0) as blocked_count,
+    COALESCE(pc.on_hold_count, 0) as on_hold_count,
+    COALESCE(smc.complete, 0)::BIGINT as strategy_milestones_complete,
+    COALESCE(smc.total, 0)::BIGINT as strategy_milestones_total
 FROM strategic_bets sb
-         LEFT JOIN projects p ON p.strategic_bet_id = sb.id AND p.status != 'cancelled'
-GROUP BY sb.id, sb.code, sb.name, sb.target_outcome
+         LEFT JOIN (
+    SELECT
+        strategic_bet_id,
+        SUM(project_count) as project_count,
+        SUM(percent_sum) as percent_sum,
+        SUM(percent_count) as percent_count,
+        SUM(project_count) FILTER (WHERE status = 'on_track') as on_track_count,
+        SUM(project_count) FILTER (WHERE status = 'at_risk') as at_risk_count,
+        SUM(project_count) FILTER (WHERE status = 'blocked') as blocked_count,
+        SUM(project_count) FILTER (WHERE status = 'on_hold') as on_hold_count
+    FROM project_status_counts
+    WHERE status != 'cancelled'
+    GROUP BY strategic_bet_id
+) pc ON pc.strategic_bet_id = sb.id
+         LEFT JOIN strategy_milestone_counts smc ON smc.strategic_bet_id = sb.id
 ORDER BY sb.code;
 
 CREATE VIEW v_department_workload AS
@@ -408,6 +465,115 @@ FROM projects p
 WHERE p.status IN ('at_risk', 'blocked')
 ORDER BY p.status, p.updated_at;
 
+-- ============================================
+-- MATERIALIZED ROLLUPS
+-- Read by generate_weekly_slack_report and Metabase so their cost does not
+-- grow with history. Refresh with SELECT refresh_cycle_rollups();
+-- (sql/functions.sql) — the unique indexes allow REFRESH ... CONCURRENTLY.
+-- ============================================
+
+-- One row per focus cycle. "Active in cycle" matches the report:
+-- start_cycle_id <= cycle AND (end_cycle_id >= cycle OR end_cycle_id IS NULL).
+-- List columns are JSONB arrays, pre-sorted in report order.
+CREATE MATERIALIZED VIEW mv_cycle_rollup AS
+SELECT
+    fc.id AS cycle_id,
+    fc.code,
+    fc.name,
+    fc.start_date,
+    fc.end_date,
+    COALESCE(ps.project_count, 0) AS project_count,
+    COALESCE(ps.on_track, 0)      AS on_track,
+    COALESCE(ps.at_risk, 0)       AS at_risk,
+    COALESCE(ps.blocked, 0)       AS blocked,
+    COALESCE(ps.complete, 0)      AS complete,
+    ps.avg_completion,
+    ps.projects,
+    na.needs_attention,
+    ip.initiatives,
+    NOW() AS refreshed_at
+FROM focus_cycles fc
+LEFT JOIN LATERAL (
+    SELECT
+        COUNT(*)                                   AS project_count,
+        COUNT(*) FILTER (WHERE p.status = 'on_track') AS on_track,
+        COUNT(*) FILTER (WHERE p.status = 'at_risk')  AS at_risk,
+        COUNT(*) FILTER (WHERE p.status = 'blocked')  AS blocked,
+        COUNT(*) FILTER (WHERE p.status = 'complete') AS complete,
+        AVG(COALESCE(p.percent_complete, 0))       AS avg_completion,
+        jsonb_agg(jsonb_build_object(
+            'name', p.name,
+            'status', p.status,
+            'percent_complete', COALESCE(p.percent_complete, 0)
+        ) ORDER BY p.percent_complete DESC NULLS LAST) AS projects
+    FROM projects p
+    WHERE p.start_cycle_id <= fc.id
+      AND (p.end_cycle_id >= fc.id OR p.end_cycle_id IS NULL)
+      AND p.status NOT IN ('cancelled', 'on_hold')
+) ps ON true
+LEFT JOIN LATERAL (
+    SELECT jsonb_agg(jsonb_build_object(
+        'name', p.name,
+        'status', p.status,
+        'project_lead', p.project_lead
+    ) ORDER BY p.status, p.name) AS needs_attention
+    FROM projects p
+    WHERE p.status IN ('at_risk', 'blocked')
+      AND p.start_cycle_id <= fc.id
+      AND (p.end_cycle_id >= fc.id OR p.end_cycle_id IS NULL)
+) na ON true
+LEFT JOIN LATERAL (
+    SELECT jsonb_agg(jsonb_build_object(
+        'code', t.code,
+        'complete', t.complete_count,
+        'incomplete', t.incomplete_count
+    ) ORDER BY t.code) AS initiatives
+    FROM (
+        SELECT
+            sb.code,
+            COUNT(*) FILTER (WHERE m.status = 'complete')                     AS complete_count,
+            COUNT(*) FILTER (WHERE m.status NOT IN ('complete', 'cancelled')) AS incomplete_count
+        FROM milestones m
+        JOIN projects p ON m.project_id = p.id
+        JOIN strategic_bets sb ON p.strategic_bet_id = sb.id
+        WHERE m.focus_cycle_id = fc.id
+        GROUP BY sb.code
+        HAVING COUNT(*) FILTER (WHERE m.status != 'cancelled') > 0
+    ) t
+) ip ON true;
+
+CREATE UNIQUE INDEX idx_mv_cycle_rollup_cycle ON mv_cycle_rollup(cycle_id);
+CREATE UNIQUE INDEX idx_mv_cycle_rollup_code ON mv_cycle_rollup(code);
+
+-- Check-in sums per day. Averages over any date range (5-day pulse, whole
+-- cycle) are SUM(mood_sum) / SUM(response_count) over a handful of rows.
+CREATE MATERIALIZED VIEW mv_checkin_daily AS
+SELECT
+    response_date,
+    COUNT(*)             AS response_count,
+    SUM(mood_rating)     AS mood_sum,
+    SUM(busyness_rating) AS busyness_sum
+FROM checkin_responses
+GROUP BY response_date;
+
+CREATE UNIQUE INDEX idx_mv_checkin_daily_date ON mv_checkin_daily(response_date);
+
+-- Per-cycle view for Metabase: rollup plus check-in averages over the cycle
+CREATE VIEW v_cycle_rollup AS
+SELECT
+    r.*,
+    ck.response_count,
+    ROUND(ck.mood_sum::NUMERIC / NULLIF(ck.response_count, 0), 1)     AS avg_mood,
+    ROUND(ck.busyness_sum::NUMERIC / NULLIF(ck.response_count, 0), 1) AS avg_busyness
+FROM mv_cycle_rollup r
+LEFT JOIN LATERAL (
+    SELECT SUM(d.response_count) AS response_count,
+           SUM(d.mood_sum)       AS mood_sum,
+           SUM(d.busyness_sum)   AS busyness_sum
+    FROM mv_checkin_daily d
+    WHERE d.response_date BETWEEN r.start_date AND r.end_date
+) ck ON true;
+
 -- ============================================
 -- SEED DATA
 -- ============================================
@@ -444,3 +610,6 @@ INSERT INTO departments (code, name) VALUES
                                          ('BOARD', 'Board'),
                                          ('STRAT', 'Strategy'),
                                          ('DES', 'Design');
+
+-- Populate the rollups with the seeded cycles
+REFRESH MATERIALIZED VIEW mv_cycle_rollup;